@@ -0,0 +1,105 @@
+"""
+Per-update latency of the dashboard's Scarcity and Flex charts.
+
+Builds each widget offscreen with the real data, then steps through every
+combination of its controls, timing update() and the canvas draw that
+follows it separately.
+
+Usage:
+    python bench_widgets.py [--repeat N]
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt6.QtWidgets import QApplication
+import combined
+from data_repository import load_season_data
+
+
+def scarcity_states(widget):
+    for choice, size, hidden in itertools.product(combined.years + ["Average"], combined.team_sizes, [None] + combined.positions):
+        def apply(choice=choice, size=size, hidden=hidden):
+            # Block the controls' signals so only the timed update() runs.
+            for control in [widget.season_combo, widget.team_combo] + list(widget.pos_checks.values()):
+                control.blockSignals(True)
+            widget.season_combo.setCurrentText(str(choice))
+            widget.team_combo.setCurrentText(str(size))
+            for pos, check in widget.pos_checks.items():
+                check.setChecked(pos != hidden)
+            for control in [widget.season_combo, widget.team_combo] + list(widget.pos_checks.values()):
+                control.blockSignals(False)
+        yield apply
+
+
+def flex_states(widget):
+    for superflex, size in itertools.product([False, True], combined.team_sizes):
+        def apply(size=size, superflex=superflex):
+            widget.size_combo.blockSignals(True)
+            widget.superflex_check.blockSignals(True)
+            widget.size_combo.setCurrentText(str(size))
+            widget.superflex_check.setChecked(superflex)
+            widget.size_combo.blockSignals(False)
+            widget.superflex_check.blockSignals(False)
+        yield apply
+
+
+def bench(widget, states, repeat):
+    """
+    Times update() and the following draw for every control state.
+
+    Returns:
+        tuple: (update times, draw times) in milliseconds.
+    """
+    widget.canvas.draw()
+    update_ms = []
+    draw_ms = []
+
+    for _ in range(repeat):
+        for apply in states(widget):
+            apply()
+
+            t0 = time.perf_counter()
+            widget.update()
+            t1 = time.perf_counter()
+            widget.canvas.draw()
+            t2 = time.perf_counter()
+
+            update_ms.append((t1 - t0) * 1000)
+            draw_ms.append((t2 - t1) * 1000)
+
+    return np.array(update_ms), np.array(draw_ms)
+
+
+def report(name, update_ms, draw_ms):
+    total = update_ms + draw_ms
+    print(f"{name:<10} n={len(total):<4} "
+          f"update median {np.median(update_ms):6.2f} ms  p95 {np.percentile(update_ms, 95):6.2f} ms  |  "
+          f"update+draw median {np.median(total):6.2f} ms  p95 {np.percentile(total, 95):6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Scarcity and Flex chart updates.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over every control combination.")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+
+    df = load_season_data(combined.path, combined.years, combined.positions)
+
+    scarcity = combined.ScarcityWidget(df)
+    scarcity.resize(1000, 700)
+    report("Scarcity", *bench(scarcity, scarcity_states, args.repeat))
+
+    flex = combined.FlexWidget(df)
+    flex.resize(1000, 700)
+    report("Flex", *bench(flex, flex_states, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
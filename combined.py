@@ -1,19 +1,23 @@
 import sys
+import time
 from pathlib import Path
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.artist import Artist
+from matplotlib.font_manager import FontProperties
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
-from scipy.stats import gaussian_kde
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QCheckBox, QGroupBox, QSpinBox, QTabWidget
+from scarcity import ScarcityCube
+from defense_index import DefenseIndex
+from kde import DensityCache, bandwidth_rules, binned_kde
+from hit_index import PointIndex
+from league import dedicated_spots, flex_pos, team_sizes
 
 path = Path("NFL-Data") / "NFL-data-Players"
 years = [2021, 2022, 2023, 2024]
 positions = ["QB", "RB", "WR", "TE"]
-flex_pos = ["RB", "WR", "TE"]
-starter_count = {"QB": 1, "RB": 2, "WR": 2, "TE": 1}
-team_sizes = [8, 10, 12, 14]
 scale_min = -3.0
 scale_max = 3.0
 
@@ -34,169 +38,147 @@ pos_colors_rgba = {
 years_str = [str(y) for y in range(2015, 2026)]
 weeks_str = [str(w) for w in range(1, 18)] + ["full season"]
 
-# Data Handling
-def load_season_data(base, years, pos_list):
-    all_data = []
+# Background Loading
+
+class LoadSignals(QObject):
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class LoadTask(QRunnable):
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+        self.signals = LoadSignals()
     
-    for y in years:
-        for pos in pos_list:
-            f = Path(base) / str(y) / (pos + "_season.csv")
-            
-            if not f.exists():
-                continue
-            
-            df = pd.read_csv(f)
-            df["season"] = y
-            
-            required = ["PlayerName", "Pos", "Rank", "TotalPoints"]
-            has_all = True
-            for col in required:
-                if col not in df.columns:
-                    has_all = False
-                    break
-            
-            if has_all == False:
-                continue
+    def run(self):
+        try:
+            result = self.fn()
+        except Exception as e:
+            self.signals.failed.emit(type(e).__name__ + ": " + str(e))
+            return
+        
+        self.signals.done.emit(result)
+
+
+class LazyTab(QWidget):
+    """
+    Tab page that builds its widget the first time it is shown. Calls made
+    through forward() (set_data() included) before then are kept and passed on
+    once the widget exists.
+    """
+    def __init__(self, factory):
+        super().__init__()
+        
+        self.factory = factory
+        self.widget = None
+        self.pending = {}
+        
+        self.box = QVBoxLayout(self)
+        self.box.setContentsMargins(0, 0, 0, 0)
+    
+    def content(self):
+        if self.widget is None:
+            self.widget = self.factory()
+            self.box.addWidget(self.widget)
             
-            df = df[["season", "PlayerName", "Pos", "Rank", "TotalPoints"]]
-            all_data.append(df)
+            for method, args in self.pending.items():
+                getattr(self.widget, method)(*args)
+            self.pending = {}
+        
+        return self.widget
     
-    if len(all_data) == 0:
-        return pd.DataFrame()
+    def forward(self, method, *args):
+        # Only the latest call of each method matters while the widget does not exist.
+        if self.widget is None:
+            self.pending[method] = args
+        else:
+            getattr(self.widget, method)(*args)
+    
+    def set_data(self, *args):
+        self.forward("set_data", *args)
     
-    return pd.concat(all_data, ignore_index=True)
+    def showEvent(self, event):
+        self.content()
+        super().showEvent(event)
 
 
-def load_week_data(folder):
-    all_data = []
+class BackgroundLoader:
+    """
+    Runs dataset loads on Qt's thread pool and hands each result to its
+    consumers on the UI thread, so the window can be shown before any data is read.
+    """
+    def __init__(self, status=None):
+        self.pool = QThreadPool.globalInstance()
+        self.status = status
+        self.tasks = []
+        self.pending = 0
     
-    if not folder.exists():
-        return pd.DataFrame()
+    def load(self, name, fn, consumers):
+        task = LoadTask(fn)
+        task.signals.done.connect(lambda result: self.on_done(name, result, consumers))
+        task.signals.failed.connect(lambda msg: self.on_failed(name, msg))
+        
+        # Keep the task (and its signals object) alive until it reports back.
+        self.tasks.append(task)
+        self.pending += 1
+        self.show_status("Loading " + name + "...")
+        self.pool.start(task)
     
-    for year_folder in folder.iterdir():
-        if not year_folder.is_dir():
-            continue
-        
-        for week_folder in year_folder.iterdir():
-            if not week_folder.is_dir():
-                continue
-            
-            if not week_folder.name.isdigit():
-                continue
-            
-            for pos_file in week_folder.iterdir():
-                if not pos_file.suffix == ".csv":
-                    continue
-                
-                try:
-                    df = pd.read_csv(pos_file)
-                    
-                    has_cols = True
-                    for col in ["PlayerName", "Team", "Pos", "TotalPoints"]:
-                        if col not in df.columns:
-                            has_cols = False
-                            break
-                    
-                    if has_cols == False:
-                        continue
-                    
-                    df = df[["PlayerName", "Team", "Pos", "TotalPoints"]]
-                    all_data.append(df)
-                except:
-                    continue
-    
-    if len(all_data) == 0:
-        return pd.DataFrame()
-    
-    return pd.concat(all_data, ignore_index=True)
-
-
-def load_defense_data(folder):
-    all_data = []
-    
-    if not folder.exists():
-        return pd.DataFrame()
-    
-    for year_folder in folder.iterdir():
-        if not year_folder.is_dir():
-            continue
-        
-        season = 0
-        try:
-            season = int(year_folder.name)
-        except ValueError:
-            continue
+    def on_done(self, name, result, consumers):
+        for consumer in consumers:
+            consumer(result)
+        self.finish(name)
+    
+    def on_failed(self, name, msg):
+        print("Could not load " + name + ": " + msg, file=sys.stderr)
+        self.show_status("Could not load " + name + ": " + msg, keep=True)
+        self.finish(name, failed=True)
+    
+    def finish(self, name, failed=False):
+        self.pending -= 1
+        if self.pending == 0 and failed == False:
+            self.show_status("Data loaded.")
+    
+    def show_status(self, msg, keep=False):
+        if self.status is None:
+            return
         
-        for week_folder in year_folder.iterdir():
-            if not week_folder.is_dir():
-                continue
-            
-            week = 0
-            try:
-                week = int(week_folder.name)
-            except ValueError:
-                continue
-            
-            for pos in positions:
-                f = week_folder / (pos + ".csv")
-                
-                if not f.exists():
-                    continue
-                
-                df = pd.read_csv(f)
-                df["season"] = season
-                df["week"] = week
-                df["Pos"] = pos
-                
-                has_cols = True
-                if "PlayerOpponent" not in df.columns:
-                    has_cols = False
-                if "TotalPoints" not in df.columns:
-                    has_cols = False
-                
-                if has_cols == False:
-                    continue
-                
-                df = df[["PlayerName", "Pos", "PlayerOpponent", "TotalPoints", "season", "week"]]
-                all_data.append(df)
-    
-    if len(all_data) == 0:
-        return pd.DataFrame()
-    
-    combined = pd.concat(all_data, ignore_index=True)
-    combined["Opponent"] = combined["PlayerOpponent"].str.replace("@", "", regex=False).str.strip()
-    return combined
-
-
-def load_efficiency_data(folder, year, week, pos):
-    if week == "full season":
-        f = folder / year / (pos + "_season.csv")
-    else:
-        f = folder / year / week / (pos + ".csv")
-    
-    if not f.exists():
-        return None
-    
-    return pd.read_csv(f)
+        if keep == True:
+            self.status.showMessage(msg)
+        else:
+            self.status.showMessage(msg, 5000)
 
 
 # Positional Scarcity Chart
 
 class ScarcityWidget(QWidget):
-    def __init__(self, df):
+    def __init__(self, df=None):
         super().__init__()
         
-        self.df = df[df["Rank"] <= 50].copy()
-        self.max_y = self.y_max()
+        self.cube = None
+        self.max_y = 500
+        self.legend_key = None
+        self.laid_out = False
         
         self.setup()
+        
+        if df is None:
+            self.show_message("Loading data...")
+        else:
+            self.set_data(df)
+    
+    def set_data(self, df):
+        self.cube = ScarcityCube(df, years, positions)
+        self.max_y = self.y_max()
+        self.ax.set_ylim(0, self.max_y)
         self.update()
 
     def y_max(self):
-        if len(self.df) == 0:
+        maxx = self.cube.max_points(50)
+        if np.isnan(maxx):
             return 500
         
-        maxx = self.df["TotalPoints"].max()
         return maxx * 1.1
 
     def setup(self):
@@ -243,33 +225,43 @@ class ScarcityWidget(QWidget):
         self.fig, self.ax = plt.subplots(figsize=(7, 5))
         self.canvas = FigureCanvas(self.fig)
         layout.addWidget(self.canvas, stretch=1)
-
-    def cutoff(self, pos, size):
-        if pos in starter_count:
-            n = starter_count[pos]
-        else:
-            n = 1
         
-        return n * size
-
-    def get_data(self):
-        choice = self.season_combo.currentText()
+        # One line per position, created once; update() only changes their data and visibility.
+        self.lines = {}
+        for pos in positions:
+            if pos in pos_colors:
+                col = pos_colors[pos]
+            else:
+                col = "gray"
+            
+            line, = self.ax.plot([], [], marker="o", markersize=5, color=col, linewidth=2)
+            line.set_visible(False)
+            self.lines[pos] = line
         
-        if choice == "Average":
-            df = self.df.groupby(["Pos", "Rank"], as_index=False)["TotalPoints"].mean()
-            names = self.df.groupby(["Pos", "Rank"], as_index=False)["PlayerName"].first()
-            df = df.merge(names, on=["Pos", "Rank"])
-            df["season"] = "Average"
-            return df
-        else:
-            y = int(choice)
-            return self.df[self.df["season"] == y]
+        self.message = self.ax.text(0.5, 0.5, "", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
+        
+        self.ax.set_xlabel("Positional Rank")
+        self.ax.set_ylabel("Total Fantasy Points")
+        self.ax.set_ylim(0, self.max_y)
+        self.ax.spines["top"].set_visible(False)
+        self.ax.spines["right"].set_visible(False)
+        self.ax.grid(True, alpha=0.3)
+    
+    def show_message(self, msg):
+        self.message.set_text(msg)
+        self.canvas.draw_idle()
+
+    def cutoff(self, pos, size):
+        return dedicated_spots(pos, size)
 
     def update(self):
-        df = self.get_data()
+        if self.cube is None:
+            return
+        
+        choice = self.season_combo.currentText()
         size = int(self.team_combo.currentText())
-
-        self.ax.clear()
+        
+        self.message.set_text("")
 
         selected = []
         for pos in self.pos_checks:
@@ -277,62 +269,84 @@ class ScarcityWidget(QWidget):
             if check.isChecked() == True:
                 selected.append(pos)
 
-        has_data = False
+        shown = []
 
-        for pos in selected:
+        for pos in self.lines:
+            line = self.lines[pos]
+            
+            if pos not in selected:
+                line.set_visible(False)
+                continue
+            
             cut = self.cutoff(pos, size)
             
-            sub = df[df["Pos"] == pos]
-            sub = sub[sub["Rank"] <= cut]
-            sub = sub.sort_values("Rank")
+            ranks, points, names = self.cube.curve(choice, pos, cut)
             
-            if len(sub) == 0:
+            if len(ranks) == 0:
+                line.set_visible(False)
                 continue
-
-            has_data = True
-
-            if pos in pos_colors:
-                col = pos_colors[pos]
-            else:
-                col = "gray"
             
-            if pos in starter_count:
-                n = starter_count[pos]
-            else:
-                n = 1
+            label = pos + " (Top " + str(cut) + ")"
             
-            label = pos + " (Top " + str(n * size) + ")"
-
-            self.ax.plot(sub["Rank"], sub["TotalPoints"], marker="o", markersize=5, label=label, color=col, linewidth=2)
+            line.set_data(ranks, points)
+            line.set_label(label)
+            line.set_visible(True)
+            shown.append(line)
 
         yr = self.season_combo.currentText()
         title = "Positional Scarcity in Fantasy Football (" + yr + ", " + str(size) + "-Team League)"
-
-        self.ax.set_xlabel("Positional Rank")
-        self.ax.set_ylabel("Total Fantasy Points")
-        self.ax.set_ylim(0, self.max_y)
         self.ax.set_title(title)
-        self.ax.spines["top"].set_visible(False)
-        self.ax.spines["right"].set_visible(False)
-        self.ax.grid(True, alpha=0.3)
         
-        if has_data == True:
-            self.ax.legend()
+        if len(shown) > 0:
+            self.ax.relim(visible_only=True)
+            self.ax.autoscale_view(scalex=True, scaley=False)
+        
+        # The legend is only rebuilt when the lines it lists change.
+        legend_key = tuple(line.get_label() for line in shown)
+        if legend_key != self.legend_key:
+            self.legend_key = legend_key
+            
+            legend = self.ax.get_legend()
+            if legend is not None:
+                legend.remove()
+            if len(shown) > 0:
+                self.ax.legend(handles=shown)
+        
+        # The axis labels never change, so the layout only has to be worked out once.
+        if self.laid_out == False:
+            self.fig.tight_layout()
+            self.laid_out = True
         
-        self.fig.tight_layout()
         self.canvas.draw_idle()
 
 
 # Flex Analysis Chart
 
 class FlexWidget(QWidget):
-    def __init__(self, df):
+    def __init__(self, df=None):
         super().__init__()
         
-        self.df = df
+        self.df = None
+        self.pos_points = {}
         self.max_y = 300
+        self.layout_key = None
         
         self.setup()
+        
+        if df is None:
+            self.show_message("Loading data...")
+        else:
+            self.set_data(df)
+    
+    def set_data(self, df):
+        self.df = df
+        
+        # Ranks and points of each position as arrays, so update() does no DataFrame filtering.
+        self.pos_points = {}
+        for pos in flex_pos + ["QB"]:
+            sub = df[(df["Pos"] == pos) & df["TotalPoints"].notna()]
+            self.pos_points[pos] = (sub["Rank"].to_numpy(), sub["TotalPoints"].to_numpy(dtype=np.float64))
+        
         self.update()
     
     def setup(self):
@@ -364,25 +378,68 @@ class FlexWidget(QWidget):
         self.fig, self.ax = plt.subplots(figsize=(7, 5))
         self.canvas = FigureCanvas(self.fig)
         layout.addWidget(self.canvas, stretch=1)
+        
+        # Bars for every position that can be in the flex (QB only with superflex),
+        # created once; update() changes their heights and visibility.
+        all_flex = flex_pos + ["QB"]
+        colors = []
+        for pos in all_flex:
+            if pos in pos_colors:
+                col = pos_colors[pos]
+            else:
+                col = "gray"
+            colors.append(col)
+        
+        x = np.arange(len(all_flex))
+        self.bars = self.ax.bar(x, np.zeros(len(all_flex)), color=colors, edgecolor="white", linewidth=1.2)
+        self.bar_labels = []
+        for i in range(len(all_flex)):
+            self.bar_labels.append(self.ax.text(x[i], 0, "", ha="center", fontsize=10))
+        
+        self.avg_line = self.ax.axhline(0, linestyle="--", color="gray", linewidth=1.5, alpha=0.7, label="Flex Avg")
+        self.avg_label = self.ax.text(0, 0, "", fontsize=9)
+        self.message = self.ax.text(0.5, 0.5, "", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
+        
+        self.ax.set_ylabel("Avg Season Points")
+        self.ax.set_xlabel("Position")
+        self.ax.set_ylim(0, self.max_y)
+        self.ax.spines["top"].set_visible(False)
+        self.ax.spines["right"].set_visible(False)
+        self.ax.yaxis.grid(True, alpha=0.3)
+        self.ax.legend(handles=[self.avg_line], loc="upper right")
+        
+        self.show_chart(False)
+    
+    def show_chart(self, visible):
+        for bar in self.bars:
+            bar.set_visible(visible)
+        for label in self.bar_labels:
+            label.set_visible(visible)
+        self.avg_line.set_visible(visible)
+        self.avg_label.set_visible(visible)
+        self.ax.get_legend().set_visible(visible)
+    
+    def show_message(self, msg):
+        self.show_chart(False)
+        self.message.set_text(msg)
+        self.canvas.draw_idle()
     
     def tier_range(self, pos, size):
-        if pos in starter_count:
-            n = starter_count[pos]
-        else:
-            n = 1
-        
-        start = n * size + 1
+        start = dedicated_spots(pos, size) + 1
         end = start + size
         return start, end
     
     def update(self):
-        self.ax.clear()
+        if self.df is None:
+            return
         
         if len(self.df) == 0:
-            self.ax.text(0.5, 0.5, "No data available.", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
-            self.canvas.draw_idle()
+            self.show_message("No data available.")
             return
         
+        self.message.set_text("")
+        self.show_chart(True)
+        
         size = int(self.size_combo.currentText())
         
         flex = []
@@ -397,45 +454,43 @@ class FlexWidget(QWidget):
         for pos in flex:
             start, end = self.tier_range(pos, size)
             
-            sub = self.df[self.df["Pos"] == pos]
-            sub = sub[sub["Rank"] >= start]
-            sub = sub[sub["Rank"] <= end]
-            
-            pts = sub["TotalPoints"].dropna()
+            ranks, points = self.pos_points[pos]
+            pts = points[(ranks >= start) & (ranks <= end)]
             
             if len(pts) == 0:
                 means.append(0)
             else:
                 means.append(pts.mean())
-                for val in pts.values:
-                    all_pts.append(val)
+                all_pts.append(pts)
         
         x = np.arange(len(flex))
         
-        colors = []
-        for pos in flex:
-            if pos in pos_colors:
-                col = pos_colors[pos]
-            else:
-                col = "gray"
-            colors.append(col)
-        
-        self.ax.bar(x, means, color=colors, edgecolor="white", linewidth=1.2)
-        
-        if len(all_pts) > 0:
-            avg = np.mean(all_pts)
-            self.ax.axhline(avg, linestyle="--", color="gray", linewidth=1.5, alpha=0.7, label="Flex Avg")
-            self.ax.text(len(x) - 0.5, avg + self.max_y * 0.02, str(int(avg)), fontsize=9)
-        
-        for i in range(len(means)):
+        for i in range(len(self.bars)):
+            bar = self.bars[i]
+            label = self.bar_labels[i]
+            
+            if i >= len(flex):
+                bar.set_visible(False)
+                label.set_visible(False)
+                continue
+            
             mean = means[i]
+            bar.set_height(mean)
+            
             if mean > 0:
-                self.ax.text(x[i], mean + self.max_y * 0.02, str(int(mean)), ha="center", fontsize=10)
+                label.set_position((x[i], mean + self.max_y * 0.02))
+                label.set_text(str(int(mean)))
+            else:
+                label.set_text("")
         
-        self.ax.set_xticks(x)
-        self.ax.set_xticklabels(flex)
-        self.ax.set_ylabel("Avg Season Points")
-        self.ax.set_xlabel("Position")
+        if len(all_pts) > 0:
+            avg = np.concatenate(all_pts).mean()
+            self.avg_line.set_ydata([avg, avg])
+            self.avg_label.set_position((len(x) - 0.5, avg + self.max_y * 0.02))
+            self.avg_label.set_text(str(int(avg)))
+        else:
+            self.avg_line.set_visible(False)
+            self.avg_label.set_visible(False)
         
         if self.superflex_check.isChecked() == True:
             sflex = " (Superflex)"
@@ -445,27 +500,121 @@ class FlexWidget(QWidget):
         title = "Flex-Level Production – " + str(size) + "-Team League" + sflex
         self.ax.set_title(title)
         
-        self.ax.set_ylim(0, self.max_y)
-        self.ax.spines["top"].set_visible(False)
-        self.ax.spines["right"].set_visible(False)
-        self.ax.yaxis.grid(True, alpha=0.3)
-        self.ax.legend(loc="upper right")
+        # Tick labels, the x range and the layout only change when QB is added or removed.
+        if tuple(flex) != self.layout_key:
+            self.layout_key = tuple(flex)
+            
+            self.ax.set_xticks(x)
+            self.ax.set_xticklabels(flex)
+            self.ax.relim(visible_only=True)
+            self.ax.autoscale_view(scalex=True, scaley=False)
+            
+            self.fig.tight_layout()
         
-        self.fig.tight_layout()
         self.canvas.draw_idle()
 
 
 # Defense Analysis Chart
 
+class CellLabels(Artist):
+    """
+    Draws the value of every heatmap cell with one artist. Cell centres are
+    transformed in one call and each distinct string is measured once, so a
+    redraw does not go through a Text artist per cell.
+    """
+    def __init__(self, ax, fontsize=8):
+        super().__init__()
+        
+        self.values = np.zeros((0, 0))
+        self.prop = FontProperties(size=fontsize)
+        self.extents = {}
+        
+        ax.add_artist(self)
+    
+    def set_values(self, values):
+        self.values = values
+        self.stale = True
+    
+    def labels(self):
+        """
+        Returns (text, color) for each cell, row by row.
+        """
+        out = []
+        for val in self.values.ravel():
+            if abs(val) > 1.5:
+                txt_col = "white"
+            else:
+                txt_col = "black"
+            
+            if val > 0:
+                sign = "+"
+            else:
+                sign = ""
+            
+            out.append((sign + str(round(val, 1)), txt_col))
+        return out
+    
+    def extent(self, renderer, txt):
+        key = (txt, renderer.dpi)
+        if key not in self.extents:
+            self.extents[key] = renderer.get_text_width_height_descent(txt, self.prop, ismath=False)
+        return self.extents[key]
+    
+    def draw(self, renderer):
+        if not self.get_visible() or self.values.size == 0:
+            return
+        
+        n_rows, n_cols = self.values.shape
+        rows, cols = np.divmod(np.arange(n_rows * n_cols), n_cols)
+        centres = self.axes.transData.transform(np.column_stack([cols, rows]))
+        
+        if renderer.flipy():
+            centres[:, 1] = renderer.height - centres[:, 1]
+        
+        gc = renderer.new_gc()
+        for (x, y), (txt, txt_col) in zip(centres, self.labels()):
+            w, h, d = self.extent(renderer, txt)
+            gc.set_foreground(txt_col)
+            # draw_text takes the baseline position; centre the text box on the cell.
+            renderer.draw_text(gc, x - w / 2, y + h / 2 - d, txt, self.prop, 0)
+        gc.restore()
+        
+        self.stale = False
+
+
 class DefenseWidget(QWidget):
-    def __init__(self, df):
+    def __init__(self, matrix=None):
         super().__init__()
         
-        self.df = df
+        self.matrix = None
+        self.index = None
         
         self.setup()
-        self.init_weeks()
-        self.update()
+        
+        if matrix is None:
+            self.show_message("Loading data...")
+        else:
+            self.set_data(matrix)
+    
+    def set_data(self, matrix):
+        self.matrix = matrix
+        self.index = DefenseIndex(matrix)
+        
+        yrs = []
+        if len(self.matrix.seasons) > 0:
+            yrs = list(self.matrix.seasons)
+        else:
+            yrs = [2024]
+        
+        self.year_combo.blockSignals(True)
+        self.year_combo.clear()
+        for y in yrs:
+            self.year_combo.addItem(str(int(y)))
+        if len(yrs) > 0:
+            self.year_combo.setCurrentText(str(int(max(yrs))))
+        self.year_combo.blockSignals(False)
+        
+        self.on_year_change()
     
     def setup(self):
         layout = QVBoxLayout(self)
@@ -476,15 +625,6 @@ class DefenseWidget(QWidget):
         controls.addWidget(QLabel("Season:"))
         
         self.year_combo = QComboBox()
-        yrs = []
-        if len(self.df) > 0:
-            yrs = sorted(self.df["season"].dropna().unique())
-        else:
-            yrs = [2024]
-        for y in yrs:
-            self.year_combo.addItem(str(int(y)))
-        if len(yrs) > 0:
-            self.year_combo.setCurrentText(str(int(max(yrs))))
         self.year_combo.currentTextChanged.connect(self.on_year_change)
         controls.addWidget(self.year_combo)
         
@@ -508,32 +648,74 @@ class DefenseWidget(QWidget):
         
         controls.addStretch()
         
+        self.debug_check = QCheckBox("Show redraw time")
+        self.debug_check.stateChanged.connect(self.toggle_debug)
+        controls.addWidget(self.debug_check)
+        
         self.fig, self.ax = plt.subplots(figsize=(8, 10))
         self.canvas = FigureCanvas(self.fig)
         layout.addWidget(self.canvas)
+        
+        # The image, colorbar and labels are created once; update() only changes their data.
+        self.image = self.ax.imshow(np.zeros((1, 1)), cmap=plt.cm.RdYlGn, aspect="auto", vmin=scale_min, vmax=scale_max)
+        self.colorbar = self.fig.colorbar(self.image, ax=self.ax, shrink=0.8, label="Points Allowed vs League Average")
+        self.cell_labels = CellLabels(self.ax, fontsize=8)
+        self.message = self.ax.text(0.5, 0.5, "", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
+        self.ax.set_xlabel("Position")
+        self.ax.set_ylabel("Opponent")
+        self.layout_key = None
+        
+        self.redraw_start = None
+        self.redraw_times = []
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+        
+        self.debug_label = QLabel(self.canvas)
+        self.debug_label.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: white; padding: 3px;")
+        self.debug_label.move(8, 8)
+        self.debug_label.hide()
     
     def init_weeks(self):
-        if len(self.df) == 0:
+        if self.matrix is None or len(self.matrix.seasons) == 0:
             return
         
         season = int(self.year_combo.currentText())
-        weeks = self.df[self.df["season"] == season]["week"].dropna().unique()
+        weeks = self.matrix.played_weeks(season)
         
         if len(weeks) > 0:
             self.week_start.setValue(int(min(weeks)))
             self.week_end.setValue(int(max(weeks)))
     
     def on_year_change(self):
+        # Setting both spin boxes would otherwise redraw the heatmap twice.
+        self.week_start.blockSignals(True)
+        self.week_end.blockSignals(True)
         self.init_weeks()
+        self.week_start.blockSignals(False)
+        self.week_end.blockSignals(False)
         self.update()
     
+    def show_message(self, msg):
+        self.image.set_visible(False)
+        self.cell_labels.set_visible(False)
+        self.colorbar.ax.set_visible(False)
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+        self.ax.set_title("")
+        # The ticks were just cleared, so the next chart has to label them again.
+        self.layout_key = None
+        
+        self.message.set_text(msg)
+        self.message.set_visible(True)
+        self.canvas.draw_idle()
+    
     def update(self):
-        self.fig.clear()
-        self.ax = self.fig.add_subplot(111)
+        if self.matrix is None:
+            return
         
-        if len(self.df) == 0:
-            self.ax.text(0.5, 0.5, "No data available.", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
-            self.canvas.draw_idle()
+        self.redraw_start = time.perf_counter()
+        
+        if len(self.matrix.seasons) == 0:
+            self.show_message("No data available.")
             return
         
         season = int(self.year_combo.currentText())
@@ -543,62 +725,46 @@ class DefenseWidget(QWidget):
         if w_start > w_end:
             w_start, w_end = w_end, w_start
         
-        df = self.df[self.df["season"] == season].copy()
-        df = df[df["week"] >= w_start]
-        df = df[df["week"] <= w_end]
-        df = df[~df["Opponent"].str.upper().isin(["BYE", "NONE", ""])]
-        df = df.dropna(subset=["Opponent", "TotalPoints"])
-        
-        if len(df) == 0:
-            self.ax.text(0.5, 0.5, "No data for selected filters.", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
-            self.canvas.draw_idle()
-            return
-        
-        week_avg = df.groupby(["week", "Pos"])["TotalPoints"].transform("mean")
-        df["PointsVsAvg"] = df["TotalPoints"] - week_avg
-        
-        heat = df.groupby(["Opponent", "Pos"])["PointsVsAvg"].mean().unstack(fill_value=0)
+        means, counts = self.index.points_vs_average(season, w_start, w_end)
         
         pos_list = []
+        cols = []
         for p in positions:
-            if p in heat.columns:
+            code = self.matrix.pos_code(p)
+            if code >= 0 and counts[:, code].sum() > 0:
                 pos_list.append(p)
-        heat = heat[pos_list]
-        heat = heat.sort_index()
+                cols.append(code)
         
-        if len(heat) == 0:
-            self.ax.text(0.5, 0.5, "No data for selected filters.", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
-            self.canvas.draw_idle()
+        rows = np.flatnonzero(counts[:, cols].sum(axis=1) > 0)
+        teams = [self.matrix.team_names[i] for i in rows]
+        heat = means[np.ix_(rows, cols)]
+        
+        if len(teams) == 0:
+            self.show_message("No data for selected filters.")
             return
         
-        im = self.ax.imshow(heat.values, cmap=plt.cm.RdYlGn, aspect="auto", vmin=scale_min, vmax=scale_max)
-        
-        self.ax.set_xticks(range(len(heat.columns)))
-        self.ax.set_xticklabels(heat.columns, fontsize=11)
-        self.ax.set_yticks(range(len(heat.index)))
-        self.ax.set_yticklabels(heat.index, fontsize=9)
-        
-        self.fig.colorbar(im, ax=self.ax, shrink=0.8, label="Points Allowed vs League Average")
-        
-        for i in range(len(heat.index)):
-            for j in range(len(heat.columns)):
-                val = heat.iloc[i, j]
-                
-                if abs(val) > 1.5:
-                    txt_col = "white"
-                else:
-                    txt_col = "black"
-                
-                if val > 0:
-                    sign = "+"
-                else:
-                    sign = ""
-                
-                txt = sign + str(round(val, 1))
-                self.ax.text(j, i, txt, ha="center", va="center", fontsize=8, color=txt_col)
+        self.message.set_visible(False)
+        self.image.set_visible(True)
+        self.cell_labels.set_visible(True)
+        self.colorbar.ax.set_visible(True)
         
-        self.ax.set_xlabel("Position")
-        self.ax.set_ylabel("Opponent")
+        self.image.set_data(heat)
+        self.image.set_extent((-0.5, len(pos_list) - 0.5, len(teams) - 0.5, -0.5))
+        self.cell_labels.set_values(heat)
+        
+        # Tick labels and the layout only change when the set of teams or positions does.
+        layout = (tuple(teams), tuple(pos_list))
+        if layout != self.layout_key:
+            self.layout_key = layout
+            
+            self.ax.set_xticks(range(len(pos_list)))
+            self.ax.set_xticklabels(pos_list, fontsize=11)
+            self.ax.set_yticks(range(len(teams)))
+            self.ax.set_yticklabels(teams, fontsize=9)
+            self.ax.set_xlim(-0.5, len(pos_list) - 0.5)
+            self.ax.set_ylim(len(teams) - 0.5, -0.5)
+            
+            self.fig.tight_layout()
         
         if w_start != w_end:
             label = "Wk " + str(w_start) + "-" + str(w_end)
@@ -608,32 +774,95 @@ class DefenseWidget(QWidget):
         title = "Points Allowed by Position (" + str(season) + ", " + label + ")"
         self.ax.set_title(title, fontsize=12, pad=10)
         
-        self.fig.tight_layout()
         self.canvas.draw_idle()
+    
+    def on_draw(self, event):
+        if self.redraw_start is None:
+            return
+        
+        elapsed = (time.perf_counter() - self.redraw_start) * 1000
+        self.redraw_start = None
+        
+        self.redraw_times.append(elapsed)
+        self.redraw_times = self.redraw_times[-20:]
+        
+        if self.debug_check.isChecked():
+            avg = sum(self.redraw_times) / len(self.redraw_times)
+            self.debug_label.setText(f"redraw {elapsed:.1f} ms (avg of last {len(self.redraw_times)}: {avg:.1f} ms)")
+            self.debug_label.adjustSize()
+    
+    def toggle_debug(self):
+        self.debug_label.setVisible(self.debug_check.isChecked())
+        if self.debug_check.isChecked():
+            self.debug_label.setText("redraw -")
+            self.debug_label.adjustSize()
 
 
 # Individual Performance Density Chart
 
 class DensityWidget(QWidget):
-    def __init__(self):
+    def __init__(self, matrix=None):
         super().__init__()
+        
+        self.cache = None
+        self.last = None
+        self.laid_out = False
+        
         self.setup()
+        
+        if matrix is not None:
+            self.set_data(matrix)
+    
+    def set_data(self, matrix):
+        self.cache = DensityCache(matrix)
     
     def setup(self):
         layout = QVBoxLayout(self)
         
+        controls = QHBoxLayout()
+        layout.addLayout(controls)
+        
+        controls.addWidget(QLabel("Bandwidth:"))
+        
+        self.rule_combo = QComboBox()
+        for rule in bandwidth_rules:
+            self.rule_combo.addItem(rule)
+        self.rule_combo.currentTextChanged.connect(self.redraw)
+        controls.addWidget(self.rule_combo)
+        
+        controls.addStretch()
+        
         self.fig, self.ax = plt.subplots(figsize=(8, 5))
         self.canvas = FigureCanvas(self.fig)
         layout.addWidget(self.canvas)
     
-    def update(self, name, pos, player_vals, pos_vals):
+    def redraw(self):
+        if self.last is not None:
+            self.update(*self.last)
+    
+    def update(self, name, pos, player_vals):
+        if self.cache is None:
+            return
+        
+        self.last = (name, pos, player_vals)
+        rule = self.rule_combo.currentText()
+        
+        # The position curve is cached; only the player's own games are estimated per click.
+        kde_pos = self.cache.position(pos, rule=rule)
+        try:
+            kde_player = binned_kde(player_vals, rule)
+        except ValueError:
+            kde_player = None
+        
         self.ax.clear()
         
-        kde_player = gaussian_kde(player_vals)
-        kde_pos = gaussian_kde(pos_vals)
+        if kde_pos is None or kde_player is None:
+            self.ax.text(0.5, 0.5, "Not enough games to estimate a distribution.", ha="center", va="center", transform=self.ax.transAxes, fontsize=12, color="gray")
+            self.canvas.draw_idle()
+            return
         
-        xmin = min(player_vals.min(), pos_vals.min())
-        xmax = max(player_vals.max(), pos_vals.max())
+        xmin = min(kde_player.lo, kde_pos.lo)
+        xmax = max(kde_player.hi, kde_pos.hi)
         xs = np.linspace(xmin, xmax, 200)
         
         self.ax.plot(xs, kde_player(xs), label=name, linewidth=2)
@@ -647,16 +876,25 @@ class DensityWidget(QWidget):
         self.ax.spines["right"].set_visible(False)
         self.ax.grid(True, alpha=0.3)
         
-        self.fig.tight_layout()
+        # The margins hardly change between players; tight_layout() alone would take most of a click.
+        if self.laid_out == False:
+            self.fig.tight_layout()
+            self.laid_out = True
         self.canvas.draw_idle()
 
 # Opportunity vs Efficiency Plot
 
 class EfficiencyWidget(QWidget):
-    def __init__(self, week_df, density_widget, tabs):
+    def __init__(self, density_widget, tabs, matrix=None, players=None, form=None, similar=None):
         super().__init__()
         
-        self.week_df = week_df
+        self.matrix = matrix
+        self.players = players
+        self.form = form
+        self.similar = similar
+        self.similar_task = None
+        self.comps_row = None
+        self.form_values = None
         self.density_widget = density_widget
         self.tabs = tabs
         self.df = None
@@ -664,6 +902,10 @@ class EfficiencyWidget(QWidget):
         self.annot = None
         self.sizes = None
         self.colors = None
+        self.highlight = None
+        self.index = None
+        self.background = None
+        self.hover_idx = -1
         
         self.setup()
         self.update()
@@ -708,10 +950,22 @@ class EfficiencyWidget(QWidget):
         self.week_combo.currentIndexChanged.connect(self.update)
         controls.addWidget(self.week_combo)
         
+        self.form_check = QCheckBox("Color by recent form")
+        self.form_check.stateChanged.connect(self.update)
+        controls.addWidget(self.form_check)
+        
+        self.comps_check = QCheckBox("List similar players on click")
+        controls.addWidget(self.comps_check)
+        
         controls.addStretch()
         
+        self.comps_label = QLabel("")
+        self.comps_label.setVisible(False)
+        layout.addWidget(self.comps_label)
+        
         self.canvas.mpl_connect("motion_notify_event", self.on_hover)
         self.canvas.mpl_connect("button_press_event", self.on_click)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
     
     def on_year_change(self):
         self.update_weeks()
@@ -743,7 +997,12 @@ class EfficiencyWidget(QWidget):
         self.week_combo.blockSignals(False)
     
     def update(self):
+        from data_repository import load_efficiency_data
+        
         self.ax.clear()
+        self.scatter = None
+        self.index = None
+        self.hover_idx = -1
         
         year = self.year_combo.currentText()
         week = self.week_combo.currentText()
@@ -785,6 +1044,16 @@ class EfficiencyWidget(QWidget):
             col = (0.5, 0.5, 0.5, 0.8)
         
         self.colors = np.full((len(self.df), 4), col)
+        self.form_values = self.recent_form(year, week)
+        
+        if self.form_values is not None:
+            # Red: scoring above the season average lately, blue: below. Players without form stay grey.
+            form = self.form_values["form"].to_numpy()
+            lim = np.nanmax(np.abs(form)) if np.isfinite(form).any() else 0
+            if lim > 0:
+                self.colors = plt.cm.coolwarm(np.clip(form / lim, -1, 1) / 2 + 0.5)
+                self.colors[np.isnan(form)] = (0.5, 0.5, 0.5, 0.8)
+            self.ax.set_title("Recent form: EWMA points vs season average", fontsize=10)
         
         self.scatter = self.ax.scatter(opp, eff, s=self.sizes, c=self.colors)
         
@@ -792,12 +1061,61 @@ class EfficiencyWidget(QWidget):
         self.ax.set_ylabel("Efficiency (Points per Opportunity)")
         self.ax.grid(True, linestyle=":")
         
-        self.annot = self.ax.annotate("", xy=(0, 0), xytext=(10, 10), textcoords="offset points", bbox=dict(boxstyle="round", fc="w"), arrowprops=dict(arrowstyle="->"))
+        # The hover marker and annotation are animated: full redraws skip them and
+        # on_hover() blits them over the cached background instead.
+        self.highlight = self.ax.scatter([], [], s=self.sizes.max() * 2, c=[(1.0, 0.843, 0.0, 1.0)], animated=True)
+        self.annot = self.ax.annotate("", xy=(0, 0), xytext=(10, 10), textcoords="offset points", bbox=dict(boxstyle="round", fc="w"), arrowprops=dict(arrowstyle="->"), animated=True)
         self.annot.set_visible(False)
         
         self.fig.tight_layout()
         self.canvas.draw_idle()
     
+    def recent_form(self, year, week):
+        """
+        Form of the plotted players as it stood after the selected week (or their
+        latest game for the full season), or None if it is off or not available.
+        """
+        if self.form_check.isChecked() == False or self.form is None:
+            return None
+        
+        if week == "full season":
+            week = None
+        
+        return self.form.lookup(self.df["PlayerId"].to_numpy(), int(year), week)
+    
+    def on_draw(self, event):
+        if self.scatter is None:
+            self.background = None
+            return
+        
+        # Cache everything but the hover artists, and re-index the points, whose
+        # pixel positions change on every resize, zoom or pan.
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        
+        offsets = np.ma.filled(np.ma.asarray(self.scatter.get_offsets(), dtype=np.float64), np.nan)
+        xy = self.ax.transData.transform(offsets)
+        radius = np.sqrt(self.sizes.max()) / 2 * self.fig.dpi / 72 + self.scatter.get_pickradius()
+        self.index = PointIndex(xy, radius)
+        
+        if self.hover_idx >= 0:
+            self.blit()
+    
+    def hit(self, event):
+        if self.index is None:
+            return -1
+        return self.index.nearest(event.x, event.y)
+    
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        
+        self.canvas.restore_region(self.background)
+        if self.hover_idx >= 0:
+            self.ax.draw_artist(self.highlight)
+            self.ax.draw_artist(self.annot)
+        self.canvas.blit(self.fig.bbox)
+    
     def on_hover(self, event):
         if event.inaxes != self.ax:
             return
@@ -805,33 +1123,32 @@ class EfficiencyWidget(QWidget):
         if self.scatter is None:
             return
         
-        cont, ind = self.scatter.contains(event)
+        idx = self.hit(event)
         
-        if cont == True:
-            idx = ind["ind"][0]
-            
-            self.annot.xy = self.scatter.get_offsets()[idx]
+        if idx == self.hover_idx:
+            return
+        
+        self.hover_idx = idx
+        
+        if idx >= 0:
+            xy = self.scatter.get_offsets()[idx]
+            self.highlight.set_offsets([xy])
+            self.annot.xy = xy
             
             row = self.df.iloc[idx]
             txt = "Name: " + str(row["PlayerName"]) + "\n"
             txt = txt + "Team: " + str(row["Team"]) + "\n"
             txt = txt + "Season Rank: " + str(row["Rank"])
+            if self.form_values is not None:
+                form = self.form_values.iloc[idx]
+                if not np.isnan(form["form"]):
+                    txt = txt + "\n" + "Form (EWMA pts): " + f"{form['TotalPoints_ewm']:.1f}" + " vs avg " + f"{form['TotalPoints_avg']:.1f}"
             self.annot.set_text(txt)
             self.annot.set_visible(True)
-            
-            current_colors = self.colors.copy()
-            current_sizes = self.sizes.copy()
-            current_colors[idx] = (1.0, 0.843, 0.0, 1.0)
-            current_sizes[idx] = current_sizes[idx] * 2
-            
-            self.scatter.set_facecolors(current_colors)
-            self.scatter.set_sizes(current_sizes)
         else:
             self.annot.set_visible(False)
-            self.scatter.set_facecolors(self.colors)
-            self.scatter.set_sizes(self.sizes)
         
-        self.canvas.draw_idle()
+        self.blit()
     
     def on_click(self, event):
         if event.inaxes != self.ax:
@@ -840,49 +1157,135 @@ class EfficiencyWidget(QWidget):
         if self.scatter is None:
             return
         
-        cont, ind = self.scatter.contains(event)
+        if self.comps_check.isChecked() == True:
+            idx = self.hit(event)
+            if idx >= 0:
+                self.show_comps(self.df.iloc[idx])
+            return
+        
+        # The player history is loaded in the background; ignore clicks until it arrives.
+        if self.matrix is None or self.players is None:
+            return
+        
+        idx = self.hit(event)
         
-        if cont == False:
+        if idx < 0:
             return
         
-        idx = ind["ind"][0]
         row = self.df.iloc[idx]
         name = row["PlayerName"]
         pos = row["Pos"]
         
-        player_data = self.week_df[self.week_df["PlayerName"] == name]["TotalPoints"]
-        pos_data = self.week_df[self.week_df["Pos"] == pos]["TotalPoints"]
-        
+        player_data = self.players.rows(row["PlayerId"])["TotalPoints"]
         player_vals = player_data.dropna().to_numpy()
-        pos_vals = pos_data.dropna().to_numpy()
         
         if len(player_vals) < 2:
             return
         
-        if len(pos_vals) < 2:
-            return
-        
-        self.density_widget.update(name, pos, player_vals, pos_vals)
+        self.density_widget.content().update(name, pos, player_vals)
         
         if self.tabs is not None:
             idx = self.tabs.indexOf(self.density_widget)
             if idx >= 0:
                 self.tabs.setCurrentIndex(idx)
+    
+    def show_comps(self, row, k=5):
+        """
+        Lists the player-seasons whose stat profile is closest to the clicked player's season.
+        """
+        year = self.year_combo.currentText()
+        name = str(row["PlayerName"])
+        
+        if self.similar is None:
+            # The index (and scipy with it) is only loaded the first time comps are asked for.
+            self.comps_row = row
+            if self.similar_task is None:
+                self.similar_task = LoadTask(load_similar)
+                self.similar_task.signals.done.connect(self.set_similar)
+                self.similar_task.signals.failed.connect(self.on_similar_failed)
+                QThreadPool.globalInstance().start(self.similar_task)
+            
+            self.comps_label.setText("Loading similar players...")
+            self.comps_label.setVisible(True)
+            return
+        
+        comps = self.similar.neighbors(row["PlayerId"], int(year), k)
+        
+        if comps is None or len(comps) == 0:
+            txt = "No " + year + " season stats for " + name + "."
+        else:
+            txt = "Players like " + name + " (" + year + "):"
+            for comp in comps.itertuples():
+                txt = txt + "\n" + comp.PlayerName + ", " + str(comp.season) + " " + comp.Team + " (distance " + f"{comp.distance:.2f}" + ")"
+        
+        self.comps_label.setText(txt)
+        self.comps_label.setVisible(True)
+    
+    def set_data(self, matrix, players):
+        self.matrix = matrix
+        self.players = players
+    
+    def set_form(self, form):
+        self.form = form
+        if self.form_check.isChecked() == True:
+            self.update()
+    
+    def set_similar(self, similar):
+        self.similar = similar
+        self.similar_task = None
+        
+        if self.comps_row is not None:
+            row = self.comps_row
+            self.comps_row = None
+            self.show_comps(row)
+    
+    def on_similar_failed(self, msg):
+        print("Could not load similar players: " + msg, file=sys.stderr)
+        self.similar_task = None
+        self.comps_row = None
+        self.comps_label.setText("Could not load similar players: " + msg)
+
+def load_season():
+    # pandas and the store modules are imported here, on the loader thread, so the window can show first.
+    from data_repository import load_season_data
+    
+    return load_season_data(path, years, positions)
+
+
+def load_weekly_data():
+    from data_repository import load_player_index
+    from points_matrix import load_points_matrix
+    
+    return load_points_matrix(path), load_player_index(path)
+
+
+def load_form():
+    from form import RecentForm
+    
+    form = RecentForm(path)
+    form.refresh()
+    return form
+
+
+def load_similar():
+    from similar import SimilarityIndex
+    
+    similar = SimilarityIndex(path)
+    similar.refresh()
+    return similar
+
 
 def main():
     app = QApplication(sys.argv)
     
-    season_df = load_season_data(path, years, positions)
-    week_df = load_week_data(path)
-    defense_df = load_defense_data(path)
-    
     tabs = QTabWidget()
     
-    scarcity = ScarcityWidget(season_df)
-    flex = FlexWidget(season_df)
-    defense = DefenseWidget(defense_df)
-    density = DensityWidget()
-    efficiency = EfficiencyWidget(week_df, density, tabs)
+    # Only the first tab is built up front; the rest are built when first selected.
+    scarcity = ScarcityWidget()
+    flex = LazyTab(FlexWidget)
+    defense = LazyTab(DefenseWidget)
+    density = LazyTab(DensityWidget)
+    efficiency = LazyTab(lambda: EfficiencyWidget(density, tabs))
     
     tabs.addTab(scarcity, "Positional Scarcity")
     tabs.addTab(flex, "Flex Analysis")
@@ -896,6 +1299,13 @@ def main():
     window.setCentralWidget(tabs)
     window.show()
     
+    loader = BackgroundLoader(window.statusBar())
+    loader.load("season data", load_season, [scarcity.set_data, flex.set_data])
+    loader.load("weekly data", load_weekly_data, [lambda data: defense.set_data(data[0]), lambda data: efficiency.set_data(data[0], data[1]), lambda data: density.set_data(data[0])])
+    # Form only colours the efficiency plot, so it loads on its own and never holds up the
+    # weekly data. Similar players are loaded by the plot on the first comps click.
+    loader.load("recent form", load_form, [lambda form: efficiency.forward("set_form", form)])
+    
     sys.exit(app.exec())
 
 
@@ -1,13 +1,16 @@
 import os
-import pandas as pd
 import matplotlib.pyplot as plt
 import tkinter as tk
 from tkinter import ttk
+from data_repository import get_repository
+from points_matrix import load_points_matrix
+from consistency_stats import ConsistencyTable
 
 
 class DataHandler:
     def __init__(self, base_dir):
         self.base_dir = os.path.abspath(base_dir)
+        self.repository = get_repository(self.base_dir)
 
     def load_all_weeks(self, position="DB"):
         """
@@ -21,69 +24,34 @@ class DataHandler:
                     1/DB.csv
                     2/DB.csv
         """
-        data = {}
+        return self.repository.all_weeks(position)
 
-        for year_folder in os.listdir(self.base_dir):
-            if year_folder.isdigit():  # Only folders like "2022"
-                year_path = os.path.join(self.base_dir, year_folder)
-                if not os.path.isdir(year_path):
-                    continue
-
-                week_data = {}
-
-                # Loop over week folders (1,2,3...)
-                for week_folder in os.listdir(year_path):
-                    week_path = os.path.join(year_path, week_folder)
-
-                    if week_folder.isdigit():  # Week numbers
-                        csv_file = os.path.join(week_path, f"{position}.csv")
-
-                        if os.path.exists(csv_file):
-                            try:
-                                df = pd.read_csv(csv_file)
-                                week_data[int(week_folder)] = df
-                            except:
-                                pass
-
-                if week_data:
-                    data[int(year_folder)] = week_data
-
-        return data
-
-
-def normalize_columns(df):
-    df = df.copy()
-    rename_map = {
-        "PlayerName": "player",
-        "TotalPoints": "points",
-        "FantasyPoints": "points"   # just in case
-    }
-    df.rename(columns=rename_map, inplace=True)
-    return df
-
-
-def plot_player_weekly_boxplot(all_data, player_name):
-    weekly_points = []
-
-    for year, weeks in sorted(all_data.items()):
-        for week, df in sorted(weeks.items()):
-            df = normalize_columns(df)
+    def load_consistency_table(self):
+        """
+        Weekly consistency statistics of every player at every position,
+        computed once from the points matrix (see consistency_stats.py).
+        """
+        return ConsistencyTable(load_points_matrix(self.base_dir), self.repository.player_index())
 
-            row = df[df["player"] == player_name]
 
-            if not row.empty:
-                pts = float(row["points"].values[0])
-                weekly_points.append(pts)
+def plot_player_weekly_boxplot(table, player_id, player_name):
+    box = table.boxplot_stats(player_id, label="Weekly Points")
 
-    if not weekly_points:
+    if box is None:
         print("Player not found.")
         return
 
-    plt.figure(figsize=(7, 5))
-    plt.boxplot(weekly_points, labels=["Weekly Points"])
-    plt.title(f"Consistency vs Ceiling (Weekly)\n{player_name}")
-    plt.ylabel("Fantasy Points")
-    plt.grid(True, linestyle="--", alpha=0.6)
+    row = table.player(player_id)
+
+    fig, ax = plt.subplots(figsize=(7, 5))
+    ax.bxp([box])
+    ax.set_title(f"Consistency vs Ceiling (Weekly)\n{player_name}")
+    ax.set_ylabel("Fantasy Points")
+    ax.grid(True, linestyle="--", alpha=0.6)
+
+    summary = (f"Games: {int(row['games'])}   Mean: {row['mean']:.1f}   CV: {row['cv']:.2f}\n"
+               f"Floor (10%): {row['floor']:.1f}   Ceiling (90%): {row['ceiling']:.1f}")
+    ax.text(0.02, 0.98, summary, transform=ax.transAxes, va="top", fontsize=9)
     plt.show()
 
 
@@ -94,16 +62,28 @@ def plot_player_weekly_boxplot(all_data, player_name):
 base_path = r"C:/Users/rsun2/Downloads/NFL-data-Players/NFL-data-Players"
 dh = DataHandler(base_dir=base_path)
 
-all_data = dh.load_all_weeks("DB")
+table = dh.load_consistency_table()
+
+
+def player_choices(pos):
+    """
+    Dropdown entries for one position, mapped to PlayerIds. Names shared by
+    several players get the PlayerId appended.
+    """
+    rows = table.position(pos)
+    counts = rows["PlayerName"].value_counts()
 
-# Build player list
-players = set()
-for year, weeks in all_data.items():
-    for week, df in weeks.items():
-        df = normalize_columns(df)
-        players.update(df["player"].dropna().unique())
+    choices = {}
+    for player_id, name in zip(rows.index, rows["PlayerName"]):
+        if counts[name] > 1:
+            choices[f"{name} ({player_id})"] = (player_id, name)
+        else:
+            choices[name] = (player_id, name)
+    return choices
 
-players = sorted(players)
+
+positions = sorted(table.career["Pos"].replace("", None).dropna().unique())
+choices = {}
 
 # ====================
 # TKINTER UI DROPDOWN
@@ -112,17 +92,33 @@ players = sorted(players)
 root = tk.Tk()
 root.title("Select Player")
 
+ttk.Label(root, text="Position:").pack(pady=5)
+
+pos_var = tk.StringVar(value="DB" if "DB" in positions else positions[0])
+pos_dropdown = ttk.Combobox(root, textvariable=pos_var, values=positions, width=10, state="readonly")
+pos_dropdown.pack(pady=5)
+
 label = ttk.Label(root, text="Choose a player:")
 label.pack(pady=5)
 
 player_var = tk.StringVar()
-dropdown = ttk.Combobox(root, textvariable=player_var, values=players, width=40)
+dropdown = ttk.Combobox(root, textvariable=player_var, values=[], width=40)
 dropdown.pack(pady=5)
 
+def on_position(event=None):
+    global choices
+    choices = player_choices(pos_var.get())
+    dropdown["values"] = sorted(choices)
+    player_var.set("")
+
 def on_select(event=None):
     player = player_var.get()
-    if player:
-        plot_player_weekly_boxplot(all_data, player)
+    if player in choices:
+        player_id, name = choices[player]
+        plot_player_weekly_boxplot(table, player_id, name)
+
+pos_dropdown.bind("<<ComboboxSelected>>", on_position)
+on_position()
 
 button = ttk.Button(root, text="Generate Plot", command=on_select)
 button.pack(pady=10)
@@ -0,0 +1,220 @@
+"""
+Week-to-week consistency numbers for every player, computed in one pass.
+
+Every player's weekly scores are a row of the points matrix (see
+points_matrix.py), so the statistics for all players of all positions are
+array operations over that matrix: rows are sorted once, and the quantiles
+are read from the sorted rows by index. The results are kept in two tables,
+one row per player over all seasons and one row per player and season.
+
+Weeks where the player's team had a bye, or the player was not on a team,
+are left out by default. The weekly files list every player in those weeks,
+mostly with 0 points, which would otherwise drag the floor of injured or
+released players down to zero.
+"""
+import numpy as np
+import pandas as pd
+
+columns = [
+    "games", "mean", "std", "cv", "min", "floor", "q1", "median", "q3", "ceiling", "max",
+    "whisker_low", "whisker_high",
+]
+
+# Floor and ceiling are the 10th and 90th percentile weeks.
+floor_q = 0.10
+ceiling_q = 0.90
+
+
+def sorted_quantiles(ordered, counts, q):
+    """
+    Linear-interpolated quantile of each row of a row-sorted array whose NaNs
+    are at the end, the same definition np.percentile uses by default.
+    """
+    pos = q * np.maximum(counts - 1, 0)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, np.maximum(counts - 1, 0))
+    frac = pos - lo
+
+    rows = np.arange(len(ordered))
+    out = ordered[rows, lo] * (1 - frac) + ordered[rows, hi] * frac
+    return np.where(counts > 0, out, np.nan)
+
+
+def row_stats(values, whis=1.5):
+    """
+    Consistency statistics of every row of a 2-d array of weekly scores.
+
+    Args:
+        values (np.ndarray): players x weeks, NaN where there was no game.
+        whis (float): Whisker reach in IQRs, as in matplotlib's boxplot.
+    Returns:
+        dict: Column name -> array with one value per row (see columns).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    played = ~np.isnan(values)
+    games = played.sum(axis=1)
+    has = games > 0
+
+    # np.sort puts NaNs last, so the first `games` entries of each row are its scores.
+    ordered = np.sort(values, axis=1)
+
+    filled = np.where(played, values, 0)
+    mean = np.divide(filled.sum(axis=1), games, out=np.full(len(games), np.nan), where=has)
+    dev = np.where(played, values - mean[:, None], 0)
+    std = np.sqrt(np.divide((dev ** 2).sum(axis=1), games, out=np.full(len(games), np.nan), where=has))
+    cv = np.divide(std, mean, out=np.full(len(games), np.nan), where=has & (mean != 0))
+
+    stats = {"games": games, "mean": mean, "std": std, "cv": cv}
+    stats["min"] = np.where(has, ordered[:, 0], np.nan)
+    stats["max"] = sorted_quantiles(ordered, games, 1.0)
+    stats["floor"] = sorted_quantiles(ordered, games, floor_q)
+    stats["q1"] = sorted_quantiles(ordered, games, 0.25)
+    stats["median"] = sorted_quantiles(ordered, games, 0.5)
+    stats["q3"] = sorted_quantiles(ordered, games, 0.75)
+    stats["ceiling"] = sorted_quantiles(ordered, games, ceiling_q)
+
+    # Whiskers end at the most extreme scores still within whis * IQR of the box,
+    # but never inside the box itself (matplotlib's rule).
+    iqr = stats["q3"] - stats["q1"]
+    low_limit = (stats["q1"] - whis * iqr)[:, None]
+    high_limit = (stats["q3"] + whis * iqr)[:, None]
+    inside = played & (values >= low_limit) & (values <= high_limit)
+    whisker_low = np.minimum(np.where(inside, values, np.inf).min(axis=1), stats["q1"])
+    whisker_high = np.maximum(np.where(inside, values, -np.inf).max(axis=1), stats["q3"])
+    stats["whisker_low"] = np.where(has, whisker_low, np.nan)
+    stats["whisker_high"] = np.where(has, whisker_high, np.nan)
+
+    return stats
+
+
+class ConsistencyTable:
+    def __init__(self, matrix, players=None, include_byes=False):
+        """
+        Args:
+            matrix (PointsMatrix): Weekly points of every player (see points_matrix.py).
+            players (PlayerIndex): If given, player names are added to the tables.
+            include_byes (bool): If set to True, bye-week and free-agent rows count as games.
+        """
+        self.matrix = matrix
+        self.include_byes = include_byes
+
+        points = np.asarray(matrix.points, dtype=np.float64)
+        if not include_byes:
+            points = np.where(np.asarray(matrix.opponents) >= 0, points, np.nan)
+        self.points = points
+
+        n_players, n_seasons, n_weeks = points.shape
+
+        career = pd.DataFrame(row_stats(points.reshape(n_players, -1)), columns=columns)
+        career.insert(0, "PlayerId", matrix.player_ids)
+
+        by_season = pd.DataFrame(row_stats(points.reshape(n_players * n_seasons, n_weeks)), columns=columns)
+        by_season.insert(0, "season", np.tile(matrix.seasons, n_players))
+        by_season.insert(0, "PlayerId", np.repeat(matrix.player_ids, n_seasons))
+        by_season = by_season[by_season["games"] > 0]
+
+        # The position a player's stats are listed under is the one they held in their latest game.
+        pos_codes = np.asarray(matrix.positions).reshape(n_players, -1)
+        has_pos = pos_codes >= 0
+        last = np.where(has_pos.any(axis=1), pos_codes.shape[1] - 1 - np.argmax(has_pos[:, ::-1], axis=1), -1)
+        codes = np.where(last >= 0, pos_codes[np.arange(n_players), np.maximum(last, 0)], -1)
+        pos_names = np.array(list(matrix.pos_names) + [""], dtype=object)
+        career.insert(1, "Pos", pos_names[codes])
+
+        season_codes = np.asarray(matrix.positions).reshape(n_players * n_seasons, n_weeks)
+        has_pos = season_codes >= 0
+        last = n_weeks - 1 - np.argmax(has_pos[:, ::-1], axis=1)
+        codes = np.where(has_pos.any(axis=1), season_codes[np.arange(len(season_codes)), last], -1)
+        by_season.insert(2, "Pos", pos_names[codes[by_season.index.to_numpy()]])
+
+        if players is not None:
+            names = players.players["PlayerName"]
+            career.insert(1, "PlayerName", names.reindex(career["PlayerId"]).to_numpy())
+            by_season.insert(1, "PlayerName", names.reindex(by_season["PlayerId"]).to_numpy())
+
+        self.career = career.set_index("PlayerId")
+        self.by_season = by_season.set_index(["PlayerId", "season"]).sort_index()
+
+    def player(self, player_id, season=None):
+        """
+        Returns one player's statistics, over all seasons or for one season.
+
+        Args:
+            player_id (int): PlayerId.
+            season (int): If given, only that season.
+        Returns:
+            pd.Series: One row of the table, or None if the player has no games there.
+        """
+        key = int(player_id) if season is None else (int(player_id), int(season))
+        table = self.career if season is None else self.by_season
+
+        if key not in table.index:
+            return None
+
+        row = table.loc[key]
+        if row["games"] == 0:
+            return None
+        return row
+
+    def position(self, pos, season=None, min_games=1):
+        """
+        Returns the statistics of every player at a position, most consistent
+        (lowest cv) first. Players averaging zero or fewer points are listed last,
+        since their cv says nothing about consistency.
+
+        Args:
+            pos (string): Position.
+            season (int): If given, only that season.
+            min_games (int): Leave out players with fewer games.
+        Returns:
+            pd.DataFrame: Rows of the table.
+        """
+        if season is None:
+            table = self.career
+        else:
+            table = self.by_season.xs(int(season), level="season")
+
+        table = table[(table["Pos"] == pos) & (table["games"] >= min_games)]
+        order = np.where(table["mean"] > 0, table["cv"], np.inf)
+        return table.iloc[np.argsort(order, kind="stable")]
+
+    def weekly_points(self, player_id):
+        """
+        Returns the scores the statistics were computed from, oldest first.
+        """
+        i = int(np.searchsorted(self.matrix.player_ids, player_id))
+        if i >= len(self.matrix.player_ids) or self.matrix.player_ids[i] != player_id:
+            return np.array([])
+
+        row = self.points[i].ravel()
+        return row[~np.isnan(row)]
+
+    def boxplot_stats(self, player_id, season=None, label=""):
+        """
+        Returns the player's box in the form matplotlib's Axes.bxp draws, so the
+        plot needs no recomputation. Fliers are read from the player's own row.
+        """
+        row = self.player(player_id, season)
+        if row is None:
+            return None
+
+        if season is None:
+            pts = self.weekly_points(player_id)
+        else:
+            s = self.matrix.season_index(season)
+            i = int(np.searchsorted(self.matrix.player_ids, player_id))
+            pts = self.points[i, s]
+            pts = pts[~np.isnan(pts)]
+
+        fliers = pts[(pts < row["whisker_low"]) | (pts > row["whisker_high"])]
+
+        return {
+            "label": label,
+            "med": row["median"],
+            "q1": row["q1"],
+            "q3": row["q3"],
+            "whislo": row["whisker_low"],
+            "whishi": row["whisker_high"],
+            "mean": row["mean"],
+            "fliers": fliers,
+        }
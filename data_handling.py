@@ -1,9 +1,74 @@
+import hashlib
+import json
 import pandas as pd
-import os
+from data_repository import get_repository
+from data_store import compile_store, read_manifest, read_partition, store_dir
+from schema import categorize
+
+class WeekAggregateBuilder:
+    def __init__(self, repository, columns):
+        """
+        Incrementally builds one frame out of every weekly position file.
+
+        The rows come from the compiled store's weekly partitions, one per
+        season, rather than from the repository's file cache, so a full-tree
+        aggregate does not evict the frames the widgets use. A season is read
+        again only when its week folders changed in the store's manifest, and
+        the pieces are joined with a single concat.
+
+        Args:
+            repository (DataRepository): Repository of the data tree.
+            columns (list): Columns kept from each file.
+        """
+        self.repository = repository
+        self.columns = columns
+        self.year_hashes = {}
+        self.pieces = {}
+        self.df = pd.DataFrame(columns=columns)
+
+    def manifest_hashes(self):
+        """
+        Fingerprint of each season's week folders in the store manifest.
+        """
+        folders = {}
+        for key, files in read_manifest(store_dir(self.repository.base)).items():
+            if '/' in key:
+                folders.setdefault(key.split('/')[0], {})[key] = files
+
+        hashes = {}
+        for year, weeks in folders.items():
+            hashes[year] = hashlib.md5(json.dumps(weeks, sort_keys=True).encode()).hexdigest()
+        return hashes
+
+    def update(self, workers=None):
+        # Unreadable files are reported by the compile and left out until they parse.
+        compile_store(self.repository.base, workers=workers)
+
+        new = self.manifest_hashes()
+        changed = [year for year in set(self.year_hashes) | set(new) if self.year_hashes.get(year) != new.get(year)]
+        if len(changed) == 0:
+            return self.df
+
+        out = store_dir(self.repository.base)
+        for year in changed:
+            df = read_partition(out, 'weekly', year)
+            if df is None or len(df) == 0:
+                self.pieces.pop(year, None)
+            else:
+                self.pieces[year] = df[self.columns]
+        self.year_hashes = new
+
+        if len(self.pieces) > 0:
+            self.df = categorize(pd.concat([self.pieces[year] for year in sorted(self.pieces)], ignore_index=True))
+        else:
+            self.df = pd.DataFrame(columns=self.columns)
+        return self.df
 
 class DataHandler:
     def __init__(self):
         self.file_path = 'NFL-Data/NFL-data-Players'
+        self.repository = get_repository(self.file_path)
+        self.week_builder = WeekAggregateBuilder(self.repository, ['PlayerName', 'Team', 'Pos', 'TotalPoints'])
         self.aggregate_week_df = self.get_aggregate_week_data()
 
     def extract_data(self, year: str = '2025', week: str = 'full season', projected: bool = False, position: str = 'QB'):
@@ -19,44 +84,47 @@ class DataHandler:
             pd.DataFrame: Player data from season.
         """
         
-        file_path = self.file_path
         if week == 'full season' or year in ('2020', '2019', '2018', '2017', '2016', '2015'):
-            file_path += f'/{year}/{position}_season.csv'
+            week = 'full season'
         elif year in ('2021', '2022', '2023', '2024', '2025'):
             if not projected:
-                file_path += f'/{year}/{week}/{position}.csv'
-                if not os.path.exists(file_path):
-                    file_path = self.file_path
+                if not self.repository.frame_path(year, week, position).exists():
                     projected = True
             if projected:
-                file_path += f'/{year}/{week}/projected/{position}_projected.csv'
-                print(file_path)
+                print(self.repository.frame_path(year, week, position, projected=True))
         else:
             print('INVALID EXTRACTION')
             return None
         
-        if os.path.exists(file_path):
-            return pd.read_csv(file_path)
-        else:
-            print(f'File does not exist: {file_path}')
-            return None
-        
-    def get_aggregate_week_data(self):
-        df = pd.DataFrame(columns=['PlayerName', 'Team', 'Pos', 'TotalPoints'])
-        for year_folder in os.listdir(self.file_path):
-            year_file_path = os.path.join(self.file_path, year_folder)
-            for week_folder in os.listdir(year_file_path):
-                if week_folder.isdigit():
-                    week_file_path = os.path.join(year_file_path, week_folder)
-                    for position_file in os.listdir(week_file_path):
-                        if position_file.endswith('.csv'):
-                            full_path = os.path.join(week_file_path, position_file)
-                            rows = pd.read_csv(full_path)[['PlayerName', 'Team', 'Pos', 'TotalPoints']]
-                            df = pd.concat([df, rows], ignore_index=True)
+        df = self.repository.get_frame(year, week, position, projected)
+        if df is None:
+            print(f'File does not exist: {self.repository.frame_path(year, week, position, projected)}')
         return df
+        
+    def get_aggregate_week_data(self, workers=None):
+        """
+        Returns every weekly row in the tree. Seasons read by an earlier call
+        are kept, so calling this again only reads seasons whose week folders
+        were added or changed since.
+
+        Args:
+            workers (int): Processes used to compile changed files. Defaults to the number of CPUs.
+        """
+        return self.week_builder.update(workers)
     
     def get_specific_player_data(self, player_name):
-        return self.aggregate_week_df[self.aggregate_week_df['PlayerName'] == player_name]
+        """
+        Returns the weekly rows of every player with this name, oldest first.
+        Names are not unique; use get_player_data_by_id to get a single career.
+        """
+        index = self.repository.player_index()
+        rows = [index.rows(player_id) for player_id in index.ids_for_name(player_name)]
+        if len(rows) == 0:
+            return index.weekly.iloc[0:0]
+        return pd.concat(rows)
+
+    def get_player_data_by_id(self, player_id):
+        return self.repository.player_index().rows(player_id)
 
 if __name__ == '__main__':
     datahandler = DataHandler()
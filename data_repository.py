@@ -0,0 +1,277 @@
+"""
+Shared access point for the player data used by every widget and script.
+
+A process holds one DataRepository per data tree (see ``get_repository``).
+Single files are cached in a size-bounded LRU keyed by
+(year, week, position, projected), so each CSV is parsed at most once while
+it stays in the cache. Whole-tree tables come from the compiled store in
+data_store.py and are read once per process.
+
+Frames handed out are shared between callers and must be treated as
+read-only; copy before modifying. The caches are guarded by locks so
+background loaders and the UI thread can share one repository.
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import pandas as pd
+from data_store import load_table, read_csv_files
+from schema import apply_schema, family_for, read_player_csv
+from players import PlayerIndex
+from scoring import ScoringEngine
+
+path = Path("NFL-Data") / "NFL-data-Players"
+positions = ["QB", "RB", "WR", "TE"]
+
+
+class DataRepository:
+    def __init__(self, base=path, max_frames=512):
+        self.base = Path(base)
+        self.max_frames = max_frames
+        self.frames = OrderedDict()
+        self.tables = {}
+        self.players = None
+        self.scoring = ScoringEngine(self.base, self.table)
+        self.frame_lock = threading.Lock()
+        self.table_lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def frame_path(self, year, week, position, projected=False):
+        year = str(year)
+        week = str(week)
+
+        if week == "full season":
+            return self.base / year / (position + "_season.csv")
+        if projected:
+            return self.base / year / week / "projected" / (position + "_projected.csv")
+        return self.base / year / week / (position + ".csv")
+
+    def get_frame(self, year, week, position, projected=False):
+        """
+        Returns the contents of a single player CSV, parsing it only on the first request.
+
+        Args:
+            year (string): Season year
+            week (string): Season week, or 'full season' for the season totals file.
+            position (string): Position file to read.
+            projected (bool): If set to True, reads the projected/ file for that week.
+        Returns:
+            pd.DataFrame: File contents, or None if the file does not exist.
+        """
+        with self.frame_lock:
+            if str(week) == "full season":
+                projected = False
+
+            key = (str(year), str(week), position, bool(projected))
+
+            if key in self.frames:
+                self.hits += 1
+                self.frames.move_to_end(key)
+                return self.frames[key]
+
+            f = self.frame_path(year, week, position, projected)
+            if not f.exists():
+                return None
+
+            self.misses += 1
+            df = read_player_csv(f)
+
+            self.frames[key] = df
+            while len(self.frames) > self.max_frames:
+                self.frames.popitem(last=False)
+
+            return df
+
+    def get_frames(self, keys, workers=None):
+        """
+        Batch version of get_frame. Files missing from the cache are parsed
+        together on a process pool (see data_store.read_csv_files) and cast to
+        their family's schema.
+
+        Args:
+            keys (list): (year, week, position, projected) tuples.
+            workers (int): Pool size. Defaults to the number of CPUs.
+        Returns:
+            tuple: (frames in the order of keys, with None for missing or unreadable files,
+                    list of (file path, error message) for files that failed to parse)
+        """
+        with self.frame_lock:
+            frames = [None] * len(keys)
+            todo = []
+
+            for i, (year, week, position, projected) in enumerate(keys):
+                if str(week) == "full season":
+                    projected = False
+                key = (str(year), str(week), position, bool(projected))
+
+                if key in self.frames:
+                    self.hits += 1
+                    self.frames.move_to_end(key)
+                    frames[i] = self.frames[key]
+                    continue
+
+                f = self.frame_path(year, week, position, projected)
+                if f.exists():
+                    todo.append((i, key, f))
+
+            jobs = [(f, None, None) for i, key, f in todo]
+            read, errors = read_csv_files(jobs, workers)
+
+            for (i, key, f), df in zip(todo, read):
+                if df is None:
+                    continue
+                # Same dtypes as get_frame, whichever path reads the file first.
+                df = apply_schema(df, family_for(f))
+                self.misses += 1
+                frames[i] = df
+                self.frames[key] = df
+
+            while len(self.frames) > self.max_frames:
+                self.frames.popitem(last=False)
+
+            return frames, errors
+
+    def table(self, name):
+        with self.table_lock:
+            if name not in self.tables:
+                self.tables[name] = load_table(name, self.base)
+            return self.tables[name]
+
+    def scored_table(self, name, scoring=None):
+        """
+        Returns a whole-tree table, with TotalPoints and Rank recomputed under a
+        scoring configuration (see scoring.py) unless scoring is None.
+        """
+        if scoring is None:
+            return self.table(name)
+
+        # table_lock only guards the engine swap in clear(); the engine serializes
+        # its own evaluation and cache writes, so table() callers are not held up.
+        with self.table_lock:
+            engine = self.scoring
+        return engine.scored(name, scoring)
+
+    def clear(self):
+        with self.frame_lock:
+            self.frames.clear()
+        with self.table_lock:
+            self.tables.clear()
+            self.players = None
+            self.scoring = ScoringEngine(self.base, self.table)
+
+    def player_index(self):
+        with self.table_lock:
+            if self.players is None:
+                self.players = PlayerIndex(self.table("weekly"), self.table("season"))
+            return self.players
+
+    def season_data(self, years, pos_list, scoring=None):
+        df = self.scored_table("season", scoring)
+
+        for col in ["PlayerName", "Pos", "Rank", "TotalPoints"]:
+            if col not in df.columns:
+                return pd.DataFrame()
+
+        df = df[df["season"].isin(years) & df["Pos"].isin(pos_list)]
+        df = df[["season", "PlayerName", "Pos", "Rank", "TotalPoints"]]
+        return df.reset_index(drop=True)
+
+    def week_data(self, scoring=None):
+        df = self.scored_table("weekly", scoring)
+
+        for col in ["PlayerName", "Team", "Pos", "TotalPoints"]:
+            if col not in df.columns:
+                return pd.DataFrame()
+
+        return df[["PlayerName", "Team", "Pos", "TotalPoints"]]
+
+    def defense_data(self, pos_list=positions):
+        df = self.table("weekly")
+
+        for col in ["PlayerOpponent", "TotalPoints"]:
+            if col not in df.columns:
+                return pd.DataFrame()
+
+        df = df[df["Pos"].isin(pos_list)]
+        df = df[["PlayerName", "Pos", "PlayerOpponent", "TotalPoints", "season", "week"]].copy()
+        df["Opponent"] = df["PlayerOpponent"].str.replace("@", "", regex=False).str.strip()
+        return df.reset_index(drop=True)
+
+    def week_folders(self):
+        """
+        Lists the numbered week folders in the tree.
+
+        Returns:
+            list: (year, week) pairs as ints, in chronological order.
+        """
+        found = []
+
+        if not self.base.exists():
+            return found
+
+        for year_folder in self.base.iterdir():
+            if not year_folder.is_dir() or not year_folder.name.isdigit():
+                continue
+            for week_folder in year_folder.iterdir():
+                if week_folder.is_dir() and week_folder.name.isdigit():
+                    found.append((int(year_folder.name), int(week_folder.name)))
+
+        return sorted(found)
+
+    def all_weeks(self, position):
+        """
+        Groups every weekly file of one position by season and week.
+
+        Returns:
+            dict: year -> {week -> pd.DataFrame}
+        """
+        data = {}
+
+        folders = self.week_folders()
+        keys = [(year, week, position, False) for year, week in folders]
+        frames, errors = self.get_frames(keys)
+
+        for f, err in errors:
+            print(f"Skipping unreadable file {f}: {err}")
+
+        for (year, week), df in zip(folders, frames):
+            if df is None:
+                continue
+            data.setdefault(year, {})[week] = df
+
+        return data
+
+
+repositories = {}
+repositories_lock = threading.Lock()
+
+
+def get_repository(base=path):
+    key = Path(base).resolve()
+
+    with repositories_lock:
+        if key not in repositories:
+            repositories[key] = DataRepository(base)
+
+        return repositories[key]
+
+
+def load_season_data(base, years, pos_list, scoring=None):
+    return get_repository(base).season_data(years, pos_list, scoring)
+
+
+def load_week_data(folder, scoring=None):
+    return get_repository(folder).week_data(scoring)
+
+
+def load_defense_data(folder):
+    return get_repository(folder).defense_data()
+
+
+def load_efficiency_data(folder, year, week, pos):
+    return get_repository(folder).get_frame(year, week, pos)
+
+
+def load_player_index(folder):
+    return get_repository(folder).player_index()
@@ -0,0 +1,364 @@
+"""
+Compiled, columnar copy of the NFL-data-Players tree.
+
+The raw tree is ~1,400 small CSVs split by year, week and position. Reading
+them on every launch dominates start-up, so this module compiles them into
+three tables, each stored as one binary partition per season:
+
+    weekly     every <year>/<week>/<POS>.csv, with season and week columns
+    season     every <year>/<POS>_season.csv, with a season column
+    projected  every <year>/<week>/projected/<POS>_projected.csv, with season and week columns
+
+A manifest records the size and mtime of every source file, grouped by the
+folder it lives in ("2021" for season files, "2021/3" for a week folder).
+Only folders whose files changed are re-read on the next compile.
+
+Run ``python data_store.py`` to compile ahead of time; ``load_table`` also
+refreshes the store on demand.
+"""
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+from schema import apply_schema, categorize
+
+path = Path("NFL-Data") / "NFL-data-Players"
+tables = ["weekly", "season", "projected"]
+manifest_name = "manifest.json"
+store_version = 2
+
+# Below this many files a process pool costs more to start than it saves.
+parallel_min_files = 32
+
+compile_lock = threading.Lock()
+
+
+def store_dir(base):
+    return Path(base).parent / ".store"
+
+
+def scan_tree(base):
+    """
+    Stats every CSV under the data tree without reading it.
+
+    Args:
+        base (Path): Root of the NFL-data-Players tree.
+    Returns:
+        dict: Folder key ("2021" or "2021/3") -> {relative file path: [size, mtime_ns]}.
+    """
+    base = Path(base)
+    folders = {}
+
+    if not base.exists():
+        return folders
+
+    for year_entry in os.scandir(base):
+        if not year_entry.is_dir() or not year_entry.name.isdigit():
+            continue
+
+        year_files = {}
+        for entry in os.scandir(year_entry.path):
+            if entry.is_file() and entry.name.endswith("_season.csv"):
+                st = entry.stat()
+                year_files[year_entry.name + "/" + entry.name] = [st.st_size, st.st_mtime_ns]
+            elif entry.is_dir() and entry.name.isdigit():
+                key = year_entry.name + "/" + entry.name
+                week_files = {}
+                for sub in [entry.path, os.path.join(entry.path, "projected")]:
+                    if not os.path.isdir(sub):
+                        continue
+                    for f in os.scandir(sub):
+                        if f.is_file() and f.name.endswith(".csv"):
+                            st = f.stat()
+                            rel = os.path.relpath(f.path, base).replace(os.sep, "/")
+                            week_files[rel] = [st.st_size, st.st_mtime_ns]
+                if week_files:
+                    folders[key] = week_files
+
+        if year_files:
+            folders[year_entry.name] = year_files
+
+    return folders
+
+
+def read_manifest(out):
+    f = Path(out) / manifest_name
+
+    if not f.exists():
+        return {}
+
+    with open(f) as fh:
+        manifest = json.load(fh)
+
+    if manifest.get("version") != store_version:
+        return {}
+
+    return manifest.get("folders", {})
+
+
+def write_manifest(out, folders):
+    f = Path(out) / manifest_name
+    tmp = f.with_suffix(".tmp")
+
+    with open(tmp, "w") as fh:
+        json.dump({"version": store_version, "folders": folders}, fh)
+
+    os.replace(tmp, f)
+
+
+def partition_path(out, table, year):
+    return Path(out) / table / (str(year) + ".pkl")
+
+
+def write_partition(out, table, year, df):
+    f = partition_path(out, table, year)
+
+    if df is None or len(df) == 0:
+        if f.exists():
+            f.unlink()
+        return
+
+    f.parent.mkdir(parents=True, exist_ok=True)
+    tmp = f.with_suffix(".tmp")
+    df.to_pickle(tmp)
+    os.replace(tmp, f)
+
+
+def read_partition(out, table, year):
+    f = partition_path(out, table, year)
+
+    if not f.exists():
+        return None
+
+    return pd.read_pickle(f)
+
+
+def read_csv_job(job):
+    """
+    Reads one CSV for read_csv_files. Runs inside worker processes, so it
+    returns the error message instead of raising.
+
+    Args:
+        job (tuple): (file path, season or None, week or None)
+    Returns:
+        tuple: (pd.DataFrame or None, error message or None)
+    """
+    f, season, week = job
+
+    try:
+        df = pd.read_csv(f)
+    except (OSError, ValueError) as e:
+        return None, type(e).__name__ + ": " + str(e)
+
+    if season is not None:
+        df["season"] = season
+    if week is not None:
+        df["week"] = week
+    return df, None
+
+
+def read_csv_files(jobs, workers=None):
+    """
+    Reads many CSVs, spreading them over a process pool when there are enough
+    of them to pay for starting one.
+
+    Args:
+        jobs (list): (file path, season or None, week or None) tuples.
+        workers (int): Pool size. Defaults to the number of CPUs; 1 reads serially.
+    Returns:
+        tuple: (frames in the same order as jobs, with None for failed files,
+                list of (file path, error message) for every failed file)
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(jobs) < parallel_min_files:
+        results = [read_csv_job(job) for job in jobs]
+    else:
+        chunk = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(read_csv_job, jobs, chunksize=chunk))
+
+    frames = []
+    errors = []
+    for job, (df, err) in zip(jobs, results):
+        frames.append(df)
+        if err is not None:
+            errors.append((str(job[0]), err))
+
+    return frames, errors
+
+
+def concat_frames(frames):
+    frames = [df for df in frames if df is not None]
+
+    if len(frames) == 0:
+        return pd.DataFrame()
+
+    return categorize(pd.concat(frames, ignore_index=True))
+
+
+def compact_frames(frames):
+    """
+    Joins freshly parsed files and casts the result to the declared schema.
+    Casting once per partition is much cheaper than per file for files this small.
+    """
+    frames = [df for df in frames if df is not None]
+
+    if len(frames) == 0:
+        return None
+
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def table_for(rel):
+    if rel.endswith("_season.csv"):
+        return "season"
+    if "/projected/" in rel:
+        return "projected"
+    return "weekly"
+
+
+def compile_store(base=path, out=None, rebuild=False, workers=None):
+    """
+    Brings the compiled store in line with the CSV tree, re-reading only the
+    folders whose files were added, removed or modified since the last compile.
+
+    Files that fail to parse are reported and left out of the manifest, so
+    their folder is retried on the next compile. Calls from several threads
+    are serialized.
+
+    Args:
+        base (Path): Root of the NFL-data-Players tree.
+        out (Path): Store directory. Defaults to a .store folder next to the tree.
+        rebuild (bool): If set to True, ignores the manifest and recompiles everything.
+        workers (int): Processes used to parse CSVs. See read_csv_files.
+    Returns:
+        list: Folder keys that were recompiled.
+    """
+    with compile_lock:
+        base = Path(base)
+        if out is None:
+            out = store_dir(base)
+        out = Path(out)
+
+        new = scan_tree(base)
+        old = {} if rebuild else read_manifest(out)
+
+        # A missing partition means the store was tampered with; recompile that year.
+        for key in list(old):
+            year = key.split("/")[0]
+            table = "season" if key == year else "weekly"
+            if not partition_path(out, table, year).exists():
+                old.pop(key)
+
+        changed = set()
+        for key in set(old) | set(new):
+            if old.get(key) != new.get(key):
+                changed.add(key)
+
+        if len(changed) == 0:
+            return []
+
+        out.mkdir(parents=True, exist_ok=True)
+
+        if len(old) == 0:
+            # Nothing trustworthy on disk, so start every table from scratch.
+            for table in tables:
+                for f in (out / table).glob("*.pkl"):
+                    f.unlink()
+
+        # Read every changed folder in one batch so the pool sees the whole workload.
+        jobs = []
+        targets = []
+        for key in sorted(changed):
+            parts = key.split("/")
+            season = int(parts[0])
+            week = int(parts[1]) if len(parts) == 2 else None
+            for rel in sorted(new.get(key, {})):
+                jobs.append((base / rel, season, week))
+                targets.append((table_for(rel), parts[0], key, rel))
+
+        frames, errors = read_csv_files(jobs, workers)
+
+        for f, err in errors:
+            print(f"Skipping unreadable file {f}: {err}")
+
+        pieces = {}
+        for (table, year, key, rel), df in zip(targets, frames):
+            if df is None:
+                new[key].pop(rel)
+                continue
+            pieces.setdefault((table, year), []).append(df)
+
+        for year in sorted(set(key.split("/")[0] for key in changed)):
+            if year in changed:
+                write_partition(out, "season", year, compact_frames(pieces.get(("season", year), [])))
+
+            changed_weeks = []
+            for key in changed:
+                parts = key.split("/")
+                if len(parts) == 2 and parts[0] == year:
+                    changed_weeks.append(int(parts[1]))
+
+            if len(changed_weeks) == 0:
+                continue
+
+            for table in ["weekly", "projected"]:
+                frames = []
+
+                old_df = read_partition(out, table, year)
+                if old_df is not None and len(old_df) > 0:
+                    frames.append(old_df[~old_df["week"].isin(changed_weeks)])
+                frames.append(compact_frames(pieces.get((table, year), [])))
+
+                df = concat_frames(frames)
+                if len(df) > 0:
+                    df = df.sort_values("week", kind="stable").reset_index(drop=True)
+                write_partition(out, table, year, df)
+
+        write_manifest(out, new)
+        return sorted(changed)
+
+
+def load_table(name, base=path, refresh=True, columns=None):
+    """
+    Reads one compiled table.
+
+    Args:
+        name (string): One of "weekly", "season" or "projected".
+        base (Path): Root of the NFL-data-Players tree.
+        refresh (bool): If set to True, recompiles changed folders before reading.
+        columns (list): If given, only these columns are kept. Missing ones are skipped.
+    Returns:
+        pd.DataFrame: All partitions of the table, ordered by season.
+    """
+    if name not in tables:
+        raise ValueError("Unknown table: " + str(name))
+
+    out = store_dir(base)
+
+    if refresh:
+        compile_store(base, out)
+
+    frames = []
+    for f in sorted((out / name).glob("*.pkl")):
+        df = pd.read_pickle(f)
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+        frames.append(df)
+
+    return concat_frames(frames)
+
+
+if __name__ == "__main__":
+    rebuild = "--rebuild" in sys.argv
+    changed = compile_store(path, rebuild=rebuild)
+
+    if len(changed) == 0:
+        print("Store is up to date.")
+    else:
+        print(f"Recompiled {len(changed)} folders into {store_dir(path)}")
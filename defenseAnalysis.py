@@ -1,9 +1,9 @@
 import sys
 from pathlib import Path
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QSpinBox
+from data_repository import load_defense_data
 
 path = Path("NFL-Data") / "NFL-data-Players"
 positions = ["QB", "RB", "WR", "TE"]
@@ -11,63 +11,6 @@ scale_min = -3.0
 scale_max = 3.0
 
 
-def load_defense_data(folder):
-    all_data = []
-    
-    if not folder.exists():
-        return pd.DataFrame()
-    
-    for year_folder in folder.iterdir():
-        if not year_folder.is_dir():
-            continue
-        
-        season = 0
-        try:
-            season = int(year_folder.name)
-        except ValueError:
-            continue
-        
-        for week_folder in year_folder.iterdir():
-            if not week_folder.is_dir():
-                continue
-            
-            week = 0
-            try:
-                week = int(week_folder.name)
-            except ValueError:
-                continue
-            
-            for pos in positions:
-                f = week_folder / (pos + ".csv")
-                
-                if not f.exists():
-                    continue
-                
-                df = pd.read_csv(f)
-                df["season"] = season
-                df["week"] = week
-                df["Pos"] = pos
-                
-                has_cols = True
-                if "PlayerOpponent" not in df.columns:
-                    has_cols = False
-                if "TotalPoints" not in df.columns:
-                    has_cols = False
-                
-                if has_cols == False:
-                    continue
-                
-                df = df[["PlayerName", "Pos", "PlayerOpponent", "TotalPoints", "season", "week"]]
-                all_data.append(df)
-    
-    if len(all_data) == 0:
-        return pd.DataFrame()
-    
-    combined = pd.concat(all_data, ignore_index=True)
-    combined["Opponent"] = combined["PlayerOpponent"].str.replace("@", "", regex=False).str.strip()
-    return combined
-
-
 class DefenseWidget(QWidget):
     def __init__(self, df):
         super().__init__()
@@ -165,10 +108,10 @@ class DefenseWidget(QWidget):
             self.canvas.draw_idle()
             return
         
-        week_avg = df.groupby(["week", "Pos"])["TotalPoints"].transform("mean")
+        week_avg = df.groupby(["week", "Pos"], observed=True)["TotalPoints"].transform("mean")
         df["PointsVsAvg"] = df["TotalPoints"] - week_avg
         
-        heat = df.groupby(["Opponent", "Pos"])["PointsVsAvg"].mean().unstack(fill_value=0)
+        heat = df.groupby(["Opponent", "Pos"], observed=True)["PointsVsAvg"].mean().unstack(fill_value=0)
         
         pos_list = []
         for p in positions:
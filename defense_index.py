@@ -0,0 +1,89 @@
+"""
+Prefix sums of points allowed vs the weekly positional average.
+
+For every season, week, opponent and position this stores the running total
+(over weeks) of how far players scored above the average at their position
+that week, and how many games that covers. The weekly average does not depend
+on which weeks are selected, so the numbers for any week range are the
+difference of two rows: O(teams x positions) per query.
+"""
+import numpy as np
+
+
+class DefenseIndex:
+    def __init__(self, matrix):
+        """
+        Args:
+            matrix (PointsMatrix): Weekly points with positions and opponents (see points_matrix.py).
+        """
+        self.seasons = matrix.seasons
+        self.team_names = matrix.team_names
+        self.pos_names = matrix.pos_names
+
+        n_players, n_seasons, n_weeks = matrix.points.shape
+        n_teams = len(self.team_names)
+        n_pos = len(self.pos_names)
+        self.n_weeks = n_weeks
+
+        pts = np.asarray(matrix.points)
+        opp = np.asarray(matrix.opponents)
+
+        # Bye weeks carry no opponent and are left out, as in the heatmap.
+        valid = ~np.isnan(pts) & (opp >= 0)
+        p, s, w = np.nonzero(valid)
+        vals = pts[valid].astype(np.float64)
+        pos = np.asarray(matrix.positions)[valid].astype(np.int64)
+        opp = opp[valid].astype(np.int64)
+
+        week_key = (s * n_weeks + w) * n_pos + pos
+        total = np.bincount(week_key, weights=vals, minlength=n_seasons * n_weeks * n_pos)
+        count = np.bincount(week_key, minlength=n_seasons * n_weeks * n_pos)
+        avg = total / np.maximum(count, 1)
+
+        # Points scored and games played at each position per week, for callers that need the averages.
+        self.week_totals = total.reshape(n_seasons, n_weeks, n_pos)
+        self.week_counts = count.reshape(n_seasons, n_weeks, n_pos)
+
+        shape = (n_seasons, n_weeks, n_teams, n_pos)
+        size = n_seasons * n_weeks * n_teams * n_pos
+        cell = ((s * n_weeks + w) * n_teams + opp) * n_pos + pos
+        sums = np.bincount(cell, weights=vals - avg[week_key], minlength=size).reshape(shape)
+        counts = np.bincount(cell, minlength=size).reshape(shape)
+
+        # Row k holds the totals of weeks 1 - k, so row 0 is all zeros.
+        self.sums = np.zeros((n_seasons, n_weeks + 1, n_teams, n_pos))
+        self.counts = np.zeros((n_seasons, n_weeks + 1, n_teams, n_pos), dtype=np.int64)
+        np.cumsum(sums, axis=1, out=self.sums[:, 1:])
+        np.cumsum(counts, axis=1, out=self.counts[:, 1:])
+
+    def season_index(self, season):
+        i = int(np.searchsorted(self.seasons, season))
+        if i >= len(self.seasons) or self.seasons[i] != season:
+            return -1
+        return i
+
+    def points_vs_average(self, season, w_start, w_end):
+        """
+        Same result as PointsMatrix.points_vs_average, read from the prefix sums.
+
+        Args:
+            season (int): Season year.
+            w_start (int): First week, inclusive.
+            w_end (int): Last week, inclusive.
+        Returns:
+            tuple: (teams x positions mean difference, teams x positions game counts),
+                indexed by team_names and pos_names.
+        """
+        shape = (len(self.team_names), len(self.pos_names))
+
+        s = self.season_index(season)
+        lo = max(w_start, 1) - 1
+        hi = min(w_end, self.n_weeks)
+        if s < 0 or lo >= hi:
+            return np.zeros(shape), np.zeros(shape, dtype=np.int64)
+
+        sums = self.sums[s, hi] - self.sums[s, lo]
+        counts = self.counts[s, hi] - self.counts[s, lo]
+
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        return means, counts
@@ -0,0 +1,302 @@
+"""
+Snake drafts simulated in bulk from the pre-draft rankings.
+
+NFL-Data/pre_draft_rankings_with_2024_tiers.csv lists, for 2021 - 2024, each
+ranked player's ADP (average draft position) and platform ranks. The pool of
+a season is its players with an ADP, matched by name and position to the
+season totals in <POS>_season.csv; that is what each drafted roster scores.
+
+Every opponent drafts from its own board: the ADPs times log-normal noise,
+drawn once per draft, so teams disagree the way real drafts do but still
+follow ADP. The team under test drafts by plain ADP, except in the rounds its
+strategy restricts to certain positions. Position caps keep rosters sensible.
+
+A batch of drafts is run as arrays, one array step per pick for all drafts
+at once. Batches of every (strategy, draft slot) pair go through one process
+pool, seeded from one SeedSequence so results do not depend on the pool size.
+"""
+import os
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from league import best_lineups, team_sizes
+
+rankings_file = Path("NFL-Data") / "pre_draft_rankings_with_2024_tiers.csv"
+
+draft_pos = ["QB", "RB", "WR", "TE"]
+position_caps = {"QB": 3, "RB": 7, "WR": 7, "TE": 3}
+roster_rounds = 15
+
+# Sigma of the log-normal noise on opponents' boards: a player with ADP 40 usually goes between picks ~25 and ~65.
+adp_noise = 0.25
+batch_size = 500
+
+# Rounds (1-based) the team under test only takes the listed positions; other rounds are best available by ADP.
+strategies = {
+    "best_available": {},
+    "zero_rb": {r: ["QB", "WR", "TE"] for r in range(1, 6)},
+    "robust_rb": {1: ["RB"], 2: ["RB"], 3: ["RB"]},
+    "hero_rb": {1: ["RB"], 2: ["WR", "TE"], 3: ["WR", "TE"], 4: ["WR", "TE"], 5: ["WR", "TE"]},
+    "early_te": {2: ["TE"]},
+    "late_qb": {r: ["RB", "WR", "TE"] for r in range(1, 10)},
+}
+
+
+def name_key(names):
+    """
+    Lower-case names without accents, punctuation or generational suffixes, so
+    "Kenneth Walker III" and "Kenneth Walker" compare equal.
+    """
+    names = pd.Series(names, dtype=object).astype(str)
+    names = names.map(lambda x: unicodedata.normalize("NFKD", x).encode("ascii", "ignore").decode())
+    names = names.str.lower().str.replace(r"[^a-z ]", "", regex=True)
+    names = names.str.replace(r"\s+", " ", regex=True).str.strip()
+    return names.str.replace(r" (jr|sr|ii|iii|iv|v)$", "", regex=True)
+
+
+def load_rankings(f=rankings_file):
+    """
+    Reads the pre-draft rankings, keeping players that have an ADP.
+    """
+    df = pd.read_csv(f)
+    df = df[df["ADP"].notna() & df["position"].isin(draft_pos)]
+    return df.reset_index(drop=True)
+
+
+def draft_pool(rankings, season_df, season):
+    """
+    One season's draftable players with the points they went on to score.
+
+    Players are matched to the season totals by name and position, then by
+    last name, team and position for the nicknames ("Gabe" / "Gabriel").
+    Ranked players missing from the season files scored 0.
+
+    Args:
+        rankings (pd.DataFrame): Output of load_rankings.
+        season_df (pd.DataFrame): Season totals with season, PlayerName, PlayerId, Pos, Team and TotalPoints.
+        season (int): Season year.
+    Returns:
+        pd.DataFrame: Name, Pos, Team, ADP, tier, PlayerId and TotalPoints, by ADP.
+    """
+    pool = rankings[rankings["season"] == season]
+    pool = pool.rename(columns={"position": "Pos"})[["Name", "Pos", "Team", "ADP", "tier"]].copy()
+    pool = pool.sort_values("ADP", kind="stable").reset_index(drop=True)
+    pool["key"] = name_key(pool["Name"]).to_numpy()
+    pool["last"] = pool["key"].str.split(" ").str[-1]
+
+    totals = season_df[season_df["season"] == season]
+    totals = pd.DataFrame({
+        "key": name_key(totals["PlayerName"]).to_numpy(),
+        "Pos": totals["Pos"].astype(str).to_numpy(),
+        "Team": totals["Team"].astype(str).to_numpy(),
+        "PlayerId": totals["PlayerId"].to_numpy(),
+        "TotalPoints": totals["TotalPoints"].to_numpy(dtype=np.float64),
+    })
+    totals = totals.sort_values("TotalPoints", ascending=False).drop_duplicates(["key", "Pos"])
+    totals["last"] = totals["key"].str.split(" ").str[-1]
+
+    by_name = pool.merge(totals[["key", "Pos", "PlayerId", "TotalPoints"]], on=["key", "Pos"], how="left")
+
+    by_last = totals.drop_duplicates(["last", "Team", "Pos"], keep=False)
+    by_last = pool.merge(by_last[["last", "Team", "Pos", "PlayerId", "TotalPoints"]], on=["last", "Team", "Pos"], how="left")
+
+    missing = by_name["PlayerId"].isna()
+    for col in ["PlayerId", "TotalPoints"]:
+        by_name.loc[missing, col] = by_last.loc[missing, col]
+
+    by_name["TotalPoints"] = by_name["TotalPoints"].fillna(0.0)
+    return by_name.drop(columns=["key", "last"])
+
+
+def lineup_points(points, pos, superflex=False):
+    """
+    Season points of the best lineup each roster could have set (see league.best_lineups).
+
+    Args:
+        points (np.ndarray): ... x roster size season totals.
+        pos (np.ndarray): Same shape, index into draft_pos.
+        superflex (bool): If set to True, a QB may also fill the flex spot.
+    Returns:
+        np.ndarray: Total over the last axis.
+    """
+    chosen = best_lineups(points, pos, draft_pos, superflex=superflex)
+    return np.where(chosen, points, 0).sum(axis=-1)
+
+
+def run_drafts(job):
+    """
+    Runs one batch of drafts. Runs inside worker processes.
+
+    Args:
+        job (tuple): (SeedSequence, number of drafts, draft slot (0-based), strategy rounds, setup dict).
+    Returns:
+        tuple: (lineup points of the team under test, its finish by points among all teams).
+    """
+    seed, n_drafts, slot, plan, setup = job
+    rng = np.random.default_rng(seed)
+
+    adp = setup["adp"]
+    pos = setup["pos"]
+    caps = setup["caps"]
+    n_teams = setup["n_teams"]
+    n_rounds = setup["n_rounds"]
+    n_players = len(adp)
+
+    # One board per team, teams first so each team's board is contiguous.
+    boards = rng.standard_normal((n_teams, n_drafts, n_players), dtype=np.float32)
+    boards *= adp_noise
+    np.exp(boards, out=boards)
+    boards *= adp
+    boards[slot] = adp
+
+    rows = np.arange(n_drafts)
+    counts = np.zeros((n_teams, n_drafts, len(caps)), dtype=np.int64)
+    rosters = np.zeros((n_drafts, n_teams, n_rounds), dtype=np.int64)
+
+    for rnd in range(n_rounds):
+        order = range(n_teams) if rnd % 2 == 0 else range(n_teams - 1, -1, -1)
+        for t in order:
+            board = boards[t]
+
+            if t == slot and (rnd + 1) in plan:
+                wanted = np.where(np.isin(pos, plan[rnd + 1]), board, np.inf)
+                # Fall back to best available when every wanted player is gone.
+                wanted = np.where(np.isfinite(wanted).any(axis=1)[:, None], wanted, board)
+                pick = np.argmin(wanted, axis=1)
+            else:
+                pick = np.argmin(board, axis=1)
+
+            rosters[:, t, rnd] = pick
+            # Taken players leave every board.
+            boards[:, rows, pick] = np.inf
+
+            picked_pos = pos[pick]
+            counts[t, rows, picked_pos] += 1
+            full = np.flatnonzero(counts[t, rows, picked_pos] >= caps[picked_pos])
+            if len(full) > 0:
+                board[full] = np.where(pos[None, :] == picked_pos[full, None], np.inf, board[full])
+
+    scores = lineup_points(setup["points"][rosters], pos[rosters], setup["superflex"])
+    ours = scores[:, slot]
+    finish = (scores > ours[:, None]).sum(axis=1) + 1
+    return ours, finish
+
+
+class DraftSimulator:
+    def __init__(self, pool, n_teams, n_rounds=roster_rounds, caps=position_caps, superflex=False):
+        """
+        Args:
+            pool (pd.DataFrame): Output of draft_pool.
+            n_teams (int): League size, e.g. one of team_sizes.
+            n_rounds (int): Players per roster.
+            caps (dict): Most players of each position a roster may take.
+            superflex (bool): If set to True, rosters are scored with a superflex spot.
+        """
+        if len(pool) < n_teams * n_rounds:
+            raise ValueError(f"The pool has {len(pool)} players; {n_teams} teams x {n_rounds} rounds need more.")
+
+        self.pool = pool
+        self.n_teams = n_teams
+        self.n_rounds = n_rounds
+        self.superflex = superflex
+        self.setup = {
+            "adp": pool["ADP"].to_numpy(dtype=np.float32),
+            "pos": np.array([draft_pos.index(p) for p in pool["Pos"]], dtype=np.int64),
+            "points": pool["TotalPoints"].to_numpy(dtype=np.float64),
+            "caps": np.array([caps.get(p, n_rounds) for p in draft_pos], dtype=np.int64),
+            "n_teams": n_teams,
+            "n_rounds": n_rounds,
+            "superflex": superflex,
+        }
+
+    def jobs(self, strategy, slot, n_drafts, seed):
+        sizes = [batch_size] * (n_drafts // batch_size)
+        if n_drafts % batch_size > 0:
+            sizes.append(n_drafts % batch_size)
+
+        plan = strategies[strategy] if isinstance(strategy, str) else strategy
+        plan = {rnd: np.array([draft_pos.index(p) for p in names]) for rnd, names in plan.items()}
+        return [(s, n, slot - 1, plan, self.setup) for s, n in zip(seed.spawn(len(sizes)), sizes)]
+
+    def sweep(self, strategy_names=None, slots=None, n_drafts=1000, seed=None, workers=None):
+        """
+        Runs n_drafts drafts for every strategy from every draft slot.
+
+        Args:
+            strategy_names (list): Keys of strategies. Defaults to all of them.
+            slots (list): Draft slots (1-based). Defaults to every slot.
+            n_drafts (int): Drafts per (strategy, slot).
+            seed (int): Seed for reproducible results.
+            workers (int): Pool size. Defaults to the number of CPUs; 1 runs serially.
+        Returns:
+            pd.DataFrame: Per (strategy, slot): mean, std and quantiles of the lineup's
+                season points, mean finish, and the share of drafts finishing first
+                and in the top half of the league.
+        """
+        if strategy_names is None:
+            strategy_names = list(strategies)
+        if slots is None:
+            slots = list(range(1, self.n_teams + 1))
+
+        keys = [(name, slot) for name in strategy_names for slot in slots]
+        seeds = np.random.SeedSequence(seed).spawn(len(keys))
+
+        jobs = []
+        owner = []
+        for k, (name, slot) in enumerate(keys):
+            batch = self.jobs(name, slot, n_drafts, seeds[k])
+            jobs.extend(batch)
+            owner.extend([k] * len(batch))
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if workers <= 1 or len(jobs) <= 1:
+            results = [run_drafts(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                results = list(pool.map(run_drafts, jobs))
+
+        table = []
+        owner = np.array(owner)
+        for k, (name, slot) in enumerate(keys):
+            idx = np.flatnonzero(owner == k)
+            points = np.concatenate([results[i][0] for i in idx])
+            finish = np.concatenate([results[i][1] for i in idx])
+            table.append({
+                "strategy": name,
+                "slot": slot,
+                "points_mean": points.mean(),
+                "points_std": points.std(),
+                "points_p10": np.quantile(points, 0.10),
+                "points_p50": np.quantile(points, 0.50),
+                "points_p90": np.quantile(points, 0.90),
+                "finish_mean": finish.mean(),
+                "first": (finish == 1).mean(),
+                "top_half": (finish <= self.n_teams // 2).mean(),
+            })
+
+        return pd.DataFrame(table).set_index(["strategy", "slot"])
+
+
+if __name__ == "__main__":
+    import time
+    from data_store import load_table, path
+
+    rankings = load_rankings()
+    season_df = load_table("season", path, columns=["season", "PlayerName", "PlayerId", "Pos", "Team", "TotalPoints"])
+
+    pd.set_option("display.width", 140)
+    for season in sorted(rankings["season"].unique()):
+        pool = draft_pool(rankings, season_df, season)
+        sim = DraftSimulator(pool, team_sizes[2])
+
+        t0 = time.perf_counter()
+        table = sim.sweep(n_drafts=1000, seed=0)
+        elapsed = time.perf_counter() - t0
+
+        print(f"{season}: {len(table) * 1000} drafts in {elapsed:.1f} s")
+        print(table.groupby(level="strategy").mean().drop(columns="points_std").round(2))
+        print()
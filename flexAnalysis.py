@@ -1,10 +1,10 @@
 import sys
 from pathlib import Path
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QCheckBox, QLabel, QGroupBox
+from data_repository import load_season_data
 
 path = Path("NFL-Data") / "NFL-data-Players"
 years = [2021, 2022, 2023, 2024]
@@ -21,38 +21,6 @@ pos_colors = {
 }
 
 
-def load_season_data(base, years, pos_list):
-    all_data = []
-    
-    for y in years:
-        for pos in pos_list:
-            f = Path(base) / str(y) / (pos + "_season.csv")
-            
-            if not f.exists():
-                continue
-            
-            df = pd.read_csv(f)
-            df["season"] = y
-            
-            required = ["PlayerName", "Pos", "Rank", "TotalPoints"]
-            has_all = True
-            for col in required:
-                if col not in df.columns:
-                    has_all = False
-                    break
-            
-            if has_all == False:
-                continue
-            
-            df = df[["season", "PlayerName", "Pos", "Rank", "TotalPoints"]]
-            all_data.append(df)
-    
-    if len(all_data) == 0:
-        return pd.DataFrame()
-    
-    return pd.concat(all_data, ignore_index=True)
-
-
 class FlexWidget(QWidget):
     def __init__(self, df):
         super().__init__()
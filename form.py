@@ -0,0 +1,373 @@
+"""
+Rolling and exponentially weighted form of every player, kept up to date one
+week at a time.
+
+For each season a FormState holds, per player, the running EWMA numerators
+and denominators, a ring buffer of the last `window` games and the season
+totals of points, Touches, Targets and RzTouch. Folding a new week touches
+only the players in that week's files, so when a new in-season week folder
+lands nothing before it is recomputed. The states and the form of every
+player-week as it stood after that week are cached next to the compiled
+store; a season is replayed from week 1 only if one of its earlier weeks
+changed.
+
+Form is counted over games played: byes and missed weeks neither decay the
+EWMA nor enter the rolling window. The EWMA matches pandas'
+ewm(span=span, adjust=True).mean() and the rolling mean
+rolling(window, min_periods=1).mean() over each player's games in a season.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from data_store import compile_store, read_manifest, read_partition, store_dir, write_partition
+
+form_table = "form"
+form_version = 1
+
+metrics = ["TotalPoints", "Touches", "Targets", "RzTouch"]
+window = 3
+span = 4
+
+
+def week_hashes(base):
+    """
+    Fingerprint of the weekly files (not the projections) of each week folder.
+
+    Returns:
+        dict: "2025/3" -> md5 of that folder's weekly file entries.
+    """
+    folders = read_manifest(store_dir(base))
+
+    hashes = {}
+    for key, files in folders.items():
+        if "/" not in key:
+            continue
+        weekly = {rel: stat for rel, stat in files.items() if "/projected/" not in rel}
+        if len(weekly) > 0:
+            hashes[key] = hashlib.md5(json.dumps(weekly, sort_keys=True).encode()).hexdigest()
+    return hashes
+
+
+def form_columns():
+    cols = ["PlayerId", "season", "week", "games"]
+    for m in metrics:
+        cols += [m + "_ewm", m + "_roll", m + "_avg"]
+    return cols + ["form"]
+
+
+class FormState:
+    def __init__(self, season, window=window, span=span):
+        """
+        Args:
+            season (int): Season the state belongs to.
+            window (int): Games in the rolling mean.
+            span (float): EWMA span; the weight of a game decays by 1 - 2 / (span + 1) per later game.
+        """
+        self.season = int(season)
+        self.window = int(window)
+        self.span = float(span)
+        self.week = 0
+
+        self.player_ids = np.empty(0, dtype=np.int64)
+        self.games = np.empty(0, dtype=np.int32)
+        self.last_week = np.empty(0, dtype=np.int16)
+        self.ewm_num = np.empty((0, len(metrics)))
+        self.ewm_den = np.empty(0)
+        self.buffer = np.empty((0, self.window, len(metrics)))
+        self.total = np.empty((0, len(metrics)))
+
+    def rows(self, ids):
+        """
+        State rows of the given PlayerIds, adding players seen for the first time.
+        """
+        idx = np.searchsorted(self.player_ids, ids)
+        found = idx < len(self.player_ids)
+        found[found] = self.player_ids[idx[found]] == ids[found]
+
+        if not found.all():
+            new = np.unique(ids[~found])
+            n = len(new)
+            order = np.argsort(np.concatenate([self.player_ids, new]), kind="stable")
+
+            self.player_ids = np.concatenate([self.player_ids, new])[order]
+            self.games = np.concatenate([self.games, np.zeros(n, dtype=np.int32)])[order]
+            self.last_week = np.concatenate([self.last_week, np.zeros(n, dtype=np.int16)])[order]
+            self.ewm_num = np.concatenate([self.ewm_num, np.zeros((n, len(metrics)))])[order]
+            self.ewm_den = np.concatenate([self.ewm_den, np.zeros(n)])[order]
+            self.buffer = np.concatenate([self.buffer, np.zeros((n, self.window, len(metrics)))])[order]
+            self.total = np.concatenate([self.total, np.zeros((n, len(metrics)))])[order]
+
+            idx = np.searchsorted(self.player_ids, ids)
+
+        return idx
+
+    def fold(self, df):
+        """
+        Adds one week's games to the running form.
+
+        Args:
+            df (pd.DataFrame): That week's weekly rows, one per player.
+        Returns:
+            pd.DataFrame: The form of each of those players after this week (see form_columns).
+        """
+        week = int(df["week"].iloc[0])
+        ids = df["PlayerId"].to_numpy().astype(np.int64)
+        values = np.zeros((len(df), len(metrics)))
+        for j, m in enumerate(metrics):
+            if m in df.columns:
+                values[:, j] = np.nan_to_num(df[m].to_numpy(dtype=np.float64))
+
+        r = self.rows(ids)
+        decay = 1 - 2 / (self.span + 1)
+
+        self.ewm_num[r] = decay * self.ewm_num[r] + values
+        self.ewm_den[r] = decay * self.ewm_den[r] + 1
+        self.buffer[r, self.games[r] % self.window] = values
+        self.total[r] += values
+        self.games[r] += 1
+        self.last_week[r] = week
+        self.week = max(self.week, week)
+
+        return self.frame(r)
+
+    def frame(self, r):
+        games = self.games[r]
+        ewm = self.ewm_num[r] / self.ewm_den[r][:, None]
+        roll = self.buffer[r].sum(axis=1) / np.minimum(games, self.window)[:, None]
+        avg = self.total[r] / games[:, None]
+
+        df = pd.DataFrame({
+            "PlayerId": self.player_ids[r].astype(np.int32),
+            "season": np.full(len(r), self.season, dtype=np.int16),
+            "week": self.last_week[r],
+            "games": games,
+        })
+        for j, m in enumerate(metrics):
+            df[m + "_ewm"] = ewm[:, j].astype(np.float32)
+            df[m + "_roll"] = roll[:, j].astype(np.float32)
+            df[m + "_avg"] = avg[:, j].astype(np.float32)
+
+        # Positive when the player's recent games beat their season average so far.
+        df["form"] = (ewm[:, 0] - avg[:, 0]).astype(np.float32)
+        return df
+
+    def table(self):
+        """
+        Current form of every player seen this season, as of their latest game.
+        """
+        return self.frame(np.arange(len(self.player_ids)))
+
+
+def save_state(state, f):
+    tmp = f.with_suffix(".tmp.npz")
+    np.savez(
+        tmp,
+        meta=np.array([state.season, state.window, state.week]),
+        span=np.array(state.span),
+        player_ids=state.player_ids,
+        games=state.games,
+        last_week=state.last_week,
+        ewm_num=state.ewm_num,
+        ewm_den=state.ewm_den,
+        buffer=state.buffer,
+        total=state.total,
+    )
+    os.replace(tmp, f)
+
+
+def load_state(f):
+    with np.load(f) as data:
+        season, win, week = data["meta"]
+        state = FormState(season, win, float(data["span"]))
+        state.week = int(week)
+        for name in ["player_ids", "games", "last_week", "ewm_num", "ewm_den", "buffer", "total"]:
+            setattr(state, name, data[name])
+    return state
+
+
+def update_form(base, refresh=True):
+    """
+    Folds the weeks that landed since the last call into each season's state.
+    A season is replayed from scratch if one of its folded weeks changed or a
+    week arrived out of order.
+
+    Args:
+        base (Path): Root of the NFL-data-Players tree.
+        refresh (bool): If set to True, recompiles changed folders of the store first.
+    Returns:
+        list: Week keys ("2025/7") that changed.
+    """
+    if refresh:
+        compile_store(base)
+
+    out = store_dir(base)
+    folder = out / form_table
+    meta_file = folder / "meta.json"
+
+    meta = {}
+    if meta_file.exists():
+        with open(meta_file) as fh:
+            meta = json.load(fh)
+    if meta.get("version") != form_version or meta.get("window") != window or meta.get("span") != span:
+        meta = {}
+    old = meta.get("weeks", {})
+
+    new = week_hashes(base)
+    changed = sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+    years = sorted(set(key.split("/")[0] for key in changed))
+    for year in years:
+        folded = sorted(int(key.split("/")[1]) for key in old if key.split("/")[0] == year)
+        weeks = sorted(int(key.split("/")[1]) for key in new if key.split("/")[0] == year)
+        added = sorted(int(key.split("/")[1]) for key in changed if key.split("/")[0] == year and key not in old)
+
+        state_file = folder / (year + ".npz")
+        history = read_partition(out, form_table, year)
+        replay = len(old) == 0 or not state_file.exists() or history is None
+        replay = replay or any(key in old for key in changed if key.split("/")[0] == year)
+        replay = replay or (len(folded) > 0 and len(added) > 0 and added[0] <= folded[-1])
+
+        if replay:
+            state = FormState(year)
+            frames = []
+            todo = weeks
+        else:
+            state = load_state(state_file)
+            frames = [history]
+            todo = added
+
+        weekly = read_partition(out, "weekly", year)
+        if weekly is not None:
+            weekly = weekly[weekly["week"].isin(todo)]
+            for week, rows in weekly.groupby("week", sort=True, observed=True):
+                frames.append(state.fold(rows))
+
+        frames = [df for df in frames if len(df) > 0]
+        df = None
+        if len(frames) > 0:
+            df = pd.concat(frames, ignore_index=True)
+
+        folder.mkdir(parents=True, exist_ok=True)
+        write_partition(out, form_table, year, df)
+        if len(state.player_ids) > 0:
+            save_state(state, state_file)
+        elif state_file.exists():
+            state_file.unlink()
+
+    if len(changed) > 0 or len(old) == 0:
+        folder.mkdir(parents=True, exist_ok=True)
+        tmp = meta_file.with_suffix(".tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"version": form_version, "window": window, "span": span, "weeks": new}, fh)
+        os.replace(tmp, meta_file)
+
+    return changed
+
+
+class RecentForm:
+    """
+    Form lookups for one data tree, brought up to date when new weeks land.
+    """
+    def __init__(self, base):
+        self.base = base
+        self.history = {}
+        self.states = {}
+
+    def refresh(self):
+        """
+        Folds in any new weeks. Returns the week keys that changed.
+        """
+        changed = update_form(self.base)
+
+        if len(self.states) == 0 or len(changed) > 0:
+            self.history = {}
+            self.states = {}
+            folder = store_dir(self.base) / form_table
+            for f in sorted(folder.glob("*.npz")):
+                state = load_state(f)
+                self.states[state.season] = state
+
+        return changed
+
+    def week(self, season):
+        """
+        Form of every player-week of a season, as it stood after that week.
+        """
+        season = int(season)
+        if season not in self.history:
+            df = read_partition(store_dir(self.base), form_table, season)
+            self.history[season] = df.set_index(["week", "PlayerId"]).sort_index() if df is not None else None
+        return self.history[season]
+
+    def lookup(self, ids, season, week=None):
+        """
+        Form of the given players in one week, or as of their latest game if week is None.
+
+        Args:
+            ids (array-like): PlayerIds.
+            season (int): Season.
+            week (int): Week, or None for the latest state.
+        Returns:
+            pd.DataFrame: One row per id in the same order (see form_columns), NaN for players
+                without form in that week, or None if the season has no weekly data.
+        """
+        if len(self.states) == 0:
+            self.refresh()
+
+        season = int(season)
+        if season not in self.states:
+            return None
+
+        ids = np.asarray(ids).astype(np.int64)
+        if week is None:
+            table = self.states[season].table().set_index("PlayerId")
+            return table.reindex(ids).reset_index()
+
+        history = self.week(season)
+        if history is None or int(week) not in history.index.get_level_values(0):
+            return None
+        return history.loc[int(week)].reindex(ids).reset_index()
+
+
+if __name__ == "__main__":
+    import shutil
+    import time
+    from data_store import path
+
+    shutil.rmtree(store_dir(path) / form_table, ignore_errors=True)
+    t0 = time.perf_counter()
+    update_form(path)
+    print(f"Built every season in {time.perf_counter() - t0:.2f} s")
+
+    # Forget the latest week to time folding it back in on its own.
+    meta_file = store_dir(path) / form_table / "meta.json"
+    with open(meta_file) as fh:
+        meta = json.load(fh)
+    latest = max(meta["weeks"], key=lambda key: tuple(int(x) for x in key.split("/")))
+    year, week = latest.split("/")
+    del meta["weeks"][latest]
+    with open(meta_file, "w") as fh:
+        json.dump(meta, fh)
+
+    history = read_partition(store_dir(path), form_table, year)
+    write_partition(store_dir(path), form_table, year, history[history["week"] < int(week)])
+    state = FormState(year)
+    for w, rows in read_partition(store_dir(path), "weekly", year).groupby("week", sort=True, observed=True):
+        if w < int(week):
+            state.fold(rows)
+    save_state(state, store_dir(path) / form_table / (year + ".npz"))
+
+    t0 = time.perf_counter()
+    changed = update_form(path, refresh=False)
+    print(f"Folded {changed} in {time.perf_counter() - t0:.3f} s")
+
+    form = RecentForm(path)
+    form.refresh()
+    table = form.states[int(year)].table()
+    names = read_partition(store_dir(path), "weekly", year).drop_duplicates("PlayerId").set_index("PlayerId")[["PlayerName", "Pos"]]
+    table = table.join(names, on="PlayerId")
+    hot = table[(table["games"] >= 4) & table["Pos"].isin(["QB", "RB", "WR", "TE"])].sort_values("form", ascending=False)
+    pd.set_option("display.width", 160)
+    print(hot[["PlayerName", "Pos", "games", "TotalPoints_avg", "TotalPoints_ewm", "TotalPoints_roll", "Touches_ewm", "Targets_ewm", "form"]].head(10).round(1).to_string(index=False))
@@ -0,0 +1,71 @@
+"""
+Grid index for nearest-point hit tests on a scatter plot.
+
+Points are bucketed by display coordinates into square cells as wide as the
+hit radius, so any point within the radius of the cursor is in the cursor's
+cell or one of its eight neighbours. A query looks at those nine cells only,
+whatever the number of points; Collection.contains tests every marker.
+"""
+import numpy as np
+
+
+class PointIndex:
+    def __init__(self, xy, radius):
+        """
+        Args:
+            xy (np.ndarray): n x 2 display coordinates (pixels). Rows with NaN or inf are never hit.
+            radius (float): Hit radius in pixels.
+        """
+        self.xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        self.radius = float(radius)
+
+        finite = np.flatnonzero(np.isfinite(self.xy).all(axis=1))
+        cells = np.floor(self.xy[finite] / self.radius).astype(np.int64)
+
+        if len(cells) > 0:
+            self.origin = cells.min(axis=0)
+            self.height = int(cells[:, 1].max() - self.origin[1]) + 3
+        else:
+            self.origin = np.zeros(2, dtype=np.int64)
+            self.height = 3
+
+        keys = self.cell_key(cells)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.points = finite[order]
+
+    def cell_key(self, cells):
+        # One spare row and column on each side, so neighbours of edge cells have valid keys.
+        shifted = cells - self.origin + 1
+        return shifted[..., 0] * self.height + shifted[..., 1]
+
+    def nearest(self, x, y):
+        """
+        Returns the index of the point closest to (x, y) within the radius, or -1.
+        Ties go to the lower index, as with Collection.contains.
+        """
+        if len(self.points) == 0:
+            return -1
+
+        cell = np.floor(np.array([x, y]) / self.radius).astype(np.int64)
+        offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+        neighbours = cell + offsets
+
+        # Cells outside the occupied range are empty (and would alias other cells' keys).
+        shifted = neighbours - self.origin + 1
+        inside = (shifted[:, 1] >= 0) & (shifted[:, 1] < self.height) & (shifted[:, 0] >= 0)
+        keys = self.cell_key(neighbours[inside])
+
+        starts = np.searchsorted(self.keys, keys, side="left")
+        stops = np.searchsorted(self.keys, keys, side="right")
+        if (stops - starts).sum() == 0:
+            return -1
+
+        candidates = np.concatenate([self.points[a:b] for a, b in zip(starts, stops)])
+        candidates.sort()
+
+        dist = np.hypot(self.xy[candidates, 0] - x, self.xy[candidates, 1] - y)
+        best = int(np.argmin(dist))
+        if dist[best] > self.radius:
+            return -1
+        return int(candidates[best])
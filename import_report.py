@@ -0,0 +1,119 @@
+"""
+Import-time report for the dashboard's startup path.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and
+summarises the output, so slow imports creeping back into startup are easy
+to spot. A previous report saved with --save can be passed as --baseline to
+compare against it.
+
+Usage:
+    python import_report.py [module] [--top N] [--save report.json] [--baseline report.json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+
+def run_importtime(module):
+    """
+    Imports a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module (string): Module to import, e.g. "combined".
+    Returns:
+        list: (module name, self microseconds, cumulative microseconds, depth) per import,
+            in the order the interpreter reported them.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError("Importing " + module + " failed:\n" + proc.stderr)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+
+    return rows
+
+
+def summarize(rows, top=15):
+    """
+    Returns the total import time and the slowest top-level packages.
+
+    Args:
+        rows (list): Output of run_importtime.
+        top (int): Number of packages to keep.
+    Returns:
+        dict: total_ms, module count, and (package, ms) pairs, slowest first.
+    """
+    total = sum(row[1] for row in rows)
+
+    # Charge each module's own time to its top-level package, so e.g. every
+    # scipy submodule counts towards scipy whichever module pulled it in.
+    packages = {}
+    for name, self_us, cumulative_us, depth in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "total_ms": round(total / 1000, 1),
+        "modules": len(rows),
+        "packages": [(name, round(us / 1000, 1)) for name, us in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time of a module.")
+    parser.add_argument("module", nargs="?", default="combined")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list.")
+    parser.add_argument("--save", help="Write the report to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against a report saved with --save.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown over the baseline (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    report = summarize(run_importtime(args.module), args.top)
+    report["module"] = args.module
+
+    print("import " + args.module + ": " + str(report["total_ms"]) + " ms, " + str(report["modules"]) + " modules")
+    for name, ms in report["packages"]:
+        print(f"  {name:<30}{ms:>10.1f} ms")
+
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+
+        limit = baseline["total_ms"] * (1 + args.tolerance)
+        print("baseline: " + str(baseline["total_ms"]) + " ms, limit " + str(round(limit, 1)) + " ms")
+
+        # Packages that are new since the baseline are the usual cause of a regression.
+        known = set(name for name, ms in baseline["packages"])
+        for name, ms in report["packages"]:
+            if name not in known:
+                print("  new: " + name + " (" + str(ms) + " ms)")
+
+        if report["total_ms"] > limit:
+            print("Import time regressed.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Roster rules shared by the dashboard and the engines built on it.
+
+A lineup fills starters[pos] spots at each position and `flex` spots that
+any flex-eligible player can fill (RB, WR and TE, plus QB in superflex
+leagues). For that slot structure the best lineup has a closed form: the top
+players at each position take the dedicated spots, and the flex spots go to
+the best of those left over. Swapping any starter for a bench player of the
+same eligibility can only lose points, so no search is needed.
+
+best_lineups is the one implementation of that rule; the lineup optimizer,
+the season simulator, the draft simulator and the VOR baselines all call it,
+so they cannot disagree about who starts.
+"""
+import numpy as np
+
+starter_count = {"QB": 1, "RB": 2, "WR": 2, "TE": 1}
+flex_pos = ["RB", "WR", "TE"]
+team_sizes = [8, 10, 12, 14]
+
+
+def flex_positions(superflex=False):
+    """
+    Positions that may fill a flex spot.
+    """
+    if superflex == True:
+        return flex_pos + ["QB"]
+    return list(flex_pos)
+
+
+def dedicated_spots(pos, size, starters=starter_count):
+    """
+    Players a league of `size` teams starts at a position before any flex
+    spot is filled. Positions not in starters have none.
+    """
+    return size * starters.get(pos, 0)
+
+
+def best_lineups(values, pos, pos_names, starters=starter_count, flex=1, superflex=False):
+    """
+    Chooses the best legal lineup of every roster.
+
+    Args:
+        values (np.ndarray): ... x players decision values; NaN where a player cannot score.
+        pos (np.ndarray): Position code of each player (index into pos_names), broadcastable
+            to values; -1 for empty roster spots.
+        pos_names (list): Position names of the codes.
+        starters (dict): Position -> dedicated spots. Positions not listed have none.
+        flex (int): Flex spots.
+        superflex (bool): If set to True, a QB may fill the flex spots.
+    Returns:
+        np.ndarray: Boolean mask of the starters, same shape as values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    pos = np.broadcast_to(pos, values.shape)
+    # Players without a value are only started when nobody else can fill the spot.
+    filled = np.where(np.isnan(values), -np.inf, values)
+    empty = pos < 0
+
+    chosen = np.zeros(values.shape, dtype=bool)
+    for code, name in enumerate(pos_names):
+        n = starters.get(name, 0)
+        if n == 0:
+            continue
+        at_pos = np.where((pos == code) & ~empty, filled, np.nan)
+        chosen |= top_k(at_pos, n)
+
+    codes = [pos_names.index(name) for name in flex_positions(superflex) if name in pos_names]
+    if flex > 0 and len(codes) > 0:
+        eligible = np.isin(pos, codes) & ~chosen & ~empty
+        chosen |= top_k(np.where(eligible, filled, np.nan), flex)
+
+    return chosen
+
+
+def top_k(values, k):
+    """
+    Mask of the k largest non-NaN entries along the last axis (fewer if there are not k).
+    Ties go to the earlier entry; -inf entries still rank above NaN ones.
+    """
+    valid = ~np.isnan(values)
+    # Largest first, with -inf clipped to the lowest finite value so only NaN sorts last.
+    key = np.where(valid, np.maximum(values, np.finfo(np.float64).min), -np.inf)
+
+    # A lineup takes a few players per position: k passes of argmax beat a full sort.
+    if k <= 4:
+        chosen = np.zeros(values.shape, dtype=bool)
+        for _ in range(min(k, values.shape[-1])):
+            idx = np.argmax(key, axis=-1)[..., None]
+            np.put_along_axis(chosen, idx, True, axis=-1)
+            np.put_along_axis(key, idx, -np.inf, axis=-1)
+        return chosen & valid
+
+    order = np.argsort(-key, axis=-1, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(values.shape[-1]), axis=-1)
+    return (rank < k) & valid
@@ -0,0 +1,218 @@
+"""
+Best legal start/sit decisions for many rosters and every week at once.
+
+The lineup rule is league.best_lineups: the top players at each position
+take the dedicated spots and the flex spots go to the best of those left
+over. Both steps are sorts along the roster axis of a rosters x seasons x
+weeks x players array, so every week of every season for every roster is
+solved in a handful of array operations. Decisions can be made on the weekly
+projections (projected/<POS>_projected.csv) or on the actual points, the
+hindsight-optimal lineup; either way the lineup is scored with the actual
+points. A started player without a game scores 0.
+"""
+import numpy as np
+import pandas as pd
+from league import best_lineups, starter_count
+
+
+def projected_matrix(matrix, projected):
+    """
+    Lays the weekly projections out like the points matrix.
+
+    Args:
+        matrix (PointsMatrix): Weekly points (see points_matrix.py).
+        projected (pd.DataFrame): Projected table with PlayerId, season, week and PlayerWeekProjectedPts.
+    Returns:
+        np.ndarray: players x seasons x weeks, NaN where there is no projection.
+    """
+    out = np.full(matrix.points.shape, np.nan, dtype=np.float32)
+
+    ids = projected["PlayerId"].to_numpy()
+    seasons = projected["season"].to_numpy()
+    weeks = projected["week"].to_numpy().astype(np.int64)
+    pts = projected["PlayerWeekProjectedPts"].to_numpy(dtype=np.float32)
+
+    p = np.searchsorted(matrix.player_ids, ids)
+    s = np.searchsorted(matrix.seasons, seasons)
+    p_ok = np.minimum(p, len(matrix.player_ids) - 1)
+    s_ok = np.minimum(s, len(matrix.seasons) - 1)
+    keep = (matrix.player_ids[p_ok] == ids) & (matrix.seasons[s_ok] == seasons)
+    keep &= (weeks >= 1) & (weeks <= len(matrix.weeks)) & ~np.isnan(pts)
+
+    out[p[keep], s[keep], weeks[keep] - 1] = pts[keep]
+    return out
+
+
+def roster_rows(matrix, rosters):
+    """
+    Matrix rows of the rostered players, padded with -1.
+
+    Args:
+        rosters (dict): Roster name -> list of PlayerIds.
+    Returns:
+        np.ndarray: rosters x max roster size.
+    """
+    size = max([len(ids) for ids in rosters.values()] + [1])
+    rows = np.full((len(rosters), size), -1, dtype=np.int64)
+
+    for r, ids in enumerate(rosters.values()):
+        ids = np.asarray(ids, dtype=np.int64)
+        found = np.minimum(np.searchsorted(matrix.player_ids, ids), len(matrix.player_ids) - 1)
+        unknown = ids[matrix.player_ids[found] != ids]
+        if len(unknown) > 0:
+            raise ValueError("Unknown PlayerId: " + ", ".join(str(p) for p in unknown))
+        rows[r, :len(ids)] = found
+
+    return rows
+
+
+class LineupOptimizer:
+    def __init__(self, matrix, projections=None, starters=starter_count, flex=1, superflex=False):
+        """
+        Args:
+            matrix (PointsMatrix): Weekly points (see points_matrix.py).
+            projections (np.ndarray): Output of projected_matrix. Needed for projection-based lineups.
+            starters (dict): Position -> dedicated spots.
+            flex (int): Flex spots.
+            superflex (bool): If set to True, a QB may fill the flex spots.
+        """
+        self.matrix = matrix
+        self.projections = projections
+        self.starters = dict(starters)
+        self.flex = flex
+        self.superflex = superflex
+
+        # Weeks with at least one game anywhere; the rest of the matrix is padding.
+        self.has_games = (np.asarray(matrix.opponents) >= 0).any(axis=0)
+
+    def solve(self, rosters, seasons=None):
+        """
+        Solves every week of the given seasons for every roster, by projection
+        (when projections are loaded) and in hindsight.
+
+        Args:
+            rosters (dict): Roster name -> list of PlayerIds.
+            seasons (list): Seasons to solve. Defaults to all of them.
+        Returns:
+            LineupResult
+        """
+        names = list(rosters)
+        rows = roster_rows(self.matrix, rosters)
+        empty = rows < 0
+        safe = np.maximum(rows, 0)
+
+        if seasons is None:
+            s_idx = np.arange(len(self.matrix.seasons))
+        else:
+            s_idx = np.array([self.matrix.season_index(s) for s in seasons], dtype=np.int64)
+            s_idx = s_idx[s_idx >= 0]
+
+        codes = np.array([self.matrix.pos_code(p) for p in self.matrix.latest_positions(safe.ravel())], dtype=np.int64)
+        codes = np.where(empty.ravel(), -1, codes).reshape(rows.shape)
+
+        # rosters x seasons x weeks x players
+        def gather(array):
+            values = np.asarray(array)[safe][:, :, s_idx].astype(np.float64)
+            values = np.where(empty[:, :, None, None], np.nan, values)
+            return values.transpose(0, 2, 3, 1)
+
+        actual = gather(self.matrix.points)
+        pos = codes[:, None, None, :]
+        pos_names = self.matrix.pos_names
+
+        optimal = best_lineups(actual, pos, pos_names, self.starters, self.flex, self.superflex)
+        lineups = {"optimal": optimal}
+        if self.projections is not None:
+            lineups["projected"] = best_lineups(gather(self.projections), pos, pos_names, self.starters, self.flex, self.superflex)
+
+        scored = np.where(np.isnan(actual), 0.0, actual)
+        points = {}
+        for key, chosen in lineups.items():
+            points[key] = np.where(chosen, scored, 0.0).sum(axis=-1)
+        points["bench"] = np.where(~empty[:, None, None, :], scored, 0.0).sum(axis=-1) - points["optimal"]
+
+        weeks_mask = self.has_games[s_idx]
+        player_ids = np.where(empty, -1, self.matrix.player_ids[safe])
+        return LineupResult(names, player_ids, self.matrix.seasons[s_idx], self.matrix.weeks, weeks_mask, lineups, points)
+
+
+class LineupResult:
+    def __init__(self, names, player_ids, seasons, weeks, weeks_mask, lineups, points):
+        """
+        Args:
+            names (list): Roster names.
+            player_ids (np.ndarray): rosters x players PlayerIds (-1 padded).
+            seasons, weeks (np.ndarray): Labels of the seasons and weeks axes.
+            weeks_mask (np.ndarray): seasons x weeks, True where games were played.
+            lineups (dict): "optimal" and optionally "projected" -> rosters x seasons x weeks x players starter masks.
+            points (dict): Same keys plus "bench" -> rosters x seasons x weeks points.
+        """
+        self.names = names
+        self.player_ids = player_ids
+        self.seasons = seasons
+        self.weeks = weeks
+        self.weeks_mask = weeks_mask
+        self.lineups = lineups
+        self.points = points
+
+    def weekly(self):
+        """
+        One row per roster, season and played week with the points of each lineup.
+        """
+        r, s, w = np.nonzero(np.broadcast_to(self.weeks_mask, self.points["optimal"].shape))
+        df = pd.DataFrame({
+            "roster": np.array(self.names, dtype=object)[r],
+            "season": self.seasons[s],
+            "week": self.weeks[w],
+        })
+        for key, pts in self.points.items():
+            df[key] = pts[r, s, w]
+        return df
+
+    def summary(self):
+        """
+        Season totals per roster. Efficiency is the projection lineup's points as
+        a share of the hindsight-optimal lineup's.
+        """
+        df = self.weekly()
+        table = df.groupby(["roster", "season"], sort=False).sum(numeric_only=True).drop(columns="week")
+        if "projected" in table.columns:
+            table["efficiency"] = table["projected"] / table["optimal"].where(table["optimal"] > 0)
+            table["lost"] = table["optimal"] - table["projected"]
+        return table
+
+    def starters(self, roster, season, week, key="optimal"):
+        """
+        Returns the PlayerIds started by one roster in one week.
+        """
+        r = self.names.index(roster)
+        s = int(np.searchsorted(self.seasons, season))
+        chosen = self.lineups[key][r, s, int(week) - 1]
+        return self.player_ids[r][chosen]
+
+
+if __name__ == "__main__":
+    import time
+    from data_store import load_table, path
+    from points_matrix import load_points_matrix
+    from league import team_sizes
+    from simulator import snake_league
+
+    matrix = load_points_matrix(path)
+    projections = projected_matrix(matrix, load_table("projected", path, refresh=False, columns=["PlayerId", "season", "week", "PlayerWeekProjectedPts"]))
+
+    rosters = {}
+    for season in matrix.seasons:
+        for size in team_sizes:
+            for name, ids in snake_league(matrix, size, season).items():
+                rosters[f"{season} {size}-team {name}"] = ids
+
+    t0 = time.perf_counter()
+    result = LineupOptimizer(matrix, projections).solve(rosters)
+    elapsed = time.perf_counter() - t0
+
+    table = result.summary()
+    print(f"{len(rosters)} rosters x {len(result.seasons)} seasons x {len(result.weeks)} weeks in {elapsed:.2f} s")
+    # Each roster was drafted for its own season.
+    own = table[[name.startswith(str(season)) for name, season in table.index]]
+    print(own.groupby(level="season").mean().round(3))
@@ -1,12 +1,12 @@
 import sys
 from pathlib import Path
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
 from scipy.stats import gaussian_kde
 from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QTabWidget
+from data_repository import load_week_data, load_efficiency_data, load_player_index
 
 path = Path("NFL-Data") / "NFL-data-Players"
 positions = ["QB", "RB", "WR", "TE"]
@@ -21,62 +21,6 @@ pos_colors_rgba = {
 }
 
 
-def load_week_data(folder):
-    all_data = []
-    
-    if not folder.exists():
-        return pd.DataFrame()
-    
-    for year_folder in folder.iterdir():
-        if not year_folder.is_dir():
-            continue
-        
-        for week_folder in year_folder.iterdir():
-            if not week_folder.is_dir():
-                continue
-            
-            if not week_folder.name.isdigit():
-                continue
-            
-            for pos_file in week_folder.iterdir():
-                if not pos_file.suffix == ".csv":
-                    continue
-                
-                try:
-                    df = pd.read_csv(pos_file)
-                    
-                    has_cols = True
-                    for col in ["PlayerName", "Team", "Pos", "TotalPoints"]:
-                        if col not in df.columns:
-                            has_cols = False
-                            break
-                    
-                    if has_cols == False:
-                        continue
-                    
-                    df = df[["PlayerName", "Team", "Pos", "TotalPoints"]]
-                    all_data.append(df)
-                except:
-                    continue
-    
-    if len(all_data) == 0:
-        return pd.DataFrame()
-    
-    return pd.concat(all_data, ignore_index=True)
-
-
-def load_efficiency_data(folder, year, week, pos):
-    if week == "full season":
-        f = folder / year / (pos + "_season.csv")
-    else:
-        f = folder / year / week / (pos + ".csv")
-    
-    if not f.exists():
-        return None
-    
-    return pd.read_csv(f)
-
-
 class DensityWidget(QWidget):
     def __init__(self):
         super().__init__()
@@ -115,10 +59,11 @@ class DensityWidget(QWidget):
 
 
 class EfficiencyWidget(QWidget):
-    def __init__(self, week_df, density_widget, tabs):
+    def __init__(self, week_df, players, density_widget, tabs):
         super().__init__()
         
         self.week_df = week_df
+        self.players = players
         self.density_widget = density_widget
         self.tabs = tabs
         self.df = None
@@ -312,7 +257,7 @@ class EfficiencyWidget(QWidget):
         name = row["PlayerName"]
         pos = row["Pos"]
         
-        player_data = self.week_df[self.week_df["PlayerName"] == name]["TotalPoints"]
+        player_data = self.players.rows(row["PlayerId"])["TotalPoints"]
         pos_data = self.week_df[self.week_df["Pos"] == pos]["TotalPoints"]
         
         player_vals = player_data.dropna().to_numpy()
@@ -336,11 +281,12 @@ def main():
     app = QApplication(sys.argv)
     
     week_df = load_week_data(path)
+    players = load_player_index(path)
     
     tabs = QTabWidget()
     
     density = DensityWidget()
-    efficiency = EfficiencyWidget(week_df, density, tabs)
+    efficiency = EfficiencyWidget(week_df, players, density, tabs)
     
     tabs.addTab(efficiency, "Opportunity vs Efficiency")
     tabs.addTab(density, "Player Density")
@@ -0,0 +1,92 @@
+"""
+Player dimension table and constant-time lookups into the weekly data.
+
+Names are not unique across the data (a few dozen names belong to more than
+one player), so everything here is keyed by the PlayerId column the CSVs
+carry. The weekly table is sorted once by (PlayerId, season, week); each
+player's rows are then one contiguous slice, and the dimension table stores
+where that slice starts and stops.
+"""
+import numpy as np
+import pandas as pd
+
+
+class PlayerIndex:
+    def __init__(self, weekly, season=None):
+        """
+        Args:
+            weekly (pd.DataFrame): Weekly table with PlayerId, season and week columns.
+            season (pd.DataFrame): Optional season table, so players who only appear
+                in season totals (2015 - 2020) are still in the dimension table.
+        """
+        ids = weekly["PlayerId"].to_numpy()
+        order = np.lexsort((weekly["week"].to_numpy(), weekly["season"].to_numpy(), ids))
+        self.weekly = weekly.iloc[order].reset_index(drop=True)
+
+        ids = self.weekly["PlayerId"].to_numpy()
+        if len(ids) > 0:
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        else:
+            starts = np.array([], dtype=np.int64)
+        stops = np.r_[starts[1:], len(ids)].astype(np.int64)
+
+        # The last row of each slice is the player's most recent week.
+        latest = self.weekly.iloc[stops - 1] if len(ids) > 0 else self.weekly.iloc[[]]
+        dim = pd.DataFrame({
+            "PlayerId": ids[starts],
+            "PlayerName": latest["PlayerName"].astype(str).to_numpy(),
+            "Pos": latest["Pos"].astype(str).to_numpy(),
+            "Team": latest["Team"].astype(str).to_numpy(),
+            "first_season": self.weekly["season"].to_numpy()[starts],
+            "last_season": latest["season"].to_numpy(),
+            "weeks": stops - starts,
+            "start": starts,
+            "stop": stops,
+        })
+
+        if season is not None and len(season) > 0:
+            dim = pd.concat([dim, self.season_only(season, dim["PlayerId"])], ignore_index=True)
+
+        self.players = dim.set_index("PlayerId")
+        self.offsets = dict(zip(dim["PlayerId"].tolist(), zip(dim["start"].tolist(), dim["stop"].tolist())))
+
+        self.by_name = {}
+        for pid, name in zip(dim["PlayerId"].tolist(), dim["PlayerName"].tolist()):
+            self.by_name.setdefault(name, []).append(pid)
+
+    def season_only(self, season, known_ids):
+        df = season[~season["PlayerId"].isin(known_ids)]
+        df = df.sort_values(["PlayerId", "season"])
+
+        first = df.groupby("PlayerId")["season"].min()
+        latest = df.drop_duplicates("PlayerId", keep="last").set_index("PlayerId")
+
+        return pd.DataFrame({
+            "PlayerId": latest.index.to_numpy(),
+            "PlayerName": latest["PlayerName"].astype(str).to_numpy(),
+            "Pos": latest["Pos"].astype(str).to_numpy(),
+            "Team": latest["Team"].astype(str).to_numpy(),
+            "first_season": first.loc[latest.index].to_numpy(),
+            "last_season": latest["season"].to_numpy(),
+            "weeks": 0,
+            "start": 0,
+            "stop": 0,
+        })
+
+    def rows(self, player_id):
+        """
+        Returns every weekly row of one player, oldest first.
+
+        Args:
+            player_id (int): PlayerId from any player CSV.
+        Returns:
+            pd.DataFrame: Slice of the player-sorted weekly table. Empty if the id is unknown.
+        """
+        start, stop = self.offsets.get(int(player_id), (0, 0))
+        return self.weekly.iloc[start:stop]
+
+    def ids_for_name(self, name):
+        return self.by_name.get(name, [])
+
+    def player(self, player_id):
+        return self.players.loc[int(player_id)]
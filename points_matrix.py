@@ -0,0 +1,269 @@
+"""
+Dense players x seasons x weeks array of weekly fantasy points.
+
+Most questions the dashboard asks are "points for player p in season s,
+week w". Answering them from the long weekly table means filtering and
+grouping every time; this module lays the weekly table out once as a
+float32 array (NaN where the player has no row that week) with int8 arrays of
+the same shape for the player's position, team and opponent in that week
+(-1 where there is no row, and for the opponent also on bye weeks).
+
+The arrays are saved as .npy files next to the compiled store and opened
+with mmap_mode="r", so every process reading them shares the same pages.
+They are rebuilt whenever the store's manifest changes.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from data_store import compile_store, load_table, manifest_name, store_dir
+
+arrays = ["points", "positions", "teams", "opponents", "player_ids", "seasons", "weeks"]
+matrix_version = 1
+
+
+def matrix_dir(base):
+    return store_dir(base) / "matrix"
+
+
+def manifest_hash(base):
+    f = store_dir(base) / manifest_name
+
+    if not f.exists():
+        return ""
+
+    with open(f, "rb") as fh:
+        return hashlib.md5(fh.read()).hexdigest()
+
+
+def codes(values, labels):
+    return pd.Categorical(values, categories=labels).codes.astype(np.int8)
+
+
+def build_points_matrix(weekly, out):
+    """
+    Lays the weekly table out as dense arrays and saves them under out.
+
+    Args:
+        weekly (pd.DataFrame): Weekly table with PlayerId, Pos, Team, PlayerOpponent,
+            TotalPoints, season and week columns.
+        out (Path): Directory for the .npy files and their labels.
+    """
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+
+    player_ids = np.unique(weekly["PlayerId"].to_numpy()).astype(np.int32)
+    seasons = np.unique(weekly["season"].to_numpy()).astype(np.int16)
+    weeks = np.arange(1, int(weekly["week"].max()) + 1, dtype=np.int8) if len(weekly) > 0 else np.array([], dtype=np.int8)
+
+    opponent = weekly["PlayerOpponent"].astype(str).str.replace("@", "", regex=False).str.strip()
+    opponent = opponent.where(~opponent.str.upper().isin(["BYE", "NONE", "", "NAN"]), "")
+
+    pos_names = sorted(weekly["Pos"].astype(str).unique())
+    team_names = sorted(set(weekly["Team"].astype(str).unique()) | set(opponent.unique()) - {""})
+
+    p = np.searchsorted(player_ids, weekly["PlayerId"].to_numpy())
+    s = np.searchsorted(seasons, weekly["season"].to_numpy())
+    w = weekly["week"].to_numpy().astype(np.int64) - 1
+
+    shape = (len(player_ids), len(seasons), len(weeks))
+    points = np.full(shape, np.nan, dtype=np.float32)
+    positions = np.full(shape, -1, dtype=np.int8)
+    teams = np.full(shape, -1, dtype=np.int8)
+    opponents = np.full(shape, -1, dtype=np.int8)
+
+    points[p, s, w] = weekly["TotalPoints"].to_numpy(dtype=np.float32)
+    positions[p, s, w] = codes(weekly["Pos"].astype(str), pos_names)
+    teams[p, s, w] = codes(weekly["Team"].astype(str), team_names)
+    opponents[p, s, w] = codes(opponent, team_names)
+
+    data = {
+        "points": points,
+        "positions": positions,
+        "teams": teams,
+        "opponents": opponents,
+        "player_ids": player_ids,
+        "seasons": seasons,
+        "weeks": weeks,
+    }
+    for name in arrays:
+        tmp = out / (name + ".tmp.npy")
+        np.save(tmp, data[name])
+        os.replace(tmp, out / (name + ".npy"))
+
+    return pos_names, team_names
+
+
+def load_points_matrix(base, refresh=True):
+    """
+    Opens the memory-mapped matrix for a data tree, rebuilding it first if the
+    compiled store has changed since it was written.
+
+    Args:
+        base (Path): Root of the NFL-data-Players tree.
+        refresh (bool): If set to True, recompiles changed folders of the store first.
+    Returns:
+        PointsMatrix
+    """
+    if refresh:
+        compile_store(base)
+
+    out = matrix_dir(base)
+    meta_file = out / "meta.json"
+    current = manifest_hash(base)
+
+    meta = {}
+    if meta_file.exists():
+        with open(meta_file) as fh:
+            meta = json.load(fh)
+
+    if meta.get("version") != matrix_version or meta.get("manifest") != current:
+        weekly = load_table("weekly", base, refresh=False)
+        pos_names, team_names = build_points_matrix(weekly, out)
+
+        meta = {"version": matrix_version, "manifest": current, "positions": pos_names, "teams": team_names}
+        with open(meta_file, "w") as fh:
+            json.dump(meta, fh)
+
+    return PointsMatrix(out, meta["positions"], meta["teams"])
+
+
+class PointsMatrix:
+    def __init__(self, folder, pos_names, team_names):
+        folder = Path(folder)
+
+        self.points = np.load(folder / "points.npy", mmap_mode="r")
+        self.positions = np.load(folder / "positions.npy", mmap_mode="r")
+        self.teams = np.load(folder / "teams.npy", mmap_mode="r")
+        self.opponents = np.load(folder / "opponents.npy", mmap_mode="r")
+        self.player_ids = np.load(folder / "player_ids.npy")
+        self.seasons = np.load(folder / "seasons.npy")
+        self.weeks = np.load(folder / "weeks.npy")
+
+        self.pos_names = list(pos_names)
+        self.team_names = list(team_names)
+
+    def pos_code(self, pos):
+        if pos not in self.pos_names:
+            return -1
+        return self.pos_names.index(pos)
+
+    def season_index(self, season):
+        i = int(np.searchsorted(self.seasons, season))
+        if i >= len(self.seasons) or self.seasons[i] != season:
+            return -1
+        return i
+
+    def player_row(self, player_id):
+        """
+        Returns the seasons x weeks points of one player, or None if unknown.
+        """
+        i = int(np.searchsorted(self.player_ids, player_id))
+        if i >= len(self.player_ids) or self.player_ids[i] != player_id:
+            return None
+        return self.points[i]
+
+    def latest_positions(self, rows):
+        """
+        Returns the position each player (matrix row) held in their latest game, "" if none.
+        """
+        codes = np.asarray(self.positions[rows]).reshape(len(rows), -1)
+        has_pos = codes >= 0
+        last = codes.shape[1] - 1 - np.argmax(has_pos[:, ::-1], axis=1)
+        codes = np.where(has_pos.any(axis=1), codes[np.arange(len(rows)), last], -1)
+
+        pos_names = np.array(self.pos_names + [""], dtype=object)
+        return pos_names[codes]
+
+    def position_values(self, pos, season=None):
+        """
+        Returns every weekly score recorded at a position, optionally for one season only.
+        """
+        code = self.pos_code(pos)
+
+        if season is None:
+            return self.points[self.positions == code]
+
+        s = self.season_index(season)
+        if s < 0:
+            return np.array([], dtype=np.float32)
+        return self.points[:, s][self.positions[:, s] == code]
+
+    def played_weeks(self, season):
+        """
+        Returns the week numbers of a season that have at least one game.
+        """
+        s = self.season_index(season)
+        if s < 0:
+            return np.array([], dtype=np.int8)
+        has_game = (self.opponents[:, s] >= 0).any(axis=0)
+        return self.weeks[has_game]
+
+    def points_vs_average(self, season, w_start, w_end):
+        """
+        Averages, per opponent and position, how far each player's score was above
+        the mean score at that position that week. Bye weeks are left out.
+
+        Args:
+            season (int): Season year.
+            w_start (int): First week, inclusive.
+            w_end (int): Last week, inclusive.
+        Returns:
+            tuple: (teams x positions mean difference, teams x positions game counts),
+                indexed by team_names and pos_names.
+        """
+        n_teams = len(self.team_names)
+        n_pos = len(self.pos_names)
+
+        s = self.season_index(season)
+        if s < 0:
+            return np.zeros((n_teams, n_pos)), np.zeros((n_teams, n_pos), dtype=np.int64)
+
+        cols = slice(max(w_start, 1) - 1, min(w_end, len(self.weeks)))
+        pts = self.points[:, s, cols]
+        pos = self.positions[:, s, cols].astype(np.int64)
+        opp = self.opponents[:, s, cols].astype(np.int64)
+
+        valid = ~np.isnan(pts) & (opp >= 0)
+        n_weeks = pts.shape[1]
+        week = np.broadcast_to(np.arange(n_weeks), pts.shape)[valid]
+        vals = pts[valid].astype(np.float64)
+        pos = pos[valid]
+        opp = opp[valid]
+
+        key = pos * n_weeks + week
+        total = np.bincount(key, weights=vals, minlength=n_pos * n_weeks)
+        count = np.bincount(key, minlength=n_pos * n_weeks)
+        avg = total / np.maximum(count, 1)
+
+        cell = opp * n_pos + pos
+        sums = np.bincount(cell, weights=vals - avg[key], minlength=n_teams * n_pos).reshape(n_teams, n_pos).astype(np.float64)
+        counts = np.bincount(cell, minlength=n_teams * n_pos).reshape(n_teams, n_pos)
+
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        return means, counts
+
+    def player_stats(self, include_byes=False):
+        """
+        Per-player consistency numbers over every recorded week.
+
+        Args:
+            include_byes (bool): If set to True, bye-week rows count as games.
+        Returns:
+            pd.DataFrame: PlayerId, games, mean, population std and coefficient of variation (std / mean).
+        """
+        pts = self.points.reshape(len(self.player_ids), -1)
+        if not include_byes:
+            pts = np.where(self.opponents.reshape(len(self.player_ids), -1) >= 0, pts, np.nan)
+
+        played = ~np.isnan(pts)
+        games = played.sum(axis=1)
+        filled = np.where(played, pts, 0).astype(np.float64)
+        mean = np.divide(filled.sum(axis=1), games, out=np.full(len(games), np.nan), where=games > 0)
+        dev = np.where(played, filled - mean[:, None], 0)
+        std = np.sqrt(np.divide((dev ** 2).sum(axis=1), games, out=np.full(len(games), np.nan), where=games > 0))
+        cv = np.divide(std, mean, out=np.full(len(games), np.nan), where=(games > 0) & (mean != 0))
+
+        return pd.DataFrame({"PlayerId": self.player_ids, "games": games, "mean": mean, "std": std, "cv": cv})
@@ -0,0 +1,284 @@
+"""
+How far the weekly projections were from what players actually scored.
+
+Every projected/<POS>_projected.csv row is joined by (PlayerId, season, week)
+to the player's row in the weekly files, giving one (projected, actual) pair
+per player-week. The pairs are cached next to the compiled store, one
+partition per season, and only weeks whose files changed are re-joined.
+
+Errors are actual - projected, so a positive bias means the projections
+were too low. Rank correlation is Spearman's: the Pearson correlation of
+projected and actual points after ranking each within the group.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from data_store import compile_store, read_manifest, read_partition, store_dir, write_partition
+
+pairs_table = "projection_pairs"
+pairs_version = 1
+
+# Upper bounds of the projected-rank buckets; ranks past the last one form a final bucket.
+rank_buckets = [12, 24, 36, 60]
+
+pair_columns = ["PlayerId", "PlayerName", "Pos", "season", "week", "projected", "actual", "ProjectedRank", "rank_bucket", "error"]
+
+group_levels = {
+    "position": ["Pos"],
+    "season": ["season"],
+    "week": ["season", "week"],
+    "rank_bucket": ["Pos", "rank_bucket"],
+}
+
+
+def bucket_labels(bounds=rank_buckets):
+    labels = []
+    low = 1
+    for high in bounds:
+        labels.append(f"{low}-{high}")
+        low = high + 1
+    labels.append(f"{low}+")
+    return labels
+
+
+def rank_bucket(ranks, bounds=rank_buckets):
+    """
+    Labels projected ranks with their bucket ("1-12", "13-24", ...). Unranked rows get "unranked".
+    """
+    labels = np.array(bucket_labels(bounds) + ["unranked"], dtype=object)
+    ranks = np.asarray(ranks, dtype=np.float64)
+
+    idx = np.searchsorted(np.array(bounds), ranks, side="left")
+    idx = np.where(np.isnan(ranks) | (ranks < 1), len(labels) - 1, idx)
+    return pd.Categorical(labels[idx], categories=list(labels))
+
+
+def join_pairs(weekly, projected):
+    """
+    Pairs every projection with the actual score of the same player-week.
+
+    Args:
+        weekly (pd.DataFrame): Weekly rows with PlayerId, season, week and TotalPoints.
+        projected (pd.DataFrame): Projected rows with PlayerId, season, week,
+            PlayerWeekProjectedPts and ProjectedRank.
+    Returns:
+        pd.DataFrame: PlayerId, PlayerName, Pos, season, week, projected, actual,
+            ProjectedRank, rank_bucket and error (actual - projected).
+    """
+    keys = ["PlayerId", "season", "week"]
+
+    proj = projected[[col for col in keys + ["PlayerName", "Pos", "PlayerWeekProjectedPts", "ProjectedRank"] if col in projected.columns]]
+    proj = proj[proj["PlayerWeekProjectedPts"].notna()]
+    if "ProjectedRank" not in proj.columns:
+        # Older projected files carry no rank column at all.
+        proj = proj.assign(ProjectedRank=np.nan)
+    actual = weekly[keys + ["TotalPoints"]]
+    actual = actual[actual["TotalPoints"].notna()]
+
+    df = proj.merge(actual, on=keys, how="inner")
+    df = df.rename(columns={"PlayerWeekProjectedPts": "projected", "TotalPoints": "actual"})
+
+    df["projected"] = df["projected"].astype(np.float64)
+    df["actual"] = df["actual"].astype(np.float64)
+    df["error"] = df["actual"] - df["projected"]
+    df["rank_bucket"] = rank_bucket(df["ProjectedRank"])
+
+    return df[pair_columns].reset_index(drop=True)
+
+
+def week_hashes(base):
+    """
+    Fingerprint of each week folder's files, from the store manifest.
+
+    Returns:
+        dict: "2021/3" -> md5 of that folder's manifest entry.
+    """
+    folders = read_manifest(store_dir(base))
+
+    hashes = {}
+    for key, files in folders.items():
+        if "/" in key:
+            hashes[key] = hashlib.md5(json.dumps(files, sort_keys=True).encode()).hexdigest()
+    return hashes
+
+
+def update_pairs(base, refresh=True):
+    """
+    Re-joins the weeks whose weekly or projected files changed since the last call.
+
+    Args:
+        base (Path): Root of the NFL-data-Players tree.
+        refresh (bool): If set to True, recompiles changed folders of the store first.
+    Returns:
+        list: Week keys ("2021/3") that were re-joined.
+    """
+    if refresh:
+        compile_store(base)
+
+    out = store_dir(base)
+    meta_file = out / pairs_table / "meta.json"
+
+    meta = {}
+    if meta_file.exists():
+        with open(meta_file) as fh:
+            meta = json.load(fh)
+    if meta.get("version") != pairs_version:
+        meta = {}
+    old = meta.get("weeks", {})
+
+    new = week_hashes(base)
+    changed = sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+    years = sorted(set(key.split("/")[0] for key in changed))
+    for year in years:
+        weeks = [int(key.split("/")[1]) for key in changed if key.split("/")[0] == year]
+
+        frames = []
+        cached = read_partition(out, pairs_table, year) if len(old) > 0 else None
+        if cached is not None:
+            frames.append(cached[~cached["week"].isin(weeks)])
+
+        weekly = read_partition(out, "weekly", year)
+        projected = read_partition(out, "projected", year)
+        if weekly is not None and projected is not None:
+            weekly = weekly[weekly["week"].isin(weeks)]
+            projected = projected[projected["week"].isin(weeks)]
+            frames.append(join_pairs(weekly, projected))
+
+        frames = [df for df in frames if len(df) > 0]
+        df = None
+        if len(frames) > 0:
+            df = pd.concat(frames, ignore_index=True)
+            df = df.sort_values(["week", "Pos", "PlayerId"], kind="stable").reset_index(drop=True)
+        write_partition(out, pairs_table, year, df)
+
+    if len(changed) > 0 or len(old) == 0:
+        meta_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = meta_file.with_suffix(".tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"version": pairs_version, "weeks": new}, fh)
+        os.replace(tmp, meta_file)
+
+    return changed
+
+
+def load_pairs(base, refresh=True):
+    """
+    Returns every (projected, actual) pair, bringing the cache up to date first.
+    """
+    update_pairs(base, refresh)
+
+    frames = []
+    for f in sorted((store_dir(base) / pairs_table).glob("*.pkl")):
+        frames.append(pd.read_pickle(f))
+
+    frames = [df for df in frames if len(df) > 0]
+    if len(frames) == 0:
+        return pd.DataFrame(columns=pair_columns)
+
+    df = pd.concat(frames, ignore_index=True)
+    df["Pos"] = df["Pos"].astype("category")
+    df["PlayerName"] = df["PlayerName"].astype("category")
+    df["rank_bucket"] = pd.Categorical(df["rank_bucket"], categories=bucket_labels() + ["unranked"])
+    return df
+
+
+def accuracy(pairs, by):
+    """
+    Error statistics of the projections per group.
+
+    Args:
+        pairs (pd.DataFrame): Output of load_pairs or join_pairs.
+        by (list): Columns to group by, e.g. ["Pos"] or ["season", "week"].
+    Returns:
+        pd.DataFrame: n, mae, rmse, bias (mean of actual - projected) and
+            spearman (rank correlation of projected and actual) per group.
+    """
+    df = pairs[by + ["projected", "actual", "error"]].copy()
+    df["abs_error"] = df["error"].abs()
+    df["sq_error"] = df["error"] ** 2
+
+    # Spearman: rank within each group, then Pearson on the ranks.
+    grouped = df.groupby(by, observed=True)
+    df["rp"] = grouped["projected"].rank()
+    df["ra"] = grouped["actual"].rank()
+    df["rp2"] = df["rp"] ** 2
+    df["ra2"] = df["ra"] ** 2
+    df["rpa"] = df["rp"] * df["ra"]
+
+    sums = df.groupby(by, observed=True)[["error", "abs_error", "sq_error", "rp", "ra", "rp2", "ra2", "rpa"]].sum()
+    n = df.groupby(by, observed=True).size()
+
+    cov = sums["rpa"] - sums["rp"] * sums["ra"] / n
+    var_p = sums["rp2"] - sums["rp"] ** 2 / n
+    var_a = sums["ra2"] - sums["ra"] ** 2 / n
+    denom = np.sqrt(var_p * var_a)
+
+    result = pd.DataFrame({
+        "n": n,
+        "mae": sums["abs_error"] / n,
+        "rmse": np.sqrt(sums["sq_error"] / n),
+        "bias": sums["error"] / n,
+        "spearman": (cov / denom).where(denom > 0),
+    })
+    return result
+
+
+class ProjectionAccuracy:
+    """
+    Accuracy tables for one data tree, recomputed only when new weeks land.
+    """
+    def __init__(self, base):
+        self.base = base
+        self.pairs = None
+        self.results = {}
+
+    def refresh(self):
+        """
+        Brings the pairs up to date. Returns the week keys that changed.
+        """
+        changed = update_pairs(self.base)
+
+        if self.pairs is None or len(changed) > 0:
+            self.pairs = load_pairs(self.base, refresh=False)
+            self.results = {}
+
+        return changed
+
+    def table(self, level, pos=None):
+        """
+        Accuracy per position, season, week or projected-rank bucket.
+
+        Args:
+            level (string): Key of group_levels, or a list of columns.
+            pos (string): If given, only that position's projections.
+        Returns:
+            pd.DataFrame: See accuracy().
+        """
+        if self.pairs is None:
+            self.refresh()
+
+        by = group_levels[level] if isinstance(level, str) else list(level)
+        key = (tuple(by), pos)
+
+        if key not in self.results:
+            pairs = self.pairs
+            if pos is not None:
+                pairs = pairs[pairs["Pos"] == pos]
+            self.results[key] = accuracy(pairs, by)
+
+        return self.results[key]
+
+
+if __name__ == "__main__":
+    from data_store import path
+
+    engine = ProjectionAccuracy(path)
+    engine.refresh()
+
+    pd.set_option("display.width", 120)
+    for level in ["position", "season", "rank_bucket"]:
+        print(engine.table(level).round(3))
+        print()
@@ -0,0 +1,85 @@
+"""
+Precomputed season x position x rank table of season point totals.
+
+The scarcity chart only ever asks for "points at each rank of one position,
+in one season or averaged over all seasons", cut off at some league-size
+dependent rank. ScarcityCube answers that with an array slice. All ranks are
+kept, so any league size can be drawn without recomputing.
+"""
+import numpy as np
+
+average = "Average"
+
+
+class ScarcityCube:
+    def __init__(self, df, years, pos_list):
+        """
+        Args:
+            df (pd.DataFrame): Season totals with season, PlayerName, Pos, Rank and TotalPoints columns.
+            years (list): Seasons to include, in display order.
+            pos_list (list): Positions to include.
+        """
+        self.labels = [str(y) for y in years] + [average]
+        self.pos_list = list(pos_list)
+
+        df = df[df["season"].isin(years) & df["Pos"].isin(pos_list) & (df["Rank"] >= 1)]
+
+        n_ranks = int(df["Rank"].max()) if len(df) > 0 else 0
+        shape = (len(self.labels), len(self.pos_list), n_ranks)
+        self.points = np.full(shape, np.nan)
+        self.names = np.full(shape, "", dtype=object)
+
+        s = np.searchsorted(np.array(years), df["season"].to_numpy())
+        p = np.array([self.pos_list.index(pos) for pos in df["Pos"].astype(str)], dtype=np.int64)
+        r = df["Rank"].to_numpy().astype(np.int64) - 1
+
+        self.points[s, p, r] = df["TotalPoints"].to_numpy(dtype=np.float64)
+        self.names[s, p, r] = df["PlayerName"].astype(str).to_numpy()
+
+        # The average is over the seasons that have a player at that rank. Its
+        # name is the first one the season table lists for the rank.
+        seasons = self.points[:-1]
+        counts = (~np.isnan(seasons)).sum(axis=0)
+        totals = np.nansum(seasons, axis=0)
+        self.points[-1] = np.divide(totals, counts, out=np.full(totals.shape, np.nan), where=counts > 0)
+
+        first = df.groupby(["Pos", "Rank"], observed=True)["PlayerName"].first()
+        if len(first) > 0:
+            p = np.array([self.pos_list.index(pos) for pos in first.index.get_level_values(0).astype(str)], dtype=np.int64)
+            r = first.index.get_level_values(1).to_numpy().astype(np.int64) - 1
+            self.names[-1, p, r] = first.astype(str).to_numpy()
+
+    def curve(self, label, pos, cut):
+        """
+        Returns the ranks 1 - cut of one position that have a player.
+
+        Args:
+            label (string): Season as text, or "Average".
+            pos (string): Position.
+            cut (int): Last rank to include.
+        Returns:
+            tuple: (ranks, points, player names) as arrays, all empty if nothing matches.
+        """
+        if label not in self.labels or pos not in self.pos_list:
+            return np.array([], dtype=np.int64), np.array([]), np.array([], dtype=object)
+
+        s = self.labels.index(label)
+        p = self.pos_list.index(pos)
+
+        points = self.points[s, p, :cut]
+        keep = ~np.isnan(points)
+        ranks = np.arange(1, len(points) + 1)
+
+        return ranks[keep], points[keep], self.names[s, p, :cut][keep]
+
+    def max_points(self, max_rank=None):
+        """
+        Returns the highest season total in the cube, optionally only among ranks 1 - max_rank.
+        """
+        points = self.points[:-1]
+        if max_rank is not None:
+            points = points[:, :, :max_rank]
+
+        if points.size == 0 or np.isnan(points).all():
+            return np.nan
+        return float(np.nanmax(points))
@@ -0,0 +1,172 @@
+"""
+Declared column types for every family of player file.
+
+Reading with pandas' defaults gives 64-bit floats for the sparse stat columns,
+object strings for names, teams and opponents, and plain strings for every
+value in the JSON twins. The schemas below read names and codes as
+categoricals, ids and ranks as small ints and stats as float32. Counting stats
+are float32 rather than ints because they are mostly blank and projections
+carry fractional values.
+
+Families:
+    offense_weekly  <year>/<week>/{QB,RB,WR,TE}.csv
+    offense_season  <year>/{QB,RB,WR,TE}_season.csv
+    kicker          K weekly and season files
+    idp             DB, LB and DL weekly and season files
+    projected       <year>/<week>/projected/<POS>_projected.csv
+"""
+from pathlib import Path
+import pandas as pd
+from pandas.api.types import pandas_dtype
+
+identity = {
+    "PlayerName": "category",
+    "PlayerId": "int32",
+    "Pos": "category",
+    "Team": "category",
+    "PlayerOpponent": "category",
+    "Rank": "int16",
+    "TotalPoints": "float32",
+    "season": "int16",
+    "week": "int8",
+}
+
+offense_stats = [
+    "PassingYDS", "PassingTD", "PassingInt", "RushingYDS", "RushingTD",
+    "ReceivingRec", "ReceivingYDS", "ReceivingTD", "RetTD", "FumTD", "2PT", "Fum",
+    "FanPtsAgainst-pts", "TouchCarries", "TouchReceptions", "Touches",
+    "TargetsReceptions", "Targets", "ReceptionPercentage", "RzTarget", "RzTouch", "RzG2G",
+]
+
+kicker_stats = [
+    "PatMade", "PatMissed", "FgMade_0-19", "FgMade_20-29", "FgMade_30-39",
+    "FgMade_40-49", "FgMade_50", "FgMiss_0-19", "FgMiss_20-29", "FgMiss_30-39",
+]
+
+idp_stats = [
+    "TacklesTot", "TacklesAst", "TacklesSck", "TacklesTfl", "TurnoverInt",
+    "TurnoverFrcFum", "TurnoverFumRec", "ScoreIntTd", "ScoreFumTd", "ScoreBlkTd",
+    "ScoreSaf", "ScoreDef2ptRet", "Blk", "PDef", "QBHit", "ReturnIntYds", "ReturnFumYds",
+]
+
+projection_stats = [
+    "PlayerWeekProjectedPts", "ProjectionDiff", "RushingPassingYDS", "y",
+]
+
+
+def build_schema(stat_columns, extra=None):
+    dtypes = dict(identity)
+    for col in stat_columns:
+        dtypes[col] = "float32"
+    if extra is not None:
+        dtypes.update(extra)
+
+    # Resolve the names once; pandas otherwise re-parses every dtype string per column per file.
+    for col in dtypes:
+        dtypes[col] = pandas_dtype(dtypes[col])
+    return dtypes
+
+
+families = {
+    "offense_weekly": build_schema(offense_stats),
+    "offense_season": build_schema(offense_stats),
+    "kicker": build_schema(kicker_stats),
+    "idp": build_schema(idp_stats),
+    "projected": build_schema(offense_stats + kicker_stats + idp_stats + projection_stats, {"ProjectedRank": "int16"}),
+}
+
+# Tables mixing several families (the compiled store) use the union of all of them.
+families["all"] = families["projected"]
+
+category_columns = [col for col, dtype in identity.items() if dtype == "category"]
+
+
+def family_for(f):
+    """
+    Works out which schema applies to a file from its name.
+
+    Args:
+        f (Path): Player CSV or JSON file.
+    Returns:
+        string: Key into families.
+    """
+    stem = Path(f).stem
+
+    if stem.endswith("_projected"):
+        return "projected"
+
+    pos = stem.split("_")[0]
+    if pos == "K":
+        return "kicker"
+    if pos in ("DB", "LB", "DL"):
+        return "idp"
+    if stem.endswith("_season"):
+        return "offense_season"
+    return "offense_weekly"
+
+
+def read_player_csv(f, columns=None, family=None):
+    """
+    Reads a player CSV with its family's declared dtypes.
+
+    Args:
+        f (Path): File to read.
+        columns (list): If given, only these columns are parsed. Missing ones are skipped.
+        family (string): Schema to use. Detected from the file name by default.
+    Returns:
+        pd.DataFrame: File contents.
+    """
+    if family is None:
+        family = family_for(f)
+
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda col: col in wanted
+
+    return pd.read_csv(f, dtype=families[family], usecols=usecols)
+
+
+def apply_schema(df, family="all"):
+    """
+    Casts an already loaded frame to a family's dtypes. Blank strings become NaN.
+    Integer columns that turn out to have gaps fall back to float32.
+    """
+    for col, dtype in families[family].items():
+        if col not in df.columns:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+            continue
+
+        values = pd.to_numeric(df[col], errors="coerce")
+        if dtype.kind == "i" and values.isna().any():
+            dtype = families["all"]["TotalPoints"]
+        df[col] = values.astype(dtype)
+    return df
+
+
+def read_player_json(f, columns=None, family=None):
+    """
+    Reads one of the row-per-object JSON twins, whose values are all strings,
+    and casts it to the same dtypes as the matching CSV.
+    """
+    if family is None:
+        family = family_for(f)
+
+    df = pd.read_json(f, dtype=False)
+
+    if columns is not None:
+        df = df[[col for col in df.columns if col in columns]]
+
+    return apply_schema(df, family)
+
+
+def categorize(df):
+    """
+    Restores categorical dtypes lost by concatenating frames whose categories differ.
+    """
+    for col in category_columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
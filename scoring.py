@@ -0,0 +1,328 @@
+"""
+Fantasy points and ranks under any scoring system, from the raw stat columns.
+
+The shipped TotalPoints and Rank follow one league's scoring (the offense
+matches half-PPR below in ~94% of weeks and kickers in ~92%; the rest
+depends on stats the files do not carry, such as return yards). The IDP
+weights are only approximate: they match the shipped DB, LB and DL totals in
+~59-63% of weeks, and no weight set over the files' IDP columns does much
+better, since many shipped totals carry fractions those columns cannot
+produce. Any preset therefore re-scores IDP rows with common league values,
+not the shipped scoring. Every file also has the raw stats, so
+points under another system are the stats matrix (rows x stat columns) times
+a weight vector. Weights can differ by position (a TE premium is an extra
+weight on TE receptions), so each configuration is a positions x stats
+matrix, and many configurations are evaluated together: one product per
+position block gives every row's points under every configuration.
+
+Ranks are recomputed the way the files rank players: ordinal, best first,
+within (season, position) for season files and (season, week, position)
+for weekly files. Results are cached in memory and under .store/scoring,
+one folder per configuration hash, until the store's manifest changes.
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+from data_store import load_table, path, store_dir
+from points_matrix import manifest_hash
+
+scoring_version = 1
+
+# Guards the on-disk cache and every engine's in-memory results; engines share the folder.
+cache_lock = threading.RLock()
+
+offense_weights = {
+    "PassingYDS": 0.04, "PassingTD": 4, "PassingInt": -2,
+    "RushingYDS": 0.1, "RushingTD": 6,
+    "ReceivingYDS": 0.1, "ReceivingTD": 6, "ReceivingRec": 0,
+    "RetTD": 6, "FumTD": 6, "2PT": 2, "Fum": -2,
+}
+
+kicker_weights = {
+    "PatMade": 1, "PatMissed": -1,
+    "FgMade_0-19": 3, "FgMade_20-29": 3, "FgMade_30-39": 3, "FgMade_40-49": 4, "FgMade_50": 5,
+    "FgMiss_0-19": -1, "FgMiss_20-29": -1, "FgMiss_30-39": -1,
+}
+
+# Common IDP league values, not a fit to the shipped totals (see the module docstring).
+idp_weights = {
+    "TacklesTot": 1, "TacklesAst": 0.5, "TacklesSck": 2, "TacklesTfl": 1,
+    "TurnoverInt": 3, "TurnoverFrcFum": 3, "TurnoverFumRec": 3,
+    "ScoreIntTd": 6, "ScoreFumTd": 6, "ScoreBlkTd": 6, "ScoreSaf": 2, "ScoreDef2ptRet": 2,
+    "Blk": 2, "PDef": 1, "QBHit": 0.5, "ReturnIntYds": 0, "ReturnFumYds": 0,
+}
+
+stat_columns = list(offense_weights) + list(kicker_weights) + list(idp_weights)
+rank_keys = {"weekly": ["season", "week", "Pos"], "season": ["season", "Pos"]}
+
+
+def scoring_config(weights=None, position_weights=None, base=None):
+    """
+    Builds a scoring configuration.
+
+    Args:
+        weights (dict): Stat column -> points per unit, for every position.
+        position_weights (dict): Position -> {stat column -> extra points per unit},
+            added on top of weights (e.g. {"TE": {"ReceivingRec": 0.5}}).
+        base (dict): Configuration to start from; weights and position_weights override it.
+    Returns:
+        dict: {"weights": ..., "position_weights": ...}
+    """
+    config = {"weights": {}, "position_weights": {}}
+    if base is not None:
+        config = copy.deepcopy(base)
+
+    if weights is not None:
+        config["weights"].update(weights)
+    if position_weights is not None:
+        for pos, extra in position_weights.items():
+            config["position_weights"].setdefault(pos, {}).update(extra)
+
+    unknown = set(config["weights"])
+    for extra in config["position_weights"].values():
+        unknown |= set(extra)
+    unknown -= set(stat_columns)
+    if len(unknown) > 0:
+        raise ValueError("Unknown stat columns: " + ", ".join(sorted(unknown)))
+
+    return config
+
+
+standard = scoring_config(dict(offense_weights, **kicker_weights, **idp_weights))
+
+presets = {
+    "standard": standard,
+    "half_ppr": scoring_config({"ReceivingRec": 0.5}, base=standard),
+    "ppr": scoring_config({"ReceivingRec": 1}, base=standard),
+    "te_premium": scoring_config({"ReceivingRec": 1}, {"TE": {"ReceivingRec": 0.5}}, base=standard),
+    "six_point_passing": scoring_config({"ReceivingRec": 0.5, "PassingTD": 6}, base=standard),
+    "kicker_distance": scoring_config(
+        {"ReceivingRec": 0.5, "FgMade_0-19": 3, "FgMade_20-29": 3, "FgMade_30-39": 3,
+         "FgMade_40-49": 4, "FgMade_50": 5.5, "FgMiss_0-19": -2, "FgMiss_20-29": -2, "FgMiss_30-39": -1},
+        base=standard,
+    ),
+    "idp_big_play": scoring_config(
+        {"ReceivingRec": 0.5, "TacklesSck": 4, "TurnoverInt": 6, "TurnoverFrcFum": 4, "PDef": 2, "ReturnIntYds": 0.1, "ReturnFumYds": 0.1},
+        base=standard,
+    ),
+}
+
+
+def config_hash(config):
+    text = json.dumps(config, sort_keys=True)
+    return hashlib.md5(text.encode()).hexdigest()[:16]
+
+
+def weight_tensor(configs, pos_names):
+    """
+    Stacks configurations into one configs x positions x stats array.
+    """
+    weights = np.zeros((len(configs), len(pos_names), len(stat_columns)))
+
+    for c, config in enumerate(configs):
+        for j, col in enumerate(stat_columns):
+            weights[c, :, j] = config["weights"].get(col, 0)
+        for pos, extra in config["position_weights"].items():
+            if pos not in pos_names:
+                continue
+            p = pos_names.index(pos)
+            for col, w in extra.items():
+                weights[c, p, stat_columns.index(col)] += w
+
+    return weights
+
+
+def ordinal_ranks(points, groups, order):
+    """
+    Rank of every row within its group, best first; ties go to the row that
+    came first in the file, as in the shipped Rank column.
+
+    Args:
+        points (np.ndarray): rows x configs.
+        groups (np.ndarray): Group number of every row.
+        order (np.ndarray): Row position in the original files.
+    Returns:
+        np.ndarray: rows x configs, 1-based.
+    """
+    ranks = np.empty(points.shape, dtype=np.int32)
+    for c in range(points.shape[1]):
+        idx = np.lexsort((order, -points[:, c], groups))
+        g = groups[idx]
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        first = np.repeat(starts, np.diff(np.r_[starts, len(g)]))
+        ranks[idx, c] = np.arange(len(g)) - first + 1
+    return ranks
+
+
+class StatsMatrix:
+    def __init__(self, df, keys):
+        """
+        Args:
+            df (pd.DataFrame): Weekly or season table.
+            keys (list): Columns players are ranked within.
+        """
+        present = [col for col in stat_columns if col in df.columns]
+        self.values = np.zeros((len(df), len(stat_columns)))
+        for col in present:
+            self.values[:, stat_columns.index(col)] = np.nan_to_num(df[col].to_numpy(dtype=np.float64))
+
+        self.pos_names = sorted(df["Pos"].astype(str).unique())
+        self.pos = np.searchsorted(self.pos_names, df["Pos"].astype(str).to_numpy())
+
+        self.groups = df.groupby(keys, observed=True, sort=False).ngroup().to_numpy()
+
+    def evaluate(self, configs):
+        """
+        Points and ranks of every row under every configuration.
+
+        Returns:
+            tuple: (rows x configs float32 points, rows x configs int32 ranks)
+        """
+        weights = weight_tensor(configs, self.pos_names)
+
+        points = np.zeros((len(self.values), len(configs)))
+        for p in range(len(self.pos_names)):
+            rows = self.pos == p
+            points[rows] = self.values[rows] @ weights[:, p, :].T
+
+        points = points.astype(np.float32)
+        ranks = ordinal_ranks(points, self.groups, np.arange(len(points)))
+        return points, ranks
+
+
+class ScoringEngine:
+    """
+    Re-scored copies of the weekly and season tables, cached per configuration.
+    """
+    def __init__(self, base=path, table=None):
+        """
+        Args:
+            base (Path): Root of the NFL-data-Players tree.
+            table (callable): Returns a table by name. Defaults to reading the store,
+                pass DataRepository.table to share the repository's copies.
+        """
+        self.base = base
+        self.tables = {}
+        self.load = table
+        self.stats = {}
+        self.results = {}
+
+    def cache_dir(self):
+        """
+        The on-disk cache, emptied whenever the store's manifest changes.
+        """
+        out = store_dir(self.base) / "scoring"
+        meta_file = out / "meta.json"
+        current = {"version": scoring_version, "manifest": manifest_hash(self.base)}
+
+        meta = {}
+        if meta_file.exists():
+            with open(meta_file) as fh:
+                meta = json.load(fh)
+
+        if meta != current:
+            shutil.rmtree(out, ignore_errors=True)
+            out.mkdir(parents=True, exist_ok=True)
+            with open(meta_file, "w") as fh:
+                json.dump(current, fh)
+
+        return out
+
+    def table(self, name):
+        if self.load is not None:
+            return self.load(name)
+        if name not in self.tables:
+            self.tables[name] = load_table(name, self.base)
+        return self.tables[name]
+
+    def stats_matrix(self, name):
+        with cache_lock:
+            if name not in self.stats:
+                self.stats[name] = StatsMatrix(self.table(name), rank_keys[name])
+            return self.stats[name]
+
+    def evaluate(self, name, configs):
+        """
+        Points and ranks of every row of a table under each configuration.
+        Configurations not cached yet are evaluated together in one pass.
+
+        Args:
+            name (string): "weekly" or "season".
+            configs (list): Scoring configurations (see scoring_config and presets).
+        Returns:
+            list: (points, ranks) arrays per configuration, aligned with the table's rows.
+        """
+        with cache_lock:
+            out = self.cache_dir()
+            keys = [(name, config_hash(config)) for config in configs]
+
+            todo = []
+            for key, config in zip(keys, configs):
+                if key in self.results:
+                    continue
+                f = out / key[1] / (name + ".npz")
+                if f.exists():
+                    with np.load(f) as data:
+                        self.results[key] = (data["points"], data["ranks"])
+                elif config not in todo:
+                    todo.append(config)
+
+            if len(todo) > 0:
+                points, ranks = self.stats_matrix(name).evaluate(todo)
+                for c, config in enumerate(todo):
+                    key = (name, config_hash(config))
+                    self.results[key] = (points[:, c].copy(), ranks[:, c].copy())
+
+                    folder = out / key[1]
+                    folder.mkdir(parents=True, exist_ok=True)
+                    with open(folder / "config.json", "w") as fh:
+                        json.dump(config, fh, sort_keys=True)
+                    with tempfile.NamedTemporaryFile(dir=folder, suffix=".tmp.npz", delete=False) as fh:
+                        np.savez(fh, points=points[:, c], ranks=ranks[:, c])
+                    os.replace(fh.name, folder / (name + ".npz"))
+
+            return [self.results[key] for key in keys]
+
+    def scored(self, name, config):
+        """
+        Returns a copy of a table with TotalPoints and Rank under one configuration.
+
+        Args:
+            name (string): "weekly" or "season".
+            config (dict or string): Scoring configuration, or the name of a preset.
+        """
+        if isinstance(config, str):
+            config = presets[config]
+
+        points, ranks = self.evaluate(name, [config])[0]
+
+        df = self.table(name).copy()
+        df["TotalPoints"] = points
+        df["Rank"] = ranks.astype(df["Rank"].dtype)
+        return df
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+
+    engine = ScoringEngine(path)
+
+    t0 = time.perf_counter()
+    for name in ["weekly", "season"]:
+        engine.evaluate(name, list(presets.values()))
+    print(f"{len(presets)} configurations x weekly and season tables in {time.perf_counter() - t0:.2f} s")
+
+    season = engine.table("season")
+    top = season[(season["season"] == 2024) & (season["Rank"] <= 3) & season["Pos"].isin(["QB", "RB", "WR", "TE"])]
+    table = pd.DataFrame({"PlayerName": top["PlayerName"].astype(str), "Pos": top["Pos"].astype(str), "shipped": top["TotalPoints"]})
+    for preset in presets:
+        table[preset] = engine.scored("season", preset).loc[top.index, "TotalPoints"]
+
+    pd.set_option("display.width", 160)
+    print(table.round(1).to_string(index=False))
@@ -0,0 +1,336 @@
+"""
+"Players like this one": nearest neighbours of player-seasons by stat profile.
+
+Every QB, RB, WR and TE season with points in the season files (2015 on)
+becomes a vector of usage, efficiency and red-zone numbers. Each feature is
+standardized within its (season, position), so players are compared with
+their own year's league and a season's vectors depend on that season's file
+alone. Neighbours come from a k-d tree per position.
+
+The season files leave a stat blank when it is 0, but some players are
+missing their usage columns altogether while the box-score columns are
+filled. A blank usage column with a non-zero box-score proxy (receptions for
+targets, rushing yards for carries, touchdowns for red-zone touches) is
+estimated from that season and position's ratio of the two.
+
+Vectors are cached per season under .store/similar and recomputed only for
+seasons whose files changed; the trees are rebuilt from them (milliseconds)
+and saved alongside.
+"""
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from data_store import compile_store, read_manifest, read_partition, store_dir, write_partition
+
+similar_table = "similar"
+similar_version = 1
+
+offense_pos = ["QB", "RB", "WR", "TE"]
+
+# Usage column -> box-score columns whose sum stands in for it when it is blank.
+usage_proxies = {
+    "TouchCarries": ["RushingYDS"],
+    "TouchReceptions": ["ReceivingRec"],
+    "Targets": ["ReceivingRec"],
+    "RzTouch": ["RushingTD", "ReceivingTD"],
+    "RzTarget": ["ReceivingTD"],
+    "RzG2G": ["RushingTD", "ReceivingTD"],
+}
+
+feature_groups = {
+    "usage": ["Touches", "TouchCarries", "Targets", "PassingYDS"],
+    "efficiency": ["TotalPoints", "pts_per_opp", "yds_per_touch", "catch_rate", "yds_per_target", "td_rate", "PassingTD", "PassingInt"],
+    "red_zone": ["RzTouch", "RzTarget", "RzG2G", "rz_share"],
+}
+features = [f for group in feature_groups.values() for f in group]
+meta_columns = ["PlayerId", "PlayerName", "Pos", "Team", "season"]
+
+
+def season_hashes(base):
+    """
+    Fingerprint of each season's *_season.csv files, from the store manifest.
+
+    Returns:
+        dict: "2021" -> md5 of that folder's manifest entry.
+    """
+    folders = read_manifest(store_dir(base))
+
+    hashes = {}
+    for key, files in folders.items():
+        if "/" not in key:
+            hashes[key] = hashlib.md5(json.dumps(files, sort_keys=True).encode()).hexdigest()
+    return hashes
+
+
+def ratio(a, b):
+    return np.divide(a, b, out=np.zeros(len(a)), where=b > 0)
+
+
+def fill_usage(df):
+    """
+    Blank stats as 0, with blank usage columns estimated from their proxies.
+    Works on one season of one position.
+    """
+    out = {}
+    for col in set(features) | set(usage_proxies) | {"Touches", "RushingYDS", "ReceivingYDS", "ReceivingRec", "RushingTD", "ReceivingTD"}:
+        if col in df.columns:
+            out[col] = df[col].to_numpy(dtype=np.float64)
+        else:
+            out[col] = np.full(len(df), np.nan)
+
+    for col, sources in usage_proxies.items():
+        proxy = sum(np.nan_to_num(out[s]) for s in sources)
+        known = ~np.isnan(out[col]) & (proxy > 0)
+        blank = np.isnan(out[col]) & (proxy > 0)
+        if blank.any() and known.any():
+            out[col][blank] = proxy[blank] * out[col][known].sum() / proxy[known].sum()
+
+    touches = out["Touches"]
+    guess = np.nan_to_num(out["TouchCarries"]) + np.nan_to_num(out["TouchReceptions"])
+    out["Touches"] = np.where(np.isnan(touches), guess, touches)
+
+    return {col: np.nan_to_num(values) for col, values in out.items()}
+
+
+def season_vectors(df):
+    """
+    Standardized stat vectors of one season's offensive players.
+
+    Args:
+        df (pd.DataFrame): One season of the season table.
+    Returns:
+        pd.DataFrame: meta_columns plus one float32 column per feature.
+    """
+    df = df[df["Pos"].astype(str).isin(offense_pos) & (df["TotalPoints"] > 0)]
+
+    frames = []
+    for pos, rows in df.groupby(df["Pos"].astype(str), sort=True):
+        v = fill_usage(rows)
+        yards = v["RushingYDS"] + v["ReceivingYDS"]
+        tds = v["RushingTD"] + v["ReceivingTD"]
+
+        cols = {
+            "Touches": v["Touches"],
+            "TouchCarries": v["TouchCarries"],
+            "Targets": v["Targets"],
+            "PassingYDS": v["PassingYDS"],
+            "TotalPoints": v["TotalPoints"],
+            "pts_per_opp": ratio(v["TotalPoints"], v["TouchCarries"] + v["Targets"]),
+            "yds_per_touch": ratio(yards, v["Touches"]),
+            "catch_rate": ratio(v["ReceivingRec"], v["Targets"]),
+            "yds_per_target": ratio(v["ReceivingYDS"], v["Targets"]),
+            "td_rate": ratio(tds, v["Touches"]),
+            "PassingTD": v["PassingTD"],
+            "PassingInt": v["PassingInt"],
+            "RzTouch": v["RzTouch"],
+            "RzTarget": v["RzTarget"],
+            "RzG2G": v["RzG2G"],
+            "rz_share": ratio(v["RzTouch"], v["Touches"]),
+        }
+
+        out = pd.DataFrame({
+            "PlayerId": rows["PlayerId"].to_numpy().astype(np.int32),
+            "PlayerName": rows["PlayerName"].astype(str).to_numpy(),
+            "Pos": pos,
+            "Team": rows["Team"].astype(str).to_numpy(),
+            "season": rows["season"].to_numpy().astype(np.int16),
+        })
+        for f in features:
+            x = cols[f]
+            std = x.std()
+            out[f] = ((x - x.mean()) / std if std > 0 else np.zeros(len(x))).astype(np.float32)
+        frames.append(out)
+
+    if len(frames) == 0:
+        return pd.DataFrame(columns=meta_columns + features)
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_trees(vectors):
+    """
+    One k-d tree per position over the rows of vectors with that position.
+
+    Returns:
+        dict: Position -> (cKDTree, row numbers into vectors).
+    """
+    # scipy is only needed once comps are asked for; the dashboard imports this module at startup.
+    from scipy.spatial import cKDTree
+
+    trees = {}
+    pos = vectors["Pos"].astype(str).to_numpy()
+    values = vectors[features].to_numpy(dtype=np.float64)
+    for p in offense_pos:
+        rows = np.flatnonzero(pos == p)
+        if len(rows) > 0:
+            trees[p] = (cKDTree(values[rows]), rows)
+    return trees
+
+
+def update_index(base, refresh=True):
+    """
+    Recomputes the vectors of seasons whose files changed, then the trees.
+
+    Args:
+        base (Path): Root of the NFL-data-Players tree.
+        refresh (bool): If set to True, recompiles changed folders of the store first.
+    Returns:
+        list: Seasons ("2021") that changed.
+    """
+    if refresh:
+        compile_store(base)
+
+    out = store_dir(base)
+    folder = out / similar_table
+    meta_file = folder / "meta.json"
+
+    meta = {}
+    if meta_file.exists():
+        with open(meta_file) as fh:
+            meta = json.load(fh)
+    if meta.get("version") != similar_version:
+        meta = {}
+    old = meta.get("seasons", {})
+
+    new = season_hashes(base)
+    changed = sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+    for year in changed:
+        season = read_partition(out, "season", year)
+        df = season_vectors(season) if season is not None else None
+        write_partition(out, similar_table, year, df)
+
+    index_file = folder / "index.pkl"
+    if len(changed) > 0 or not index_file.exists():
+        frames = [pd.read_pickle(f) for f in sorted(folder.glob("*.pkl")) if f.name != "index.pkl"]
+        frames = [df for df in frames if len(df) > 0]
+        vectors = pd.concat(frames, ignore_index=True) if len(frames) > 0 else pd.DataFrame(columns=meta_columns + features)
+
+        folder.mkdir(parents=True, exist_ok=True)
+        tmp = index_file.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump({"vectors": vectors, "trees": build_trees(vectors)}, fh)
+        os.replace(tmp, index_file)
+
+        tmp = meta_file.with_suffix(".tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"version": similar_version, "seasons": new}, fh)
+        os.replace(tmp, meta_file)
+
+    return changed
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour queries over the saved index of one data tree.
+    """
+    def __init__(self, base):
+        self.base = base
+        self.vectors = None
+        self.values = None
+        self.player_ids = None
+        self.trees = {}
+        self.rows = {}
+
+    def refresh(self):
+        """
+        Brings the index up to date and loads it. Returns the seasons that changed.
+        """
+        changed = update_index(self.base)
+
+        if self.vectors is None or len(changed) > 0:
+            with open(store_dir(self.base) / similar_table / "index.pkl", "rb") as fh:
+                data = pickle.load(fh)
+            self.vectors = data["vectors"]
+            self.trees = data["trees"]
+            self.values = self.vectors[features].to_numpy(dtype=np.float64)
+            self.player_ids = self.vectors["PlayerId"].to_numpy().astype(np.int64)
+            keys = list(zip(self.player_ids.tolist(), self.vectors["season"].to_numpy().tolist()))
+            self.rows = dict(zip(keys, range(len(keys))))
+
+        return changed
+
+    def row(self, player_id, season):
+        """
+        Row of a player-season in vectors, or -1 if it has none.
+        """
+        if self.vectors is None:
+            self.refresh()
+        return self.rows.get((int(player_id), int(season)), -1)
+
+    def neighbors(self, player_id, season, k=5, exclude_self=True):
+        """
+        The player-seasons at the same position closest to one player's season.
+
+        Args:
+            player_id (int): PlayerId.
+            season (int): Season of the player to match.
+            k (int): Number of comps.
+            exclude_self (bool): If set to True, the player's own seasons are left out.
+        Returns:
+            pd.DataFrame: meta_columns and distance of the k comps, closest first,
+                or None if the player has no stat vector that season.
+        """
+        r = self.row(player_id, season)
+        if r < 0:
+            return None
+
+        pos = self.vectors["Pos"].iloc[r]
+        tree, rows = self.trees[pos]
+
+        # Fetch enough extra neighbours to cover the player's own seasons.
+        own = int((self.player_ids[rows] == int(player_id)).sum()) if exclude_self else 1
+        n = min(k + own, len(rows))
+        dist, idx = tree.query(self.values[r], k=n)
+        dist = np.atleast_1d(dist)
+        found = rows[np.atleast_1d(idx)]
+
+        if exclude_self:
+            keep = self.player_ids[found] != int(player_id)
+        else:
+            keep = found != r
+        found = found[keep][:k]
+
+        out = self.vectors.iloc[found][meta_columns].reset_index(drop=True)
+        out["distance"] = dist[keep][:k]
+        return out
+
+
+if __name__ == "__main__":
+    import shutil
+    import time
+    from data_store import path
+
+    shutil.rmtree(store_dir(path) / similar_table, ignore_errors=True)
+    t0 = time.perf_counter()
+    update_index(path)
+    print(f"Built in {time.perf_counter() - t0:.2f} s")
+
+    # Forget one season to time the incremental rebuild.
+    meta_file = store_dir(path) / similar_table / "meta.json"
+    with open(meta_file) as fh:
+        meta = json.load(fh)
+    del meta["seasons"]["2025"]
+    with open(meta_file, "w") as fh:
+        json.dump(meta, fh)
+    t0 = time.perf_counter()
+    changed = update_index(path, refresh=False)
+    print(f"Rebuilt {changed} in {time.perf_counter() - t0:.2f} s")
+
+    index = SimilarityIndex(path)
+    index.refresh()
+    vectors = index.vectors
+    print(f"{len(vectors)} player-seasons")
+
+    t0 = time.perf_counter()
+    sample = vectors.sample(1000, random_state=0)
+    for player_id, season in zip(sample["PlayerId"], sample["season"]):
+        index.neighbors(player_id, season, k=5)
+    print(f"1000 queries in {time.perf_counter() - t0:.2f} s")
+
+    top = vectors[vectors["season"] == 2024].sort_values("TotalPoints", ascending=False).head(3)
+    for player_id, name in zip(top["PlayerId"], top["PlayerName"]):
+        print(name, "2024:")
+        print(index.neighbors(player_id, 2024).round(2).to_string(index=False))
@@ -0,0 +1,447 @@
+"""
+Monte Carlo fantasy seasons drawn from the players' own weekly scores.
+
+Each player's distribution is the set of weekly scores they recorded in the
+points matrix (see points_matrix.py), optionally smoothed with a Gaussian
+kernel (sampling a KDE is drawing a recorded week and adding kernel noise).
+Lineups use the dashboard's starter counts plus one flex spot, filled by the
+players with the highest average score, and stay fixed for the season.
+
+Seasons are simulated in batches of whole arrays: a batch draws every
+starter's score for every week of every season at once, then plays out the
+round-robin schedule and the playoff bracket with array operations. Batches
+are spread over a process pool. Each batch has its own child of one
+SeedSequence, so a seed gives the same result with any number of workers.
+
+Weeks without a game (byes, free agency) are left out of the distributions,
+so a simulated week is a week the player plays.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from kde import bandwidth
+from league import best_lineups, starter_count
+
+regular_weeks = 14
+playoff_teams = 4
+batch_size = 1000
+
+quantiles = [0.10, 0.50, 0.90]
+
+
+def round_robin(n_teams, n_weeks):
+    """
+    Schedule where every team plays every other once before any rematch
+    (the circle method). With an odd number of teams one team sits out each week.
+
+    Returns:
+        np.ndarray: n_weeks x games x 2 team indices.
+    """
+    teams = list(range(n_teams))
+    if n_teams % 2 == 1:
+        teams.append(-1)
+    n = len(teams)
+
+    rounds = []
+    for _ in range(n - 1):
+        games = [(teams[i], teams[n - 1 - i]) for i in range(n // 2)]
+        rounds.append([g for g in games if g[0] >= 0 and g[1] >= 0])
+        # Keep the first team fixed and rotate the rest.
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+
+    weeks = [rounds[w % len(rounds)] for w in range(n_weeks)]
+    return np.array(weeks, dtype=np.int64).reshape(n_weeks, -1, 2)
+
+
+def player_samples(matrix, player_ids, seasons=None, rule=None, include_byes=False):
+    """
+    Weekly score samples of a set of players, padded into one array.
+
+    Args:
+        matrix (PointsMatrix): Weekly points (see points_matrix.py).
+        player_ids (list): PlayerIds.
+        seasons (list): If given, only weeks from these seasons are used.
+        rule (string or float): Bandwidth rule for kernel smoothing (see kde.bandwidth).
+            None draws the recorded scores as they are.
+        include_byes (bool): If set to True, bye-week and free-agent rows are samples too.
+    Returns:
+        dict: samples (players x max games, NaN padded), counts, means, bandwidths and positions.
+    """
+    player_ids = np.asarray(player_ids)
+    if len(player_ids) == 0:
+        raise ValueError("No players to sample: the rosters are empty")
+    rows = np.searchsorted(matrix.player_ids, player_ids)
+    rows = np.minimum(rows, len(matrix.player_ids) - 1)
+    unknown = player_ids[matrix.player_ids[rows] != player_ids]
+    if len(unknown) > 0:
+        raise ValueError("Unknown PlayerId: " + ", ".join(str(p) for p in unknown))
+
+    points = np.asarray(matrix.points[rows], dtype=np.float64)
+    played = ~np.isnan(points)
+    if not include_byes:
+        played &= np.asarray(matrix.opponents[rows]) >= 0
+    if seasons is not None:
+        played &= np.isin(matrix.seasons, seasons)[None, :, None]
+
+    points = points.reshape(len(rows), -1)
+    played = played.reshape(len(rows), -1)
+    counts = played.sum(axis=1)
+
+    samples = np.full((len(rows), max(int(counts.max()), 1)), np.nan)
+    # Played weeks first, in order, then NaN padding.
+    order = np.argsort(~played, axis=1, kind="stable")[:, :samples.shape[1]]
+    taken = np.take_along_axis(points, order, axis=1)
+    samples[:] = np.where(np.arange(samples.shape[1]) < counts[:, None], taken, np.nan)
+
+    means = np.divide(np.nansum(samples, axis=1), counts, out=np.zeros(len(rows)), where=counts > 0)
+
+    bandwidths = np.zeros(len(rows))
+    if rule is not None:
+        for i in range(len(rows)):
+            try:
+                bandwidths[i] = bandwidth(samples[i, :counts[i]], rule)
+            except ValueError:
+                bandwidths[i] = 0.0
+
+    return {
+        "samples": samples,
+        "counts": counts,
+        "means": means,
+        "bandwidths": bandwidths,
+        "positions": matrix.latest_positions(rows),
+    }
+
+
+def pick_lineup(positions, means, superflex=False):
+    """
+    Chooses the starters of one roster by average score (see league.best_lineups).
+
+    Args:
+        positions (np.ndarray): Position of each rostered player.
+        means (np.ndarray): Average weekly score of each rostered player.
+        superflex (bool): If set to True, a QB may also fill the flex spot.
+    Returns:
+        np.ndarray: Indices into the roster of the starters.
+    """
+    pos_names = list(starter_count)
+    codes = np.array([pos_names.index(p) if p in pos_names else -1 for p in positions], dtype=np.int64)
+    chosen = best_lineups(np.asarray(means, dtype=np.float64), codes, pos_names, superflex=superflex)
+    return np.flatnonzero(chosen)
+
+
+def draw_scores(rng, setup, n_seasons, n_weeks):
+    """
+    Draws every starter's score for every week of n_seasons seasons.
+
+    Returns:
+        np.ndarray: n_seasons x n_weeks x starters.
+    """
+    counts = setup["counts"]
+    u = rng.random((n_seasons, n_weeks, len(counts)))
+    idx = np.minimum((u * counts).astype(np.int64), np.maximum(counts - 1, 0))
+
+    scores = setup["samples"][np.arange(len(counts)), idx]
+    scores = np.where(counts > 0, scores, 0.0)
+
+    h = setup["bandwidths"]
+    if h.any():
+        scores += rng.standard_normal(scores.shape) * h
+
+    return scores
+
+
+def play_bracket(week_scores, seeds):
+    """
+    Single-elimination playoffs, one round per week of week_scores. Top seeds
+    get byes up to the next power of two; each round the best remaining seed
+    plays the worst.
+
+    Args:
+        week_scores (np.ndarray): seasons x rounds x teams.
+        seeds (np.ndarray): seasons x playoff teams, team indices in seed order.
+    Returns:
+        np.ndarray: Champion team index of each season.
+    """
+    n_seasons, n_playoff = seeds.shape
+    rows = np.arange(n_seasons)[:, None]
+
+    size = 1
+    while size < n_playoff:
+        size *= 2
+    n_byes = size - n_playoff
+
+    # Seed positions still alive, best first.
+    alive = np.broadcast_to(np.arange(n_playoff), (n_seasons, n_playoff))
+    rnd = 0
+    while alive.shape[1] > 1:
+        byes = alive[:, :n_byes]
+        playing = alive[:, n_byes:]
+        half = playing.shape[1] // 2
+        high = playing[:, :half]
+        low = playing[:, ::-1][:, :half]
+
+        scores = week_scores[:, rnd]
+        high_pts = scores[rows, seeds[rows, high]]
+        low_pts = scores[rows, seeds[rows, low]]
+        # Ties go to the better seed.
+        winners = np.where(high_pts >= low_pts, high, low)
+
+        alive = np.sort(np.concatenate([byes, winners], axis=1), axis=1)
+        n_byes = 0
+        rnd += 1
+
+    return seeds[rows[:, 0], alive[:, 0]]
+
+
+def simulate_batch(job):
+    """
+    Simulates one batch of seasons. Runs inside worker processes.
+
+    Args:
+        job (tuple): (SeedSequence, number of seasons, setup dict from Simulator.setup).
+    Returns:
+        dict: Per-season wins, points for, playoff appearances and champions.
+    """
+    seed, n_seasons, setup = job
+    rng = np.random.default_rng(seed)
+
+    n_teams = setup["n_teams"]
+    schedule = setup["schedule"]
+    n_regular = len(schedule)
+    n_rounds = setup["n_rounds"]
+
+    starter_scores = draw_scores(rng, setup, n_seasons, n_regular + n_rounds)
+    # Sum each team's starters: seasons x weeks x teams.
+    week_scores = starter_scores @ setup["team_matrix"]
+
+    regular = week_scores[:, :n_regular]
+    points = regular.sum(axis=1)
+
+    wins = np.zeros((n_seasons, n_teams))
+    for w in range(n_regular):
+        home = schedule[w, :, 0]
+        away = schedule[w, :, 1]
+        home_pts = regular[:, w, home]
+        away_pts = regular[:, w, away]
+        result = np.where(home_pts > away_pts, 1.0, np.where(home_pts == away_pts, 0.5, 0.0))
+        # A team plays at most once a week, so the indices never repeat.
+        wins[:, home] += result
+        wins[:, away] += 1 - result
+
+    playoff = np.zeros((n_seasons, n_teams), dtype=bool)
+    champion = np.full(n_seasons, -1, dtype=np.int64)
+    n_playoff = setup["n_playoff"]
+    if n_playoff > 0:
+        # Seeds by wins, then points for.
+        standing = wins * 1e6 + points
+        seeds = np.argsort(-standing, axis=1, kind="stable")[:, :n_playoff]
+        np.put_along_axis(playoff, seeds, True, axis=1)
+        champion = play_bracket(week_scores[:, n_regular:], seeds)
+
+    return {"wins": wins, "points": points, "playoff": playoff, "champion": champion}
+
+
+class SimulationResult:
+    def __init__(self, teams, n_games, wins, points, playoff, champion):
+        """
+        Args:
+            teams (list): Team names.
+            n_games (np.ndarray): Regular-season games of each team.
+            wins, points, playoff (np.ndarray): seasons x teams.
+            champion (np.ndarray): Champion team index of each season (-1 without playoffs).
+        """
+        self.teams = list(teams)
+        self.n_games = n_games
+        self.wins = wins
+        self.points = points
+        self.playoff = playoff
+        self.champion = champion
+
+    def summary(self):
+        """
+        Returns one row per team: expected wins, win probability per game,
+        playoff and title odds, and the distribution of regular-season points.
+        """
+        n_seasons = len(self.points)
+
+        table = pd.DataFrame(index=pd.Index(self.teams, name="team"))
+        table["wins"] = self.wins.mean(axis=0)
+        table["win_prob"] = np.divide(table["wins"].to_numpy(), self.n_games,
+                                      out=np.full(len(self.teams), np.nan), where=self.n_games > 0)
+        table["playoff_odds"] = self.playoff.mean(axis=0)
+        table["title_odds"] = np.bincount(self.champion[self.champion >= 0], minlength=len(self.teams)) / max(n_seasons, 1)
+        table["points_mean"] = self.points.mean(axis=0)
+        table["points_std"] = self.points.std(axis=0)
+        for q in quantiles:
+            table["points_p" + str(int(q * 100))] = np.quantile(self.points, q, axis=0)
+
+        return table
+
+    def points_distribution(self, team, bins=50):
+        """
+        Histogram of one team's regular-season points over the simulated seasons.
+
+        Returns:
+            tuple: (counts, bin edges) as from np.histogram.
+        """
+        return np.histogram(self.points[:, self.teams.index(team)], bins=bins)
+
+
+class Simulator:
+    def __init__(self, matrix, seasons=None, rule=None, include_byes=False):
+        """
+        Args:
+            matrix (PointsMatrix): Weekly points (see points_matrix.py).
+            seasons (list): If given, player distributions only use these seasons.
+            rule (string or float): If given, scores are drawn from a kernel density
+                with this bandwidth rule (see kde.bandwidth) instead of the recorded weeks.
+            include_byes (bool): If set to True, bye-week and free-agent rows are samples too.
+        """
+        self.matrix = matrix
+        self.seasons = seasons
+        self.rule = rule
+        self.include_byes = include_byes
+
+    def setup(self, rosters, n_weeks, n_playoff, superflex=False):
+        """
+        Gathers everything a batch needs into plain arrays, so it pickles cheaply.
+
+        Args:
+            rosters (dict): Team name -> list of PlayerIds.
+        Returns:
+            dict
+        """
+        teams = list(rosters)
+        all_ids = []
+        owner = []
+        for t, ids in enumerate(rosters.values()):
+            all_ids.extend(ids)
+            owner.extend([t] * len(ids))
+        owner = np.array(owner, dtype=np.int64)
+
+        players = player_samples(self.matrix, all_ids, self.seasons, self.rule, self.include_byes)
+
+        starters = []
+        for t in range(len(teams)):
+            members = np.flatnonzero(owner == t)
+            lineup = pick_lineup(players["positions"][members], players["means"][members], superflex)
+            starters.extend(members[lineup].tolist())
+        starters = np.array(starters, dtype=np.int64)
+
+        team_matrix = np.zeros((len(starters), len(teams)))
+        team_matrix[np.arange(len(starters)), owner[starters]] = 1.0
+
+        n_playoff = min(n_playoff, len(teams)) if len(teams) > 1 else 0
+        n_rounds = 0
+        while n_playoff > 1 and 2 ** n_rounds < n_playoff:
+            n_rounds += 1
+
+        return {
+            "teams": teams,
+            "n_teams": len(teams),
+            "schedule": round_robin(len(teams), n_weeks) if len(teams) > 1 else np.zeros((n_weeks, 0, 2), dtype=np.int64),
+            "n_playoff": n_playoff,
+            "n_rounds": n_rounds,
+            "samples": players["samples"][starters],
+            "counts": players["counts"][starters],
+            "bandwidths": players["bandwidths"][starters],
+            "starters": np.array(all_ids)[starters],
+            "team_matrix": team_matrix,
+        }
+
+    def league(self, rosters, n_seasons=10000, n_weeks=regular_weeks, n_playoff=playoff_teams,
+               superflex=False, seed=None, workers=None):
+        """
+        Simulates whole league seasons.
+
+        Args:
+            rosters (dict): Team name -> list of PlayerIds.
+            n_seasons (int): Number of seasons to simulate.
+            n_weeks (int): Regular-season weeks.
+            n_playoff (int): Teams that make the playoffs.
+            superflex (bool): If set to True, a QB may fill the flex spot.
+            seed (int): Seed for reproducible results.
+            workers (int): Pool size. Defaults to the number of CPUs; 1 runs serially.
+        Returns:
+            SimulationResult
+        """
+        setup = self.setup(rosters, n_weeks, n_playoff, superflex)
+
+        sizes = [batch_size] * (n_seasons // batch_size)
+        if n_seasons % batch_size > 0:
+            sizes.append(n_seasons % batch_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        jobs = [(s, n, setup) for s, n in zip(seeds, sizes)]
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if workers <= 1 or len(jobs) <= 1:
+            results = [simulate_batch(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                results = list(pool.map(simulate_batch, jobs))
+
+        n_games = np.zeros(setup["n_teams"])
+        for week in setup["schedule"]:
+            n_games += np.bincount(week.ravel(), minlength=setup["n_teams"])
+
+        return SimulationResult(
+            setup["teams"],
+            n_games,
+            np.concatenate([r["wins"] for r in results]),
+            np.concatenate([r["points"] for r in results]),
+            np.concatenate([r["playoff"] for r in results]),
+            np.concatenate([r["champion"] for r in results]),
+        )
+
+    def roster(self, player_ids, n_seasons=10000, n_weeks=regular_weeks, superflex=False, seed=None, workers=None):
+        """
+        Simulates one roster on its own: only its point distribution is defined.
+
+        Returns:
+            SimulationResult: With a single team named "roster".
+        """
+        return self.league({"roster": list(player_ids)}, n_seasons, n_weeks, 0, superflex, seed, workers)
+
+
+def snake_league(matrix, n_teams, season, roster_size=15):
+    """
+    A league for trying the simulator out: the season's players with the most
+    points per game are snake-drafted into n_teams rosters.
+    """
+    s = matrix.season_index(season)
+    pts = np.asarray(matrix.points[:, s], dtype=np.float64)
+    played = ~np.isnan(pts) & (np.asarray(matrix.opponents[:, s]) >= 0)
+    games = played.sum(axis=1)
+    mean = np.divide(np.where(played, pts, 0).sum(axis=1), games, out=np.zeros(len(games)), where=games > 0)
+
+    rows = np.arange(len(matrix.player_ids))
+    pos = matrix.latest_positions(rows)
+    eligible = np.isin(pos, list(starter_count)) & (games >= 8)
+    order = rows[eligible][np.argsort(-mean[eligible], kind="stable")]
+
+    rosters = {"Team " + str(t + 1): [] for t in range(n_teams)}
+    names = list(rosters)
+    for pick, row in enumerate(order[:n_teams * roster_size]):
+        rnd, i = divmod(pick, n_teams)
+        t = i if rnd % 2 == 0 else n_teams - 1 - i
+        rosters[names[t]].append(int(matrix.player_ids[row]))
+
+    return rosters
+
+
+if __name__ == "__main__":
+    from points_matrix import load_points_matrix
+    from data_store import path
+    from league import team_sizes
+
+    matrix = load_points_matrix(path)
+    rosters = snake_league(matrix, team_sizes[0], 2024)
+
+    sim = Simulator(matrix, seasons=[2024])
+    result = sim.league(rosters, n_seasons=10000, seed=0)
+
+    pd.set_option("display.width", 140)
+    print(result.summary().round(3))
@@ -0,0 +1,225 @@
+"""
+Strength of schedule and opponent-adjusted projections.
+
+The defense heatmap's numbers (how far players scored above the weekly
+average at their position against each opponent, see defense_index.py)
+become an adjustment per (team, position): the average points over or under
+par that team gives up, with later weeks optionally weighted more heavily
+(weights halve every `halflife` weeks back from the last week of the range)
+and shrunk toward 0 by `prior` average games. The factor is the same
+adjustment relative to the positional average, so a defense that gives up
+20% more than average to WRs has a WR factor of 1.2.
+
+Each projected/<POS>_projected.csv row is joined to its PlayerOpponent's
+factor, giving an adjusted projection for every player-week. Factors for a
+week come only from games before it, or from a fixed range of played weeks
+for rest-of-season views. Everything is a lookup into team x position
+arrays, and results are cached per (season, week range).
+"""
+import numpy as np
+import pandas as pd
+from defense_index import DefenseIndex
+from points_matrix import codes
+
+projected_columns = ["PlayerId", "PlayerName", "Pos", "Team", "PlayerOpponent", "season", "week", "PlayerWeekProjectedPts"]
+
+
+def opponent_codes(opponents, team_names):
+    """
+    Codes of the PlayerOpponent values ("@LV" -> LV) in team_names; -1 for byes and unknown teams.
+    """
+    opponent = opponents.astype(str).str.replace("@", "", regex=False).str.strip()
+    opponent = opponent.where(~opponent.str.upper().isin(["BYE", "NONE", "", "NAN"]), "")
+    return codes(opponent, team_names)
+
+
+class StrengthOfSchedule:
+    def __init__(self, matrix, projected, halflife=None, prior=0, index=None):
+        """
+        Args:
+            matrix (PointsMatrix): Weekly points (see points_matrix.py).
+            projected (pd.DataFrame): Projected table with at least projected_columns.
+            halflife (float): Weeks for a game's weight to halve. None weights every week equally,
+                as the defense heatmap does.
+            prior (float): Average games added to every (team, position) cell, pulling thin samples toward 0.
+            index (DefenseIndex): Index of the same matrix to reuse, if one is already built.
+        """
+        self.matrix = matrix
+        self.halflife = halflife
+        self.prior = prior
+        self.index = index if index is not None else DefenseIndex(matrix)
+
+        # seasons x weeks x teams x positions, per week instead of running totals.
+        self.sums = np.diff(self.index.sums, axis=1)
+        self.counts = np.diff(self.index.counts, axis=1)
+        self.n_weeks = self.sums.shape[1]
+
+        df = projected[projected_columns].reset_index(drop=True)
+        self.projected = df
+        self.season = df["season"].to_numpy().astype(np.int64)
+        self.week = df["week"].to_numpy().astype(np.int64)
+        self.pos = codes(df["Pos"].astype(str), matrix.pos_names).astype(np.int64)
+        self.opp = opponent_codes(df["PlayerOpponent"], matrix.team_names).astype(np.int64)
+        self.base = df["PlayerWeekProjectedPts"].to_numpy(dtype=np.float64)
+
+        self.results = {}
+
+    def weights(self, w_start, w_end):
+        """
+        Weight of each week of the season in a range; 0 outside it.
+        """
+        weeks = np.arange(1, self.n_weeks + 1)
+        w = ((weeks >= w_start) & (weeks <= w_end)).astype(np.float64)
+        if self.halflife is not None:
+            w = w * 0.5 ** ((w_end - weeks) / self.halflife)
+        return w
+
+    def factors(self, season, w_start, w_end):
+        """
+        Schedule adjustments from the games of one season's week range.
+
+        Args:
+            season (int): Season year.
+            w_start (int): First week, inclusive.
+            w_end (int): Last week, inclusive.
+        Returns:
+            tuple: (teams x positions points over average allowed per game,
+                    teams x positions multiplicative factors,
+                    teams x positions games), indexed by team_names and pos_names.
+        """
+        key = ("factors", int(season), int(w_start), int(w_end))
+        if key in self.results:
+            return self.results[key]
+
+        shape = (len(self.index.team_names), len(self.index.pos_names))
+        s = self.index.season_index(season)
+        if s < 0 or w_start > w_end:
+            return np.zeros(shape), np.ones(shape), np.zeros(shape)
+
+        w = self.weights(w_start, w_end)
+        sums = np.tensordot(w, self.sums[s], axes=1)
+        games = np.tensordot(w, self.counts[s], axes=1)
+        adjust = np.divide(sums, games + self.prior, out=np.zeros(shape), where=games + self.prior > 0)
+
+        pos_games = w @ self.index.week_counts[s]
+        pos_avg = np.divide(w @ self.index.week_totals[s], pos_games, out=np.zeros(len(pos_games)), where=pos_games > 0)
+        ratio = np.divide(adjust, pos_avg, out=np.zeros(shape), where=pos_avg > 0)
+        factor = np.maximum(1 + ratio, 0)
+
+        unweighted = self.counts[s, max(w_start, 1) - 1:min(w_end, self.n_weeks)].sum(axis=0)
+        self.results[key] = (adjust, factor, unweighted)
+        return self.results[key]
+
+    def pregame_factors(self, season):
+        """
+        Factors as they stood before each week: week w uses weeks 1 to w - 1.
+
+        Returns:
+            tuple: (weeks x teams x positions adjustments, weeks x teams x positions factors)
+        """
+        key = ("pregame", int(season))
+        if key not in self.results:
+            out = [self.factors(season, 1, w - 1) for w in range(1, self.n_weeks + 2)]
+            self.results[key] = (np.stack([a for a, f, g in out]), np.stack([f for a, f, g in out]))
+        return self.results[key]
+
+    def adjusted(self, season, through_week=None):
+        """
+        Opponent-adjusted projections for every projected player-week of a season.
+
+        Args:
+            season (int): Season year.
+            through_week (int): If given, only the weeks after it, all adjusted with
+                the factors of weeks 1 to through_week. Otherwise every week, each
+                adjusted with the games before it.
+        Returns:
+            pd.DataFrame: projected_columns plus opponent_code, adjustment, factor and adjusted
+                (PlayerWeekProjectedPts x factor). Byes and unknown opponents keep a factor of 1.
+        """
+        key = ("adjusted", int(season), through_week)
+        if key in self.results:
+            return self.results[key]
+
+        rows = self.season == season
+        if through_week is not None:
+            rows &= self.week > through_week
+        rows = np.flatnonzero(rows)
+
+        week = np.minimum(self.week[rows], self.n_weeks + 1)
+        pos = self.pos[rows]
+        opp = self.opp[rows]
+        known = (opp >= 0) & (pos >= 0)
+
+        if through_week is None:
+            adjust, factor = self.pregame_factors(season)
+            adjust = adjust[week - 1, opp, pos]
+            factor = factor[week - 1, opp, pos]
+        else:
+            adjust, factor, games = self.factors(season, 1, through_week)
+            adjust = adjust[opp, pos]
+            factor = factor[opp, pos]
+
+        df = self.projected.iloc[rows].reset_index(drop=True)
+        df["opponent_code"] = opp
+        df["adjustment"] = np.where(known, adjust, 0.0)
+        df["factor"] = np.where(known, factor, 1.0)
+        df["adjusted"] = self.base[rows] * df["factor"].to_numpy()
+
+        self.results[key] = df
+        return df
+
+    def rest_of_season(self, season, through_week):
+        """
+        Remaining schedule of every player after through_week, rated with the games so far.
+
+        Returns:
+            pd.DataFrame: One row per player: games left, mean factor (above 1 is an easier
+                schedule than average), and the raw and adjusted projected points left.
+        """
+        key = ("rest", int(season), int(through_week))
+        if key in self.results:
+            return self.results[key]
+
+        df = self.adjusted(season, through_week)
+        table = df.groupby("PlayerId", sort=True).agg(
+            PlayerName=("PlayerName", "last"),
+            Pos=("Pos", "last"),
+            Team=("Team", "last"),
+            games=("week", "size"),
+            sos=("factor", "mean"),
+            projected=("PlayerWeekProjectedPts", "sum"),
+            adjusted=("adjusted", "sum"),
+        )
+        table["gain"] = table["adjusted"] - table["projected"]
+
+        self.results[key] = table
+        return table
+
+
+if __name__ == "__main__":
+    import time
+    from data_store import load_table, path
+    from points_matrix import load_points_matrix
+
+    matrix = load_points_matrix(path)
+    projected = load_table("projected", path, refresh=False, columns=projected_columns)
+
+    t0 = time.perf_counter()
+    sos = StrengthOfSchedule(matrix, projected, halflife=4, prior=2)
+    print(f"Built in {time.perf_counter() - t0:.2f} s")
+
+    season = int(matrix.seasons[-1])
+    through = int(matrix.played_weeks(season)[-1])
+
+    t0 = time.perf_counter()
+    table = sos.rest_of_season(season, through)
+    print(f"{season} rest of season after week {through}, {len(table)} players in {time.perf_counter() - t0:.3f} s")
+
+    t0 = time.perf_counter()
+    for s in matrix.seasons:
+        sos.adjusted(int(s))
+    print(f"Pre-game adjusted projections for every player-week in {time.perf_counter() - t0:.3f} s")
+
+    top = table[table["Pos"].isin(["QB", "RB", "WR", "TE"]) & (table["projected"] > 20)]
+    pd.set_option("display.width", 160)
+    print(top.sort_values("gain", ascending=False).head(10).round(2).to_string())
@@ -0,0 +1,315 @@
+"""
+Value over replacement for every player-season under many league setups.
+
+A league of `size` teams starts size x starters[pos] players at each position
+outright. Its flex spots go to the best players left at the flex-eligible
+positions (RB, WR and TE, plus QB in superflex leagues). The replacement
+player at a position is the best one nobody starts, and a player's value
+over replacement (VOR) is their season total minus that player's. A position
+without a starting spot has no replacement.
+
+Season totals are laid out as a seasons x positions x rank array, sorted
+best first. Each season's players are treated as one roster with the whole
+league's spots, and league.best_lineups picks its starters, for every season
+at once. The baselines and every player's VOR under every setup are saved
+next to the compiled store and reloaded until the season files change.
+"""
+import json
+import os
+import numpy as np
+from league import best_lineups, starter_count, team_sizes
+
+vor_version = 1
+arrays = ["seasons", "baselines", "ranks", "player_ids", "player_seasons", "player_pos", "points", "pos_ranks", "names", "vor"]
+
+
+def league_config(size, superflex=False, starters=starter_count, flex=1):
+    """
+    Describes one league setup.
+
+    Args:
+        size (int): Number of teams.
+        superflex (bool): If set to True, a QB may fill the flex spots.
+        starters (dict): Position -> starting spots per team.
+        flex (int): Flex spots per team.
+    Returns:
+        dict
+    """
+    return {"size": int(size), "superflex": bool(superflex), "starters": dict(starters), "flex": int(flex)}
+
+
+def default_configs():
+    """
+    Every league size the dashboard offers, with and without superflex.
+    """
+    return [league_config(size, superflex) for superflex in [False, True] for size in team_sizes]
+
+
+def config_key(config):
+    return json.dumps(config, sort_keys=True)
+
+
+def rank_cube(season_df, seasons, pos_names):
+    """
+    Lays the season totals out as seasons x positions x rank, best first.
+
+    Returns:
+        tuple: (points cube, NaN padded; position rank of every row of season_df)
+    """
+    s = np.searchsorted(seasons, season_df["season"].to_numpy())
+    p = np.searchsorted(pos_names, season_df["Pos"].astype(str).to_numpy())
+    pts = season_df["TotalPoints"].to_numpy(dtype=np.float64)
+
+    # Best first within each (season, position); rows without points last.
+    order = np.lexsort((np.where(np.isnan(pts), np.inf, -pts), p, s))
+    group = s[order] * len(pos_names) + p[order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if len(order) > 0 else np.array([], dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(starts, sizes)
+
+    n_ranks = int(sizes.max()) if len(sizes) > 0 else 0
+    cube = np.full((len(seasons), len(pos_names), n_ranks), np.nan)
+    cube[s[order], p[order], rank] = pts[order]
+
+    pos_ranks = np.empty(len(order), dtype=np.int64)
+    pos_ranks[order] = rank + 1
+    return cube, pos_ranks
+
+
+def replacement_ranks(cube, pos_names, configs):
+    """
+    Rank of the replacement player of every position, season and league setup.
+
+    Args:
+        cube (np.ndarray): seasons x positions x rank season totals, best first.
+        pos_names (list): Positions of the cube's second axis.
+        configs (list): League setups from league_config.
+    Returns:
+        np.ndarray: configs x seasons x positions, 1-based; 0 where the setup starts nobody there.
+    """
+    n_seasons, n_pos, n_ranks = cube.shape
+
+    # One roster per season holding every player, position by position; no total means no player.
+    values = cube.reshape(n_seasons, n_pos * n_ranks)
+    pos = np.where(np.isnan(values), -1, np.repeat(np.arange(n_pos), n_ranks))
+
+    ranks = np.zeros((len(configs), n_seasons, n_pos), dtype=np.int64)
+    for c, config in enumerate(configs):
+        starters = {name: config["size"] * n for name, n in config["starters"].items()}
+        chosen = best_lineups(values, pos, pos_names, starters, config["size"] * config["flex"], config["superflex"])
+        started = chosen.reshape(n_seasons, n_pos, n_ranks).sum(axis=2)
+        ranks[c] = np.where(started > 0, started + 1, 0)
+
+    return ranks
+
+
+def build_vor_table(season_df, configs=None):
+    """
+    Computes the baselines and every player-season's VOR under every setup.
+
+    Args:
+        season_df (pd.DataFrame): Season totals with PlayerId, PlayerName, Pos, season and TotalPoints.
+        configs (list): League setups. Defaults to default_configs().
+    Returns:
+        VORTable
+    """
+    if configs is None:
+        configs = default_configs()
+
+    seasons = np.unique(season_df["season"].to_numpy()).astype(np.int64)
+    pos_names = sorted(season_df["Pos"].astype(str).unique())
+
+    cube, pos_ranks = rank_cube(season_df, seasons, pos_names)
+    ranks = replacement_ranks(cube, pos_names, configs)
+
+    # The replacement's total; a rank past the last player means replacement scores 0.
+    padded = np.concatenate([cube, np.zeros((len(seasons), len(pos_names), 1))], axis=2)
+    idx = np.minimum(np.maximum(ranks - 1, 0), padded.shape[2] - 1)
+    baselines = np.take_along_axis(padded[None], idx[..., None], axis=3)[..., 0]
+    baselines = np.where(np.isnan(baselines), 0.0, baselines)
+    baselines = np.where(ranks > 0, baselines, np.nan)
+
+    s = np.searchsorted(seasons, season_df["season"].to_numpy())
+    p = np.searchsorted(pos_names, season_df["Pos"].astype(str).to_numpy())
+    points = season_df["TotalPoints"].to_numpy(dtype=np.float64)
+    vor = (points[None, :] - baselines[:, s, p]).astype(np.float32)
+
+    data = {
+        "seasons": seasons,
+        "baselines": baselines,
+        "ranks": ranks,
+        "player_ids": season_df["PlayerId"].to_numpy().astype(np.int64),
+        "player_seasons": seasons[s],
+        "player_pos": p.astype(np.int8),
+        "points": points,
+        "pos_ranks": pos_ranks,
+        "names": season_df["PlayerName"].astype(str).to_numpy().astype(str),
+        "vor": vor,
+    }
+    return VORTable(data, pos_names, configs)
+
+
+def load_vor_table(base, configs=None, refresh=True):
+    """
+    Opens the saved VOR table of a data tree, rebuilding it if the compiled
+    store or the list of setups changed since it was written.
+
+    Args:
+        base (Path): Root of the NFL-data-Players tree.
+        configs (list): League setups. Defaults to default_configs().
+        refresh (bool): If set to True, recompiles changed folders of the store first.
+    Returns:
+        VORTable
+    """
+    # The store modules pull in pandas, which the dashboard only loads in the background.
+    from data_store import compile_store, load_table, store_dir
+    from points_matrix import manifest_hash
+
+    if configs is None:
+        configs = default_configs()
+    if refresh:
+        compile_store(base)
+
+    out = store_dir(base) / "vor"
+    meta_file = out / "meta.json"
+    current = manifest_hash(base)
+    keys = [config_key(config) for config in configs]
+
+    meta = {}
+    if meta_file.exists():
+        with open(meta_file) as fh:
+            meta = json.load(fh)
+
+    if meta.get("version") == vor_version and meta.get("manifest") == current and meta.get("configs") == keys:
+        with np.load(out / "vor.npz") as f:
+            data = {name: f[name] for name in arrays}
+        return VORTable(data, meta["positions"], configs)
+
+    season_df = load_table("season", base, refresh=False, columns=["PlayerId", "PlayerName", "Pos", "season", "TotalPoints"])
+    table = build_vor_table(season_df, configs)
+
+    out.mkdir(parents=True, exist_ok=True)
+    tmp = out / "vor.tmp.npz"
+    np.savez(tmp, **table.data)
+    os.replace(tmp, out / "vor.npz")
+    with open(meta_file, "w") as fh:
+        json.dump({"version": vor_version, "manifest": current, "configs": keys, "positions": table.pos_names}, fh)
+
+    return table
+
+
+class VORTable:
+    def __init__(self, data, pos_names, configs):
+        """
+        Args:
+            data (dict): Arrays from build_vor_table (see arrays).
+            pos_names (list): Positions, indexing the baselines' last axis and player_pos.
+            configs (list): League setups, indexing the first axis of baselines, ranks and vor.
+        """
+        self.data = data
+        self.pos_names = list(pos_names)
+        self.configs = list(configs)
+        self.config_index = {config_key(config): c for c, config in enumerate(self.configs)}
+
+        self.seasons = data["seasons"]
+        self.baselines = data["baselines"]
+        self.ranks = data["ranks"]
+        self.vor = data["vor"]
+
+        self.rows = {}
+        for i, key in enumerate(zip(data["player_ids"].tolist(), data["player_seasons"].tolist())):
+            self.rows[key] = i
+
+    def config(self, size, superflex=False, starters=starter_count, flex=1):
+        """
+        Returns the index of a league setup, or raises KeyError if it was not computed.
+        """
+        key = config_key(league_config(size, superflex, starters, flex))
+        if key not in self.config_index:
+            raise KeyError("League setup not in the VOR table: " + key)
+        return self.config_index[key]
+
+    def cell(self, season, pos):
+        s = int(np.searchsorted(self.seasons, season))
+        if s >= len(self.seasons) or self.seasons[s] != season or pos not in self.pos_names:
+            return None
+        return s, self.pos_names.index(pos)
+
+    def baseline(self, season, pos, size, superflex=False, starters=starter_count, flex=1):
+        """
+        Returns the replacement player's season total, or NaN if the setup starts nobody at pos.
+        """
+        cell = self.cell(season, pos)
+        if cell is None:
+            return np.nan
+        return float(self.baselines[self.config(size, superflex, starters, flex), cell[0], cell[1]])
+
+    def replacement_rank(self, season, pos, size, superflex=False, starters=starter_count, flex=1):
+        """
+        Returns the positional rank of the replacement player, or 0 if the setup starts nobody at pos.
+        """
+        cell = self.cell(season, pos)
+        if cell is None:
+            return 0
+        return int(self.ranks[self.config(size, superflex, starters, flex), cell[0], cell[1]])
+
+    def value(self, player_id, season, size, superflex=False, starters=starter_count, flex=1):
+        """
+        Returns one player-season's VOR, or NaN if the player has no season total.
+        """
+        i = self.rows.get((int(player_id), int(season)))
+        if i is None:
+            return np.nan
+        return float(self.vor[self.config(size, superflex, starters, flex), i])
+
+    def table(self, size, superflex=False, starters=starter_count, flex=1, season=None, pos=None):
+        """
+        Every player-season's VOR under one setup, highest first.
+
+        Args:
+            season (int): If given, only that season.
+            pos (string): If given, only that position.
+        Returns:
+            pd.DataFrame: PlayerId, PlayerName, Pos, season, TotalPoints, Rank, replacement and VOR.
+        """
+        import pandas as pd
+
+        c = self.config(size, superflex, starters, flex)
+        data = self.data
+
+        keep = np.ones(len(data["player_ids"]), dtype=bool)
+        if season is not None:
+            keep &= data["player_seasons"] == season
+        if pos is not None:
+            keep &= data["player_pos"] == (self.pos_names.index(pos) if pos in self.pos_names else -1)
+
+        s = np.searchsorted(self.seasons, data["player_seasons"][keep])
+        p = data["player_pos"][keep].astype(np.int64)
+
+        df = pd.DataFrame({
+            "PlayerId": data["player_ids"][keep],
+            "PlayerName": data["names"][keep],
+            "Pos": np.array(self.pos_names, dtype=object)[p],
+            "season": data["player_seasons"][keep],
+            "TotalPoints": data["points"][keep],
+            "Rank": data["pos_ranks"][keep],
+            "replacement": self.baselines[c, s, p],
+            "VOR": self.vor[c, keep],
+        })
+        return df.sort_values("VOR", ascending=False, kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from data_store import path
+
+    vor = load_vor_table(path)
+
+    pd.set_option("display.width", 140)
+    print(vor.table(12, season=2024).head(20))
+    for superflex in [False, True]:
+        print()
+        print("Replacement ranks, 2024, superflex" if superflex else "Replacement ranks, 2024")
+        for size in team_sizes:
+            ranks = [pos + " " + str(vor.replacement_rank(2024, pos, size, superflex)) for pos in starter_count]
+            print(size, "teams:", ", ".join(ranks))